@@ -1,30 +1,56 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session
+from flask import (
+    Flask, Response, request, jsonify, render_template, redirect, url_for, flash, session,
+    send_file, stream_with_context
+)
 import os
+import glob
+import json
 from werkzeug.security import check_password_hash
+from werkzeug.utils import secure_filename
 import mysql.connector
-from config import DB_CONFIG
-from recommender.train_model import train_kmeans
-from recommender.recommend import recommend_next_courses
+import db
+from config import ADMIN_PAGE_SIZE, ADMIN_MAX_PAGE_SIZE, PDF_RENDER_WAIT
+from etl.student_id import normalize_student_id
+from etl.student_summary import refresh_student_summary, delete_student_summary
+from recommender.training_jobs import submit_training, get_training_job
+from recommender.model_registry import get_model_registry
+from recommender.prerequisite_utils import invalidate_prerequisite_graph
+from recommender.course_catalog import invalidate_course_catalog
+from recommender.recommendation_cache import (
+    get_recommendations,
+    invalidate_student,
+    clear_recommendation_cache,
+    apply_changeset,
+    get_learning_plans
+)
+from recommender.precompute import start_precompute_job, get_precompute_status
+from recommender.plan_pdf import PLAN_NAMES
+from recommender.pdf_artifacts import get_plan_pdf
+from recommender.plan_export import list_export_students, iter_plans_zip
 from recommender.kmeans_clustering import (
-    get_learning_plans_for_student,
+    changeset_affects_bundle,
     calculate_distance_to_clusters,
+    calculate_distances_batch,
     get_student_progress_by_semester
 )
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # cần thiết cho flash messages và session
 
-# Tự động train model khi khởi động
 DEFAULT_EXCEL = 'data/student_data_100-2.xlsx'  # đường dẫn tới file Excel mặc định
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'kmeans_model.pkl')
+# Change set do etl/import_excel_to_db.py --mode incremental ghi ra; change set đã áp dụng
+# có file đánh dấu `<change set>.applied` bên cạnh (dùng chung cho mọi worker, còn sau khi khởi động lại)
+CHANGESET_DIR = os.path.join(os.path.dirname(__file__), 'data', '.cache', 'changesets')
+CHANGESET_APPLIED_SUFFIX = '.applied'
 
 # Đảm bảo thư mục models tồn tại
 os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
 
-# Train model từ file Excel mặc định nếu model chưa tồn tại
-if os.path.exists(DEFAULT_EXCEL) and not os.path.exists(MODEL_PATH):
-    print(f"Training model from {DEFAULT_EXCEL}...")
-    train_kmeans(DEFAULT_EXCEL, MODEL_PATH)
+# Model chưa tồn tại: train ở nền từ file Excel mặc định (không chặn lúc khởi động)
+if os.path.exists(DEFAULT_EXCEL) and not get_model_registry(MODEL_PATH).exists():
+    job = submit_training(DEFAULT_EXCEL, MODEL_PATH)
+    print(f"Training model from {DEFAULT_EXCEL} in background (job {job['id']})...")
 
 # File extensions cho phép
 ALLOWED_EXT = {'.xlsx', '.xls', '.csv'}
@@ -33,6 +59,15 @@ def allowed_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in ALLOWED_EXT
 
+def page_size_arg():
+    """Số dòng mỗi trang từ ?per_page= (mặc định ADMIN_PAGE_SIZE, tối đa ADMIN_MAX_PAGE_SIZE)"""
+    per_page = request.args.get('per_page', ADMIN_PAGE_SIZE, type=int) or ADMIN_PAGE_SIZE
+    return max(1, min(per_page, ADMIN_MAX_PAGE_SIZE))
+
+def like_prefix(text):
+    """Mẫu LIKE tìm theo tiền tố (escape ký tự đặc biệt % và _ người dùng nhập)"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
 @app.route('/')
 def index():
     """Trang chủ - Redirect về login hoặc dashboard"""
@@ -42,57 +77,52 @@ def index():
 
 @app.route('/login', methods=['POST'])
 def login():
-    student_id = (request.form.get('student_id') or '').strip()
+    student_id = normalize_student_id(request.form.get('student_id'))
     password = request.form.get('password') or ''
 
     if not student_id or not password:
         flash('Vui lòng nhập đầy đủ thông tin', 'error')
         return redirect(url_for('index'))
 
+    # Hỗ trợ trường hợp mật khẩu vẫn còn plaintext trong DB
+    def _is_hashed(p):
+        return isinstance(p, str) and (p.startswith('pbkdf2:') or p.startswith('scrypt:'))
+
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        with db.cursor(dictionary=True) as cursor:
+            # StudentID đã được chuẩn hoá khi ghi (etl/student_id.py) → tra cứu thẳng theo khoá chính,
+            # chỉ lấy các cột cần cho đăng nhập
+            cursor.execute("SELECT StudentID, HoTen, Password FROM SinhVien WHERE StudentID=%s", (student_id,))
+            user = cursor.fetchone()
+
+            if not user:
+                flash('Mã số sinh viên hoặc mật khẩu không đúng', 'error')
+                return redirect(url_for('index'))
+
+            stored_password = user.get('Password') or ''
+            if _is_hashed(stored_password):
+                valid = check_password_hash(stored_password, password)
+            else:
+                valid = stored_password == password
+                # Nếu khớp plaintext, tự động chuyển sang hash để lần sau đăng nhập chuẩn
+                # (commit khi khối `with` kết thúc)
+                if valid:
+                    from werkzeug.security import generate_password_hash
+                    new_hash = generate_password_hash(password, method='pbkdf2:sha256')
+                    cursor.execute("UPDATE SinhVien SET Password=%s WHERE StudentID=%s", (new_hash, user['StudentID']))
     except mysql.connector.Error as e:
         flash('Không thể kết nối đến database. Vui lòng kiểm tra MySQL đã được khởi động trong XAMPP chưa.', 'error')
         print(f"Database connection error: {e}")
         return redirect(url_for('index'))
-    
-    cursor = conn.cursor(dictionary=True)
-    # So khop StudentID bo khoang trang dau/cuoi
-    cursor.execute("SELECT * FROM SinhVien WHERE TRIM(StudentID)=%s", (student_id,))
-    user = cursor.fetchone()
-    
-    if not user:
-        flash('Mã số sinh viên hoặc mật khẩu không đúng', 'error')
-        return redirect(url_for('index'))
-
-    # Hỗ trợ trường hợp mật khẩu vẫn còn plaintext trong DB
-    def _is_hashed(p):
-        return isinstance(p, str) and (p.startswith('pbkdf2:') or p.startswith('scrypt:'))
-
-    stored_password = user.get('Password') or ''
-    if _is_hashed(stored_password):
-        valid = check_password_hash(stored_password, password)
-    else:
-        valid = stored_password == password
-        # Nếu khớp plaintext, tự động chuyển sang hash để lần sau đăng nhập chuẩn
-        if valid:
-            from werkzeug.security import generate_password_hash
-            new_hash = generate_password_hash(password, method='pbkdf2:sha256')
-            cursor2 = conn.cursor()
-            cursor2.execute("UPDATE SinhVien SET Password=%s WHERE StudentID=%s", (new_hash, user['StudentID']))
-            conn.commit()
-            cursor2.close()
 
     if not valid:
         flash('Mã số sinh viên hoặc mật khẩu không đúng', 'error')
-        conn.close()
         return redirect(url_for('index'))
 
     # Lưu thông tin vào session
-    session['student_id'] = student_id
+    session['student_id'] = user['StudentID']
     session['student_name'] = user['HoTen']
     
-    conn.close()
     return redirect(url_for('dashboard'))
 
 @app.route('/logout')
@@ -110,7 +140,16 @@ def dashboard():
 
     try:
         try:
-            conn = mysql.connector.connect(**DB_CONFIG)
+            # Lấy thông tin các môn đã học từ TienTrinh
+            with db.cursor(dictionary=True) as cursor:
+                cursor.execute("""
+                    SELECT tt.*, mh.CourseName 
+                    FROM TienTrinh tt
+                    JOIN MonHoc mh ON tt.CourseCode = mh.CourseCode
+                    WHERE tt.StudentID=%s 
+                    ORDER BY tt.Year, tt.Semester
+                """, (student_id,))
+                courses = cursor.fetchall()
         except mysql.connector.Error as e:
             flash('Không thể kết nối đến database. Vui lòng kiểm tra MySQL đã được khởi động trong XAMPP chưa.', 'error')
             print(f"Database connection error: {e}")
@@ -120,26 +159,14 @@ def dashboard():
                                  courses=[],
                                  recs=[],
                                  credit_summary=None)
-        
-        cursor = conn.cursor(dictionary=True)
-        
-        # Lấy thông tin các môn đã học từ TienTrinh
-        cursor.execute("""
-            SELECT tt.*, mh.CourseName 
-            FROM TienTrinh tt
-            JOIN MonHoc mh ON tt.CourseCode = mh.CourseCode
-            WHERE tt.StudentID=%s 
-            ORDER BY tt.Year, tt.Semester
-        """, (student_id,))
-        courses = cursor.fetchall()
-
-        # Tính tổng tín chỉ đã học
+
+        # Tính tổng tín chỉ đã học (danh sách môn đã có sẵn, không cần bảng tổng hợp)
         total_credits_earned = sum(c.get('Credits', 0) or 0 for c in courses if c.get('Status') in ('Đã học', 'Đã qua'))
         total_required_credits = 156  # 156 tín chỉ yêu cầu
         credits_remaining = max(0, total_required_credits - total_credits_earned)
         
         # Lấy gợi ý môn học tiếp theo
-        recs = recommend_next_courses(student_id, model_path=model_path)
+        recs = get_recommendations(student_id, model_path=model_path)
         
         # Debug: Kiểm tra recommendation_group
         if recs:
@@ -152,13 +179,14 @@ def dashboard():
         if recs:
             course_codes = [r['CourseCode'] for r in recs]
             placeholders = ','.join(['%s'] * len(course_codes))
-            cursor.execute(f"""
-                SELECT mh.*, tq.PrerequisiteCode
-                FROM MonHoc mh
-                LEFT JOIN TienQuyet tq ON mh.CourseCode = tq.CourseCode
-                WHERE mh.CourseCode IN ({placeholders})
-            """, tuple(course_codes))
-            course_details = cursor.fetchall()
+            with db.cursor(dictionary=True) as cursor:
+                cursor.execute(f"""
+                    SELECT mh.*, tq.PrerequisiteCode
+                    FROM MonHoc mh
+                    LEFT JOIN TienQuyet tq ON mh.CourseCode = tq.CourseCode
+                    WHERE mh.CourseCode IN ({placeholders})
+                """, tuple(course_codes))
+                course_details = cursor.fetchall()
             
             # Map thông tin chi tiết vào recommendations (giữ lại recommendation_group)
             course_info = {c['CourseCode']: c for c in course_details}
@@ -174,8 +202,6 @@ def dashboard():
                         rec['recommendation_group'] = saved_group
                     if saved_type:
                         rec['recommendation_type'] = saved_type
-
-        conn.close()
         
         # Tính toán thông tin về tiến độ
         credit_summary = {
@@ -221,16 +247,14 @@ def study_plan():
         is_new_student = student_id.startswith('B22')
         
         # Lấy tiến trình hiện tại
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT COUNT(*) as count FROM TienTrinh WHERE StudentID = %s", (student_id,))
-        progress_count = cursor.fetchone()['count']
-        conn.close()
+        with db.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT COUNT(*) as count FROM TienTrinh WHERE StudentID = %s", (student_id,))
+            progress_count = cursor.fetchone()['count']
         
         # Nếu là sinh viên mới hoặc chưa có tiến trình
         if is_new_student or progress_count == 0:
             # Hiển thị 5 kế hoạch đầy đủ từ HK1 Y1 đến HK1 Y5
-            plans_data = get_learning_plans_for_student(student_id)
+            plans_data = get_learning_plans(student_id, MODEL_PATH)
             
             # Tạo metadata cho 5 kế hoạch
             plan_names = [
@@ -296,7 +320,7 @@ def study_plan():
                 })
         else:
             # Sinh viên cũ: gợi ý tiếp theo để đủ 156 TC
-            plans_data = get_learning_plans_for_student(student_id)
+            plans_data = get_learning_plans(student_id, MODEL_PATH)
             
             # Lấy tiến trình hiện tại
             current_progress = get_student_progress_by_semester(student_id)
@@ -408,249 +432,35 @@ def download_plan_pdf(cluster_id):
     
     student_id = session['student_id']
     
+    if cluster_id >= len(PLAN_NAMES):
+        flash('Không tìm thấy kế hoạch', 'error')
+        return redirect(url_for('study_plan'))
+    
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-        from io import BytesIO
-        from flask import Response
-        import os
-        import platform
-        
-        # Đăng ký font tiếng Việt
-        font_registered = False
-        vietnamese_font_name = 'VietnameseFont'
-        
-        # Tìm font hỗ trợ tiếng Việt trên hệ thống
-        font_paths = []
-        
-        if platform.system() == 'Darwin':  # macOS
-            font_paths = [
-                '/System/Library/Fonts/Supplemental/Arial Unicode.ttf',
-                '/Library/Fonts/Arial Unicode.ttf',
-                '/System/Library/Fonts/Helvetica.ttc',
-                '/System/Library/Fonts/STHeiti Light.ttc',
-                '/System/Library/Fonts/STHeiti Medium.ttc',
-            ]
-        elif platform.system() == 'Windows':
-            font_paths = [
-                'C:/Windows/Fonts/arial.ttf',
-                'C:/Windows/Fonts/arialuni.ttf',
-                'C:/Windows/Fonts/times.ttf',
-                'C:/Windows/Fonts/timesi.ttf',
-            ]
-        else:  # Linux
-            font_paths = [
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
-                '/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf',
-            ]
-        
-        # Thử đăng ký font
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    # Xử lý file .ttc (TrueType Collection) trên macOS
-                    if font_path.endswith('.ttc'):
-                        # TTFont có thể xử lý TTC nhưng cần chỉ định index
-                        pdfmetrics.registerFont(TTFont(vietnamese_font_name, font_path, subfontIndex=0))
-                    else:
-                        pdfmetrics.registerFont(TTFont(vietnamese_font_name, font_path))
-                    font_registered = True
-                    print(f"✅ Đã đăng ký font: {font_path}")
-                    break
-                except Exception as e:
-                    print(f"⚠️ Không thể đăng ký font {font_path}: {e}")
-                    continue
-        
-        # Nếu không tìm thấy font hệ thống, thử dùng DejaVu Sans từ reportlab
-        if not font_registered:
-            try:
-                from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-                # Thử dùng font CJK (hỗ trợ Unicode tốt hơn)
-                pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-                vietnamese_font_name = 'STSong-Light'
-                font_registered = True
-                print("✅ Đã đăng ký font CJK")
-            except:
-                pass
-        
-        # Fallback cuối cùng: dùng Helvetica (có thể không hiển thị đúng tiếng Việt)
-        if not font_registered:
-            print("⚠️ Không tìm thấy font tiếng Việt, sử dụng Helvetica (có thể không hiển thị đúng)")
-            vietnamese_font_name = 'Helvetica'
-            font_registered = False  # Đánh dấu không có font Unicode
-        
-        # Lấy kế hoạch học tập
-        plans_data = get_learning_plans_for_student(student_id)
-        
-        if cluster_id >= len(plans_data):
-            flash('Không tìm thấy kế hoạch', 'error')
+        # File PDF đã render cho đúng phiên bản kế hoạch/model, nếu chưa có thì render ở nền
+        artifact = get_plan_pdf(student_id, cluster_id, MODEL_PATH,
+                                student_name=session.get('student_name', student_id),
+                                wait=PDF_RENDER_WAIT)
+        if artifact is None:
+            flash('PDF đang được tạo, vui lòng tải lại sau giây lát', 'info')
             return redirect(url_for('study_plan'))
         
-        plan_data = plans_data[cluster_id]
-        semesters_raw = plan_data.get('semesters', {})
-        
-        # Convert về dạng tuple keys nếu là string keys
-        semesters = {}
-        for key, value in semesters_raw.items():
-            if isinstance(key, tuple):
-                semesters[key] = value if isinstance(value, list) else value.get('courses', [])
-            elif isinstance(key, str) and '_' in key:
-                # String key format: "year_semester"
-                parts = key.split('_')
-                if len(parts) == 2:
-                    year, semester = int(parts[0]), int(parts[1])
-                    courses = value if isinstance(value, list) else value.get('courses', [])
-                    semesters[(year, semester)] = courses
-        
-        # Tạo PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                                rightMargin=2*cm, leftMargin=2*cm,
-                                topMargin=2*cm, bottomMargin=2*cm)
-        
-        # Styles với font tiếng Việt
-        styles = getSampleStyleSheet()
-        
-        # Tạo custom styles với font tiếng Việt
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontName=vietnamese_font_name,
-            fontSize=18,
-            textColor=colors.HexColor('#1f5ca9'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        normal_style = ParagraphStyle(
-            'VietnameseNormal',
-            parent=styles['Normal'],
-            fontName=vietnamese_font_name,
-            fontSize=10
-        )
-        
-        heading2_style = ParagraphStyle(
-            'VietnameseHeading2',
-            parent=styles['Heading2'],
-            fontName=vietnamese_font_name,
-            fontSize=14
-        )
-        
-        # Nội dung PDF
-        story = []
-        
-        # Tiêu đề
-        plan_names = [
-            'Kế hoạch Chuẩn (Ổn định)',
-            'Kế hoạch Nhanh (Tốt nghiệp sớm)',
-            'Kế hoạch Vừa phải (Cân bằng)',
-            'Kế hoạch Chậm (Tích lũy từ từ)',
-            'Kế hoạch Tùy chỉnh (Linh hoạt)'
-        ]
-        
-        title = Paragraph(f"KẾ HOẠCH HỌC TẬP - {plan_names[cluster_id]}", title_style)
-        story.append(title)
-        story.append(Spacer(1, 0.5*cm))
-        
-        # Thông tin sinh viên
-        info_text = f"""
-        <b>Sinh viên:</b> {session.get('student_name', student_id)} ({student_id})<br/>
-        <b>Ngày tạo:</b> {__import__('datetime').datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
-        <b>Tổng tín chỉ:</b> {plan_data.get('total_credits', 0)} / 156 TC
-        """
-        info_para = Paragraph(info_text, normal_style)
-        story.append(info_para)
-        story.append(Spacer(1, 1*cm))
-        
-        # Bảng môn học theo học kỳ
-        for (year, semester), courses in sorted(semesters.items()):
-            semester_title = Paragraph(
-                f"<b>Năm {year} - Học kỳ {semester}</b>",
-                heading2_style
-            )
-            story.append(semester_title)
-            story.append(Spacer(1, 0.3*cm))
-            
-            # Tạo bảng với Paragraph để hỗ trợ font tiếng Việt
-            table_data = [[
-                Paragraph('STT', normal_style),
-                Paragraph('Mã môn', normal_style),
-                Paragraph('Tên môn học', normal_style),
-                Paragraph('Tín chỉ', normal_style),
-                Paragraph('Điểm', normal_style)
-            ]]
-            
-            for idx, course in enumerate(courses, 1):
-                course_name = course.get('CourseName', '') or ''
-                course_code = course.get('CourseCode', '') or ''
-                credits = str(course.get('Credits', 0) or 0)
-                score = str(course.get('Score', '-') or '-')
-                
-                table_data.append([
-                    Paragraph(str(idx), normal_style),
-                    Paragraph(course_code, normal_style),
-                    Paragraph(course_name, normal_style),
-                    Paragraph(credits, normal_style),
-                    Paragraph(score, normal_style)
-                ])
-            
-            # Tính tổng tín chỉ học kỳ
-            semester_credits = sum(c.get('Credits', 0) or 0 for c in courses)
-            table_data.append([
-                Paragraph('', normal_style),
-                Paragraph('', normal_style),
-                Paragraph('<b>Tổng</b>', normal_style),
-                Paragraph(f'<b>{semester_credits}</b>', normal_style),
-                Paragraph('', normal_style)
-            ])
-            
-            table = Table(table_data, colWidths=[1*cm, 2*cm, 8*cm, 2*cm, 2*cm])
-            
-            # Tạo style cho bảng với font tiếng Việt
-            table_style = [
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f5ca9')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), vietnamese_font_name),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]
-            
-            # Thêm font cho các dòng dữ liệu
-            if font_registered:
-                table_style.extend([
-                    ('FONTNAME', (0, 1), (-1, -1), vietnamese_font_name),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ])
-            
-            table.setStyle(TableStyle(table_style))
-            
-            story.append(table)
-            story.append(Spacer(1, 0.5*cm))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        # Trả về PDF
-        return Response(
-            buffer.getvalue(),
+        # Trả về PDF (ETag theo phiên bản → trình duyệt tải lại nhận 304 nếu không đổi)
+        response = send_file(
+            artifact['path'],
             mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment;filename=KeHoach_Nhom{cluster_id}_{student_id}.pdf'
-            }
+            as_attachment=True,
+            download_name=f'KeHoach_Nhom{cluster_id}_{student_id}.pdf',
+            etag=artifact['etag'],
+            conditional=True,
+            max_age=0
         )
+        response.cache_control.private = True
+        return response
         
+    except IndexError:
+        flash('Không tìm thấy kế hoạch', 'error')
+        return redirect(url_for('study_plan'))
     except Exception as e:
         print(f"Error generating PDF: {e}")
         import traceback
@@ -668,7 +478,7 @@ def download_recommendations():
     model_path = MODEL_PATH
     
     try:
-        recs = recommend_next_courses(student_id, model_path=model_path)
+        recs = get_recommendations(student_id, model_path=model_path)
         
         # Tạo nội dung file text
         from datetime import datetime
@@ -731,32 +541,21 @@ def recommendations_hk1_nam5():
     model_path = MODEL_PATH
 
     try:
-        try:
-            conn = mysql.connector.connect(**DB_CONFIG)
-        except mysql.connector.Error as e:
-            flash('Không thể kết nối đến database. Vui lòng kiểm tra MySQL đã được khởi động trong XAMPP chưa.', 'error')
-            print(f"Database connection error: {e}")
-            return render_template('recommendations_hk1_nam5.html',
-                                 student_id=session.get('student_id'),
-                                 student_name=session.get('student_name'),
-                                 additional_recs=[])
-        
-        cursor = conn.cursor(dictionary=True)
-
         # Lấy gợi ý môn học tiếp theo
-        recs = recommend_next_courses(student_id, model_path=model_path)
+        recs = get_recommendations(student_id, model_path=model_path)
 
         # Lấy thêm thông tin chi tiết cho các môn được gợi ý
         if recs:
             course_codes = [r['CourseCode'] for r in recs]
             placeholders = ','.join(['%s'] * len(course_codes))
-            cursor.execute(f"""
-                SELECT mh.*, tq.PrerequisiteCode
-                FROM MonHoc mh
-                LEFT JOIN TienQuyet tq ON mh.CourseCode = tq.CourseCode
-                WHERE mh.CourseCode IN ({placeholders})
-            """, tuple(course_codes))
-            course_details = cursor.fetchall()
+            with db.cursor(dictionary=True) as cursor:
+                cursor.execute(f"""
+                    SELECT mh.*, tq.PrerequisiteCode
+                    FROM MonHoc mh
+                    LEFT JOIN TienQuyet tq ON mh.CourseCode = tq.CourseCode
+                    WHERE mh.CourseCode IN ({placeholders})
+                """, tuple(course_codes))
+                course_details = cursor.fetchall()
 
             course_info = {c['CourseCode']: c for c in course_details}
             for rec in recs:
@@ -769,8 +568,6 @@ def recommendations_hk1_nam5():
                     if saved_type:
                         rec['recommendation_type'] = saved_type
 
-        conn.close()
-
         # Lọc ra các môn bổ sung HK1 năm 5 (loại bỏ CT555 nếu có)
         additional_recs = [
             r for r in (recs or [])
@@ -799,14 +596,30 @@ def train():
     excel_path = request.form.get('excel_path') or None
     if not excel_path:
         return jsonify({'status': 'error', 'message': 'excel_path is required'}), 400
-    path = train_kmeans(excel_path)
-    return jsonify({'status': 'ok', 'model_path': path})
+    if not os.path.exists(excel_path):
+        return jsonify({'status': 'error', 'message': f'file not found: {excel_path}'}), 400
+    # File khác file dữ liệu mặc định chỉ dùng để train một lần → không giữ trong cache dữ liệu
+    cache_dataset = os.path.abspath(excel_path) == os.path.abspath(DEFAULT_EXCEL)
+    job = submit_training(excel_path, MODEL_PATH, cache_dataset=cache_dataset)
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job['id'],
+        'status_url': url_for('train_status', job_id=job['id'])
+    }), 202
+
+
+@app.route('/train/<job_id>', methods=['GET'])
+def train_status(job_id):
+    job = get_training_job(job_id, MODEL_PATH)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'job not found'}), 404
+    return jsonify(job)
 
 
 @app.route('/recommend', methods=['GET'])
 def recommend():
     student_id = request.args.get('student_id')
-    recs = recommend_next_courses(student_id)
+    recs = get_recommendations(student_id)
     return jsonify({'student_id': student_id, 'recommendations': recs})
 
 
@@ -876,11 +689,9 @@ def admin_login():
         return redirect(url_for('admin_login'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Admin WHERE AdminID=%s", (admin_id,))
-        admin = cursor.fetchone()
-        conn.close()
+        with db.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM Admin WHERE AdminID=%s", (admin_id,))
+            admin = cursor.fetchone()
         
         if not admin:
             flash('Tài khoản admin không đúng', 'error')
@@ -915,20 +726,16 @@ def admin_dashboard():
         return redirect(url_for('admin_login'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        
-        # Thống kê
-        cursor.execute("SELECT COUNT(*) as count FROM SinhVien")
-        student_count = cursor.fetchone()['count']
+        with db.cursor(dictionary=True) as cursor:
+            # Thống kê
+            cursor.execute("SELECT COUNT(*) as count FROM SinhVien")
+            student_count = cursor.fetchone()['count']
         
-        cursor.execute("SELECT COUNT(*) as count FROM MonHoc")
-        course_count = cursor.fetchone()['count']
+            cursor.execute("SELECT COUNT(*) as count FROM MonHoc")
+            course_count = cursor.fetchone()['count']
         
-        cursor.execute("SELECT COUNT(*) as count FROM TienTrinh")
-        progress_count = cursor.fetchone()['count']
-        
-        conn.close()
+            cursor.execute("SELECT COUNT(*) as count FROM TienTrinh")
+            progress_count = cursor.fetchone()['count']
         
         stats = {
             'students': student_count,
@@ -945,41 +752,161 @@ def admin_dashboard():
                              admin_name=session.get('admin_name'),
                              stats={'students': 0, 'courses': 0, 'progress': 0})
 
+@app.route('/admin/db-pool')
+def admin_db_pool():
+    """Số liệu pool kết nối database (kích thước, số kết nối đang dùng, thời gian chờ)"""
+    if 'is_admin' not in session:
+        return redirect(url_for('admin_login'))
+    return jsonify(db.pool_stats())
+
+@app.route('/admin/cluster-distances')
+def admin_cluster_distances():
+    """Khoảng cách đến các cluster cho nhiều sinh viên (?student_ids=a,b,c hoặc ?prefix=B2100)"""
+    if 'is_admin' not in session:
+        return redirect(url_for('admin_login'))
+    
+    student_ids = [s for s in map(normalize_student_id, request.args.get('student_ids', '').split(',')) if s]
+    prefix = normalize_student_id(request.args.get('prefix'))
+    if not student_ids and prefix:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT StudentID FROM SinhVien WHERE StudentID LIKE %s ORDER BY StudentID",
+                           (like_prefix(prefix),))
+            student_ids = [row[0] for row in cursor.fetchall()]
+    if not student_ids:
+        return jsonify({'status': 'error', 'message': 'student_ids or prefix is required'}), 400
+    
+    try:
+        distances, ids = calculate_distances_batch(student_ids, MODEL_PATH)
+    except FileNotFoundError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    nearest = distances.argmin(axis=1)
+    return jsonify({
+        'student_ids': ids,
+        'distances': distances.round(4).tolist(),
+        'nearest_cluster': nearest.tolist()
+    })
+
+@app.route('/admin/precompute', methods=['GET', 'POST'])
+def admin_precompute():
+    """Tính sẵn gợi ý + kế hoạch học tập cho mọi sinh viên (POST: chạy job nền, GET: trạng thái)"""
+    if 'is_admin' not in session:
+        return redirect(url_for('admin_login'))
+    if request.method == 'POST':
+        return jsonify(start_precompute_job(MODEL_PATH)), 202
+    return jsonify(get_precompute_status())
+
+@app.route('/admin/export-plans')
+def admin_export_plans():
+    """Tải ZIP kế hoạch học tập được gợi ý của một lớp (?lop=) hoặc danh sách sinh viên (?student_ids=)"""
+    if 'is_admin' not in session:
+        return redirect(url_for('admin_login'))
+    lop = request.args.get('lop', '').strip()
+    student_ids = [s for s in map(normalize_student_id, request.args.get('student_ids', '').split(',')) if s]
+    if not lop and not student_ids:
+        return jsonify({'error': 'Cần tham số lop hoặc student_ids'}), 400
+    
+    students = list_export_students(lop or None, student_ids or None)
+    if not students:
+        return jsonify({'error': 'Không có sinh viên nào phù hợp'}), 404
+    
+    filename = f"KeHoach_{secure_filename(lop) or 'SinhVien'}.zip"
+    return Response(
+        stream_with_context(iter_plans_zip(students, MODEL_PATH)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment;filename={filename}'}
+    )
+
+@app.route('/admin/changesets/apply', methods=['POST'])
+def admin_apply_changesets():
+    """Làm mới cache theo các change set import tăng dần chưa áp dụng (chỉ sinh viên bị ảnh hưởng)"""
+    if 'is_admin' not in session:
+        return redirect(url_for('admin_login'))
+    
+    applied = 0
+    students = set()
+    for path in sorted(glob.glob(os.path.join(CHANGESET_DIR, 'changeset_*.json'))):
+        marker = path + CHANGESET_APPLIED_SUFFIX
+        if os.path.exists(marker):
+            continue
+        try:
+            with open(path, encoding='utf-8') as f:
+                changeset = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Không đọc được change set {path}: {e}")
+            continue
+        apply_changeset(changeset)
+        students.update(changeset.get('students', []))
+        try:
+            with open(marker, 'w', encoding='utf-8'):
+                pass
+        except OSError as e:
+            print(f"⚠️  Không ghi được đánh dấu đã áp dụng {marker}: {e}")
+        applied += 1
+    
+    return jsonify({
+        'applied': applied,
+        'students': len(students),
+        'retrain_recommended': changeset_affects_bundle({'students': sorted(students)}, MODEL_PATH)
+    })
+
 @app.route('/admin/students')
 def admin_students():
     """Quản lý sinh viên"""
     if 'is_admin' not in session:
         return redirect(url_for('admin_login'))
     
+    # Phân trang keyset theo StudentID (?after=<StudentID cuối trang trước>), tìm theo tiền tố (?q=)
+    q = request.args.get('q', '').strip()
+    after = request.args.get('after', '').strip()
+    per_page = page_size_arg()
+    
+    conditions, params = [], []
+    if q:
+        conditions.append("(sv.StudentID LIKE %s OR sv.HoTen LIKE %s)")
+        params += [like_prefix(q), like_prefix(q)]
+    if after:
+        conditions.append("sv.StudentID > %s")
+        params.append(after)
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        
-        # Lấy danh sách sinh viên với thống kê
-        cursor.execute("""
-            SELECT 
-                sv.StudentID,
-                sv.HoTen,
-                sv.Email,
-                sv.GioiTinh,
-                COUNT(DISTINCT tt.CourseCode) as total_courses,
-                SUM(tt.Credits) as total_credits
-            FROM SinhVien sv
-            LEFT JOIN TienTrinh tt ON sv.StudentID = tt.StudentID AND tt.Status = 'Đã học'
-            GROUP BY sv.StudentID, sv.HoTen, sv.Email, sv.GioiTinh
-            ORDER BY sv.StudentID
-        """)
-        students = cursor.fetchall()
-        conn.close()
+        with db.cursor(dictionary=True) as cursor:
+            # Lấy một trang sinh viên với thống kê từ bảng tổng hợp SinhVienTongKet
+            cursor.execute(f"""
+                SELECT 
+                    sv.StudentID,
+                    sv.HoTen,
+                    sv.Email,
+                    sv.GioiTinh,
+                    tk.TotalCourses as total_courses,
+                    tk.CreditsEarned as total_credits
+                FROM SinhVien sv
+                LEFT JOIN SinhVienTongKet tk ON tk.StudentID = sv.StudentID
+                {where}
+                ORDER BY sv.StudentID
+                LIMIT %s
+            """, (*params, per_page + 1))
+            rows = cursor.fetchall()
+        
+        students = rows[:per_page]
+        next_after = students[-1]['StudentID'] if len(rows) > per_page else None
         
         return render_template('admin_students.html',
                              admin_name=session.get('admin_name'),
-                             students=students)
+                             students=students,
+                             q=q,
+                             per_page=per_page,
+                             is_first_page=not after,
+                             next_after=next_after)
     except Exception as e:
         flash(f'Lỗi tải danh sách sinh viên: {e}', 'error')
         return render_template('admin_students.html',
                              admin_name=session.get('admin_name'),
-                             students=[])
+                             students=[],
+                             q=q,
+                             per_page=per_page,
+                             is_first_page=True,
+                             next_after=None)
 
 @app.route('/admin/students/add', methods=['GET', 'POST'])
 def admin_add_student():
@@ -992,7 +919,7 @@ def admin_add_student():
                              admin_name=session.get('admin_name'))
     
     # POST - Xử lý thêm sinh viên
-    student_id = request.form.get('student_id', '').strip()
+    student_id = normalize_student_id(request.form.get('student_id'))
     ho_ten = request.form.get('ho_ten', '').strip()
     gioi_tinh = request.form.get('gioi_tinh', 'Nam')
     ngay_sinh = request.form.get('ngay_sinh', '2003-01-01')
@@ -1007,16 +934,12 @@ def admin_add_student():
         from werkzeug.security import generate_password_hash
         password_hash = generate_password_hash(password, method='pbkdf2:sha256')
         
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO SinhVien (StudentID, HoTen, Password, GioiTinh, NgaySinh, Email)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (student_id, ho_ten, password_hash, gioi_tinh, ngay_sinh, email))
-        
-        conn.commit()
-        conn.close()
+        with db.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO SinhVien (StudentID, HoTen, Password, GioiTinh, NgaySinh, Email)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (student_id, ho_ten, password_hash, gioi_tinh, ngay_sinh, email))
+            refresh_student_summary(cursor, [student_id])
         
         flash(f'Đã thêm sinh viên {student_id} thành công!', 'success')
         return redirect(url_for('admin_students'))
@@ -1035,30 +958,26 @@ def admin_view_student(student_id):
         return redirect(url_for('admin_login'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        
-        # Lấy thông tin sinh viên
-        cursor.execute("SELECT * FROM SinhVien WHERE StudentID = %s", (student_id,))
-        student = cursor.fetchone()
-        
-        if not student:
-            flash(f'Không tìm thấy sinh viên {student_id}', 'error')
-            return redirect(url_for('admin_students'))
-        
-        # Lấy tiến trình học tập
-        cursor.execute("""
-            SELECT CourseCode, CourseName, Year, Semester, Credits, Score, Status
-            FROM TienTrinh
-            WHERE StudentID = %s
-            ORDER BY Year, Semester
-        """, (student_id,))
-        progress = cursor.fetchall()
-        
-        # Tính tổng tín chỉ
-        total_credits = sum(p['Credits'] for p in progress if p['Status'] == 'Đã học')
-        
-        conn.close()
+        with db.cursor(dictionary=True) as cursor:
+            # Lấy thông tin sinh viên
+            cursor.execute("SELECT * FROM SinhVien WHERE StudentID = %s", (student_id,))
+            student = cursor.fetchone()
+        
+            if not student:
+                flash(f'Không tìm thấy sinh viên {student_id}', 'error')
+                return redirect(url_for('admin_students'))
+        
+            # Lấy tiến trình học tập
+            cursor.execute("""
+                SELECT CourseCode, CourseName, Year, Semester, Credits, Score, Status
+                FROM TienTrinh
+                WHERE StudentID = %s
+                ORDER BY Year, Semester
+            """, (student_id,))
+            progress = cursor.fetchall()
+        
+            # Tính tổng tín chỉ
+            total_credits = sum(p['Credits'] for p in progress if p['Status'] == 'Đã học')
         
         return render_template('admin_student_detail.html',
                              admin_name=session.get('admin_name'),
@@ -1076,16 +995,14 @@ def admin_delete_student(student_id):
         return redirect(url_for('admin_login'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # Xóa tiến trình trước
-        cursor.execute("DELETE FROM TienTrinh WHERE StudentID = %s", (student_id,))
-        # Xóa sinh viên
-        cursor.execute("DELETE FROM SinhVien WHERE StudentID = %s", (student_id,))
+        with db.cursor() as cursor:
+            # Xóa tiến trình trước
+            cursor.execute("DELETE FROM TienTrinh WHERE StudentID = %s", (student_id,))
+            # Xóa sinh viên
+            cursor.execute("DELETE FROM SinhVien WHERE StudentID = %s", (student_id,))
+            delete_student_summary(cursor, student_id)
         
-        conn.commit()
-        conn.close()
+        invalidate_student(student_id)
         
         flash(f'Đã xóa sinh viên {student_id}', 'success')
     except Exception as e:
@@ -1099,35 +1016,58 @@ def admin_courses():
     if 'is_admin' not in session:
         return redirect(url_for('admin_login'))
     
+    # Phân trang keyset theo CourseCode (?after=), tìm theo tiền tố mã / tên môn (?q=)
+    q = request.args.get('q', '').strip()
+    after = request.args.get('after', '').strip()
+    per_page = page_size_arg()
+    
+    conditions, params = [], []
+    if q:
+        conditions.append("(mh.CourseCode LIKE %s OR mh.CourseName LIKE %s)")
+        params += [like_prefix(q), like_prefix(q)]
+    if after:
+        conditions.append("mh.CourseCode > %s")
+        params.append(after)
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
+        with db.cursor(dictionary=True) as cursor:
+            # Lấy một trang môn học; số sinh viên chỉ đếm cho các môn trong trang (index theo CourseCode)
+            cursor.execute(f"""
+                SELECT 
+                    mh.CourseCode,
+                    mh.CourseName,
+                    mh.Credits,
+                    mh.Type,
+                    mh.Note,
+                    (SELECT COUNT(DISTINCT tt.StudentID) FROM TienTrinh tt
+                     WHERE tt.CourseCode = mh.CourseCode) as student_count
+                FROM MonHoc mh
+                {where}
+                ORDER BY mh.CourseCode
+                LIMIT %s
+            """, (*params, per_page + 1))
+            rows = cursor.fetchall()
         
-        # Lấy danh sách môn học với số sinh viên đang học
-        cursor.execute("""
-            SELECT 
-                mh.CourseCode,
-                mh.CourseName,
-                mh.Credits,
-                mh.Type,
-                mh.Note,
-                COUNT(DISTINCT tt.StudentID) as student_count
-            FROM MonHoc mh
-            LEFT JOIN TienTrinh tt ON mh.CourseCode = tt.CourseCode
-            GROUP BY mh.CourseCode, mh.CourseName, mh.Credits, mh.Type, mh.Note
-            ORDER BY mh.CourseCode
-        """)
-        courses = cursor.fetchall()
-        conn.close()
+        courses = rows[:per_page]
+        next_after = courses[-1]['CourseCode'] if len(rows) > per_page else None
         
         return render_template('admin_courses.html',
                              admin_name=session.get('admin_name'),
-                             courses=courses)
+                             courses=courses,
+                             q=q,
+                             per_page=per_page,
+                             is_first_page=not after,
+                             next_after=next_after)
     except Exception as e:
         flash(f'Lỗi tải danh sách môn học: {e}', 'error')
         return render_template('admin_courses.html',
                              admin_name=session.get('admin_name'),
-                             courses=[])
+                             courses=[],
+                             q=q,
+                             per_page=per_page,
+                             is_first_page=True,
+                             next_after=None)
 
 @app.route('/admin/courses/add', methods=['GET', 'POST'])
 def admin_add_course():
@@ -1151,16 +1091,15 @@ def admin_add_course():
         return redirect(url_for('admin_add_course'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
+        with db.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO MonHoc (CourseCode, CourseName, Credits, Type, Note)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (course_code, course_name, int(credits), course_type, note))
         
-        cursor.execute("""
-            INSERT INTO MonHoc (CourseCode, CourseName, Credits, Type, Note)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (course_code, course_name, int(credits), course_type, note))
-        
-        conn.commit()
-        conn.close()
+        # Danh mục môn học đổi → nạp lại danh mục, các gợi ý đã cache không còn đúng
+        invalidate_course_catalog()
+        clear_recommendation_cache()
         
         flash(f'Đã thêm môn học {course_code} thành công!', 'success')
         return redirect(url_for('admin_courses'))
@@ -1179,32 +1118,57 @@ def admin_view_course(course_code):
         return redirect(url_for('admin_login'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        
-        # Thông tin môn học
-        cursor.execute("SELECT * FROM MonHoc WHERE CourseCode = %s", (course_code,))
-        course = cursor.fetchone()
-        
-        if not course:
-            flash(f'Không tìm thấy môn học {course_code}', 'error')
-            return redirect(url_for('admin_courses'))
-        
-        # Danh sách sinh viên học môn này, nhóm theo học kỳ
-        cursor.execute("""
-            SELECT StudentID, HoTen, Year, Semester, Score, Status
-            FROM TienTrinh
-            WHERE CourseCode = %s
-            ORDER BY Year, Semester, StudentID
-        """, (course_code,))
-        students = cursor.fetchall()
-        
-        conn.close()
+        with db.cursor(dictionary=True) as cursor:
+            # Thông tin môn học
+            cursor.execute("SELECT * FROM MonHoc WHERE CourseCode = %s", (course_code,))
+            course = cursor.fetchone()
+        
+            if not course:
+                flash(f'Không tìm thấy môn học {course_code}', 'error')
+                return redirect(url_for('admin_courses'))
+        
+            cursor.execute("SELECT COUNT(DISTINCT StudentID) as count FROM TienTrinh WHERE CourseCode = %s",
+                           (course_code,))
+            student_count = cursor.fetchone()['count']
+            
+            # Một trang sinh viên học môn này theo (Year, Semester, StudentID);
+            # ?after=<Year>-<Semester>-<StudentID> của dòng cuối trang trước (index idx_tientrinh_course_term)
+            condition, params = '', [course_code]
+            after = request.args.get('after', '').strip()
+            after_key = after.split('-', 2)
+            if len(after_key) == 3 and after_key[0].isdigit() and after_key[1].isdigit():
+                year, semester, last_id = int(after_key[0]), int(after_key[1]), after_key[2]
+                condition = """
+                    AND (Year > %s OR (Year = %s AND (Semester > %s OR (Semester = %s AND StudentID > %s))))
+                """
+                params += [year, year, semester, semester, last_id]
+            else:
+                after = ''
+            
+            per_page = page_size_arg()
+            cursor.execute(f"""
+                SELECT StudentID, HoTen, Year, Semester, Score, Status
+                FROM TienTrinh
+                WHERE CourseCode = %s {condition}
+                ORDER BY Year, Semester, StudentID
+                LIMIT %s
+            """, (*params, per_page + 1))
+            rows = cursor.fetchall()
+        
+        students = rows[:per_page]
+        next_after = None
+        if len(rows) > per_page:
+            last = students[-1]
+            next_after = f"{last['Year']}-{last['Semester']}-{last['StudentID']}"
         
         return render_template('admin_course_detail.html',
                              admin_name=session.get('admin_name'),
                              course=course,
-                             students=students)
+                             students=students,
+                             student_count=student_count,
+                             per_page=per_page,
+                             is_first_page=not after,
+                             next_after=next_after)
     except Exception as e:
         flash(f'Lỗi tải thông tin môn học: {e}', 'error')
         return redirect(url_for('admin_courses'))
@@ -1216,18 +1180,22 @@ def admin_delete_course(course_code):
         return redirect(url_for('admin_login'))
     
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # Xóa tiến trình liên quan trước
-        cursor.execute("DELETE FROM TienTrinh WHERE CourseCode = %s", (course_code,))
-        # Xóa tiên quyết
-        cursor.execute("DELETE FROM TienQuyet WHERE CourseCode = %s OR PrerequisiteCode = %s", (course_code, course_code))
-        # Xóa môn học
-        cursor.execute("DELETE FROM MonHoc WHERE CourseCode = %s", (course_code,))
-        
-        conn.commit()
-        conn.close()
+        with db.cursor() as cursor:
+            # Sinh viên có học môn này cần tính lại bảng tổng hợp
+            cursor.execute("SELECT DISTINCT StudentID FROM TienTrinh WHERE CourseCode = %s", (course_code,))
+            affected_students = [row[0] for row in cursor.fetchall()]
+            # Xóa tiến trình liên quan trước
+            cursor.execute("DELETE FROM TienTrinh WHERE CourseCode = %s", (course_code,))
+            # Xóa tiên quyết
+            cursor.execute("DELETE FROM TienQuyet WHERE CourseCode = %s OR PrerequisiteCode = %s", (course_code, course_code))
+            # Xóa môn học
+            cursor.execute("DELETE FROM MonHoc WHERE CourseCode = %s", (course_code,))
+            refresh_student_summary(cursor, affected_students)
+        
+        # TienQuyet vừa thay đổi → nạp lại đồ thị tiên quyết ở lần gợi ý tiếp theo
+        invalidate_prerequisite_graph()
+        invalidate_course_catalog()
+        clear_recommendation_cache()
         
         flash(f'Đã xóa môn học {course_code}', 'success')
     except Exception as e:
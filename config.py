@@ -4,3 +4,27 @@ DB_CONFIG = {
     'password': '',
     'database': 'QuanLyHocTap'
 }
+
+# Pool kết nối dùng chung (db.py)
+DB_POOL_SIZE = 10            # số kết nối tối đa mỗi process
+DB_POOL_TIMEOUT = 10         # số giây chờ tối đa khi pool đã hết kết nối
+DB_POOL_PING_INTERVAL = 30   # kết nối rảnh lâu hơn số giây này sẽ được ping lại trước khi dùng
+
+# Cache gợi ý môn học (recommender/recommendation_cache.py)
+RECOMMENDATION_CACHE_SIZE = 2048   # số sinh viên tối đa giữ trong cache
+RECOMMENDATION_CACHE_TTL = 600     # số giây một kết quả gợi ý được dùng lại
+
+# Kết quả gợi ý / kế hoạch học tập tính sẵn (recommender/precompute.py)
+PRECOMPUTE_DIR = 'data/.cache/precomputed'   # thư mục lưu kết quả tính sẵn
+PRECOMPUTE_MAX_AGE = 86400                   # số giây tối đa một kết quả tính sẵn còn được dùng
+
+# File PDF kế hoạch học tập đã render (recommender/pdf_artifacts.py)
+PDF_CACHE_DIR = 'data/.cache/pdf'            # thư mục lưu file PDF
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024      # dung lượng tối đa, vượt quá thì xoá file cũ nhất
+PDF_RENDER_WORKERS = 2                       # số thread render PDF nền mỗi process
+PDF_RENDER_WAIT = 20                         # số giây request tải PDF chờ render xong
+PLAN_EXPORT_WORKERS = 2                      # số thread render PDF khi xuất ZIP cả lớp (dùng chung mọi lượt xuất)
+
+# Phân trang ở trang quản trị (số dòng mỗi trang)
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200  # giới hạn trên cho tham số per_page
@@ -4,6 +4,7 @@ Script tạo 3 sinh viên demo để test đầy đủ các chức năng gợi 
 import mysql.connector
 from werkzeug.security import generate_password_hash
 from config import DB_CONFIG
+from etl.student_summary import refresh_student_summary
 
 def create_demo_students():
     """Tạo 3 sinh viên demo ở các giai đoạn khác nhau"""
@@ -131,6 +132,9 @@ def create_demo_students():
     
     print(f"   ✅ Đã học đến năm 4 HK1 (~120 TC) - Sẽ gợi ý môn cho năm 4 HK2 và năm 5")
     
+    # Tính lại bảng tổng hợp SinhVienTongKet cho các sinh viên vừa ghi TienTrinh
+    refresh_student_summary(cursor, ['B2200100', 'B2200200', 'B2200300'])
+    
     conn.commit()
     cursor.close()
     conn.close()
@@ -0,0 +1,213 @@
+"""
+Pool kết nối MySQL dùng chung cho Flask app và các module gợi ý.
+
+Pool có giới hạn số kết nối (DB_POOL_SIZE), kết nối rảnh được tái sử dụng và được
+ping lại trước khi dùng nếu đã rảnh quá DB_POOL_PING_INTERVAL giây. Khi pool đã hết
+kết nối, request chờ tối đa DB_POOL_TIMEOUT giây rồi báo lỗi PoolError.
+
+Cách dùng:
+    import db
+
+    with db.cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT * FROM SinhVien WHERE StudentID=%s", (student_id,))
+        user = cursor.fetchone()
+
+    with db.connection() as conn:       # nhiều cursor trong cùng một transaction
+        ...
+
+Khối `with` kết thúc bình thường thì commit, có exception thì rollback; kết nối luôn
+được trả về pool (kèm rollback để không giữ transaction/snapshot cũ).
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import mysql.connector
+from mysql.connector import errors
+
+from config import DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL
+
+
+class ConnectionPool:
+    """Pool kết nối có giới hạn, kiểm tra sức khoẻ kết nối trước khi cho mượn."""
+
+    def __init__(self, config: Dict, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 ping_interval: float = DB_POOL_PING_INTERVAL):
+        self.config = dict(config)
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        # LIFO để kết nối vừa dùng (còn "nóng") được lấy lại trước
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'created': 0,
+            'in_use': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'discarded': 0,
+            'checkout_time_total': 0.0,
+            'checkout_time_max': 0.0
+        }
+
+    def _record(self, **changes) -> None:
+        with self._stats_lock:
+            for key, value in changes.items():
+                self._stats[key] += value
+
+    def _healthy(self, conn, idle_since: float) -> bool:
+        """Pre-ping kết nối đã rảnh lâu; kết nối vừa trả về pool thì coi là còn sống."""
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=True, attempts=1, delay=0)
+            return True
+        except errors.Error:
+            return False
+
+    def _discard(self, conn) -> None:
+        self._record(discarded=1)
+        try:
+            conn.close()
+        except errors.Error:
+            pass
+
+    def acquire(self):
+        """
+        Mượn một kết nối từ pool.
+
+        Raises:
+            mysql.connector.errors.PoolError: nếu chờ quá `timeout` giây mà không có kết nối rảnh
+        """
+        start = time.perf_counter()
+        waited = False
+        if not self._slots.acquire(blocking=False):
+            waited = True
+            if not self._slots.acquire(timeout=self.timeout):
+                self._record(waits=1, timeouts=1)
+                raise errors.PoolError(
+                    f"Hết kết nối trong pool (size={self.size}) sau {self.timeout}s chờ"
+                )
+
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    candidate, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = mysql.connector.connect(**self.config)
+                    self._record(created=1)
+                    break
+                if self._healthy(candidate, idle_since):
+                    conn = candidate
+                else:
+                    self._discard(candidate)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats['in_use'] += 1
+            self._stats['checkouts'] += 1
+            self._stats['waits'] += int(waited)
+            self._stats['checkout_time_total'] += elapsed
+            self._stats['checkout_time_max'] = max(self._stats['checkout_time_max'], elapsed)
+        return conn
+
+    def release(self, conn) -> None:
+        """Trả kết nối về pool (rollback phần chưa commit; kết nối hỏng thì bỏ đi)."""
+        try:
+            conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except errors.Error:
+            self._discard(conn)
+        finally:
+            self._record(in_use=-1)
+            self._slots.release()
+
+    def close_idle(self) -> None:
+        """Đóng mọi kết nối đang rảnh trong pool."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.close()
+            except errors.Error:
+                pass
+
+    def stats(self) -> Dict:
+        """Số liệu của pool: kích thước, số kết nối đang dùng, số lần phải chờ, độ trễ mượn kết nối."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        checkouts = stats['checkouts']
+        total = stats.pop('checkout_time_total')
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        stats['checkout_ms_avg'] = round(total / checkouts * 1000, 3) if checkouts else 0.0
+        stats['checkout_ms_max'] = round(stats.pop('checkout_time_max') * 1000, 3)
+        return stats
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Pool dùng chung của process hiện tại (tạo lại sau fork, không dùng chung socket với process cha)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool(DB_CONFIG)
+                _pool_pid = pid
+    return _pool
+
+
+@contextmanager
+def connection():
+    """Mượn một kết nối; commit khi khối `with` kết thúc bình thường, rollback khi có lỗi."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+        except errors.Error:
+            pass
+        raise
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def cursor(dictionary: bool = False):
+    """
+    Mượn kết nối và mở cursor (buffered, nên không cần đọc hết kết quả trước khi đóng).
+
+    Args:
+        dictionary: True để mỗi dòng là dict thay vì tuple
+    """
+    with connection() as conn:
+        cur = conn.cursor(dictionary=dictionary, buffered=True)
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+
+def pool_stats() -> Dict:
+    """Số liệu của pool dùng chung (dùng cho trang quản trị / giám sát)."""
+    return get_pool().stats()
@@ -0,0 +1,227 @@
+"""
+Đọc file dữ liệu sinh viên (xlsx / csv / xls) theo từng khối dòng.
+
+File lớn không bị nạp toàn bộ vào bộ nhớ: xlsx được đọc bằng openpyxl ở chế độ
+read-only (duyệt từng dòng), csv bằng pd.read_csv(chunksize=...). Riêng .xls (định
+dạng cũ, không hỗ trợ đọc tuần tự) vẫn phải đọc cả file rồi chia khối.
+
+Mỗi khối là một DataFrame đã được chuẩn hoá kiểu (xem type_student_chunk):
+    for chunk in iter_student_chunks('data/student_data_100-2.xlsx', chunk_size=50000):
+        ...
+
+Nhiều file (mỗi lớp/khoa một workbook) được đọc song song bằng process pool:
+    results = read_student_files(resolve_student_files('data/hk1_2024/'))
+    df = merge_student_frames([r['frame'] for r in results])
+"""
+import glob
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from etl.student_id import normalize_student_ids
+
+DEFAULT_CHUNK_SIZE = 50000
+
+SUPPORTED_EXTENSIONS = {'.xlsx', '.xlsm', '.xls', '.csv'}
+
+PROGRESS_KEY = ['StudentID', 'Year', 'Semester', 'CourseCode']
+
+_STRING_COLUMNS = ('StudentID', 'CourseCode', 'CourseName')
+_NUMERIC_COLUMNS = ('Year', 'Semester', 'Credits', 'Score', 'GPA')
+_BOOL_COLUMNS = ('OnTime', 'Grad')
+_BOOL_STRINGS = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def _to_bool_or_none(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, bool):
+        return value
+    return _BOOL_STRINGS.get(str(value).strip().lower(), bool(value))
+
+
+def type_student_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Chuẩn hoá kiểu một khối dữ liệu giống kết quả pd.read_excel trên file gốc.
+
+    - Bỏ dòng thiếu StudentID; StudentID được chuẩn hoá (etl/student_id.py), CourseCode/CourseName là chuỗi giữ nguyên
+    - Year, Semester, Credits, Score, GPA là số (ô lỗi → NaN)
+    - OnTime, Grad ('True'/'False', 0/1, bool) là bool; còn ô trống thì giữ None
+    """
+    if 'StudentID' in df.columns:
+        df = df[df['StudentID'].notna()]
+    df = df.copy()
+
+    for column in _STRING_COLUMNS:
+        if column in df.columns:
+            values = df[column]
+            if column == 'StudentID':
+                df[column] = normalize_student_ids(values)
+            else:
+                df[column] = values.astype(str).where(values.notna())
+    for column in _NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column in _BOOL_COLUMNS:
+        if column in df.columns and df[column].dtype != bool:
+            values = df[column].map(_to_bool_or_none)
+            df[column] = values.astype(bool) if values.notna().all() else values
+
+    return df.reset_index(drop=True)
+
+
+def _iter_xlsx(path: str, chunk_size: int, sheet_name: Optional[str]) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+
+        buffer = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_raw_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Duyệt file theo khối dòng, chưa chuẩn hoá kiểu."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Không hỗ trợ định dạng {ext} (chỉ hỗ trợ {', '.join(sorted(SUPPORTED_EXTENSIONS))})")
+
+    if ext == '.csv':
+        # StudentID/CourseCode luôn đọc dạng chuỗi để không bị chuyển thành số
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={'StudentID': str, 'CourseCode': str})
+    elif ext in ('.xlsx', '.xlsm'):
+        yield from _iter_xlsx(path, chunk_size, sheet_name)
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name or 0)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def iter_student_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Duyệt file dữ liệu sinh viên theo khối dòng đã chuẩn hoá kiểu.
+
+    Args:
+        path: Đường dẫn file .xlsx/.xlsm/.xls/.csv
+        chunk_size: Số dòng tối đa mỗi khối
+        sheet_name: Tên sheet (mặc định sheet đầu tiên), chỉ dùng cho Excel
+
+    Yields:
+        DataFrame (tối đa chunk_size dòng, có thể ít hơn sau khi bỏ dòng thiếu StudentID)
+    """
+    for chunk in iter_raw_chunks(path, chunk_size, sheet_name):
+        typed = type_student_chunk(chunk)
+        if len(typed) > 0:
+            yield typed
+
+
+def read_student_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """Đọc toàn bộ file (qua iter_student_chunks) thành một DataFrame."""
+    chunks = list(iter_student_chunks(path, chunk_size))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def resolve_student_files(path_or_pattern: str) -> List[str]:
+    """
+    Danh sách file dữ liệu từ một file, một thư mục hoặc một mẫu glob.
+
+    Args:
+        path_or_pattern: 'data/a.xlsx', 'data/hk1_2024/' hoặc 'data/hk1_2024/*.xlsx'
+
+    Returns:
+        Danh sách đường dẫn (sắp xếp theo tên) có đuôi được hỗ trợ; bỏ file tạm '~$...' của Excel
+    """
+    if os.path.isdir(path_or_pattern):
+        candidates = [os.path.join(path_or_pattern, name) for name in os.listdir(path_or_pattern)]
+    elif glob.has_magic(path_or_pattern):
+        candidates = glob.glob(path_or_pattern, recursive=True)
+    else:
+        candidates = [path_or_pattern] if os.path.exists(path_or_pattern) else []
+
+    return sorted(
+        path for path in candidates
+        if os.path.isfile(path)
+        and os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+        and not os.path.basename(path).startswith('~$')
+    )
+
+
+def _read_timed(path: str, chunk_size: int) -> Dict:
+    start = time.perf_counter()
+    frame = read_student_file(path, chunk_size)
+    return {'path': path, 'frame': frame, 'rows': len(frame),
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+def read_student_files(paths: List[str], max_workers: Optional[int] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict]:
+    """
+    Đọc nhiều file song song, mỗi file trong một process riêng.
+
+    Args:
+        paths: Danh sách file (xem resolve_student_files)
+        max_workers: Số process (mặc định min(số file, số CPU)); 1 = đọc tuần tự trong process hiện tại
+        chunk_size: Số dòng mỗi khối khi đọc từng file
+
+    Returns:
+        Danh sách dict {path, frame, rows, seconds} theo đúng thứ tự paths
+    """
+    if not paths:
+        return []
+    if max_workers is None:
+        max_workers = min(len(paths), os.cpu_count() or 1)
+
+    if max_workers <= 1 or len(paths) == 1:
+        results = []
+        for path in paths:
+            result = _read_timed(path, chunk_size)
+            print(f"📄 {os.path.basename(path)}: {result['rows']} dòng trong {result['seconds']:.2f}s")
+            results.append(result)
+        return results
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_read_timed, path, chunk_size): path for path in paths}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            print(f"📄 {os.path.basename(result['path'])}: {result['rows']} dòng trong {result['seconds']:.2f}s")
+    return [results[path] for path in paths]
+
+
+def merge_student_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Gộp dữ liệu nhiều file và bỏ dòng trùng khoá (StudentID, Year, Semester, CourseCode).
+
+    Dòng trùng giữ bản xuất hiện sau cùng, nên file đứng sau (theo thứ tự truyền vào) được ưu tiên.
+    """
+    frames = [frame for frame in frames if len(frame) > 0]
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True)
+    key = [column for column in PROGRESS_KEY if column in merged.columns]
+    if key:
+        merged = merged.drop_duplicates(subset=key, keep='last')
+    return merged.reset_index(drop=True)
@@ -3,14 +3,27 @@ Script import dữ liệu từ Excel vào MySQL Database
 Chuyển đổi dữ liệu từ student_data_100-2.xlsx vào bảng TienTrinh và SinhVien
 """
 import pandas as pd
+import numpy as np
 import mysql.connector
 from datetime import datetime
+import argparse
+import csv
+import hashlib
+import json
 import sys
 import os
+import tempfile
+import time
 
 # Thêm thư mục gốc vào path để import config
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import DB_CONFIG
+from etl.chunked_reader import (
+    DEFAULT_CHUNK_SIZE, iter_student_chunks, merge_student_frames, read_student_file,
+    read_student_files, resolve_student_files
+)
+from etl.student_id import normalize_student_id, normalize_student_ids
+from etl.student_summary import refresh_student_summary
 
 def connect_db():
     """Kết nối đến MySQL database"""
@@ -40,19 +53,24 @@ def create_database_if_not_exists(conn):
 
 def run_migration(conn, migration_file):
     """Chạy file migration SQL"""
-    cursor = conn.cursor()
+    # buffered: các lệnh kiểu "SELECT 'Column ... already exists'" không để lại kết quả chưa đọc
+    cursor = conn.cursor(buffered=True)
     try:
         with open(migration_file, 'r', encoding='utf-8') as f:
             sql_commands = f.read()
             # Tách và thực thi từng lệnh SQL
             for command in sql_commands.split(';'):
-                command = command.strip()
-                if command and not command.startswith('--'):
+                # Bỏ các dòng comment đứng trước câu lệnh trong cùng một khối
+                command = '\n'.join(
+                    line for line in command.strip().splitlines()
+                    if not line.strip().startswith('--')
+                ).strip()
+                if command:
                     try:
                         cursor.execute(command)
                     except mysql.connector.Error as err:
-                        # Bỏ qua lỗi cột đã tồn tại
-                        if 'Duplicate column name' not in str(err):
+                        # Bỏ qua lỗi cột/khoá đã tồn tại
+                        if 'Duplicate column name' not in str(err) and 'Duplicate key name' not in str(err):
                             print(f"⚠️  Warning: {err}")
         conn.commit()
         print(f"✅ Đã chạy migration: {migration_file}")
@@ -62,9 +80,11 @@ def run_migration(conn, migration_file):
         cursor.close()
 
 def load_excel_data(file_path):
-    """Đọc dữ liệu từ file Excel"""
+    """Đọc toàn bộ dữ liệu từ file Excel (hoặc CSV); file lớn nên dùng iter_student_chunks"""
     try:
-        df = pd.read_excel(file_path)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        df = read_student_file(file_path)
         print(f"✅ Đọc file Excel thành công: {len(df)} dòng dữ liệu")
         print(f"📊 Các cột: {list(df.columns)}")
         return df
@@ -86,7 +106,9 @@ def import_students(conn, df):
     skipped = 0
     
     for _, row in students.iterrows():
-        student_id = row['StudentID']
+        student_id = normalize_student_id(row['StudentID'])
+        if student_id is None:
+            continue
         
         # Kiểm tra sinh viên đã tồn tại chưa
         cursor.execute("SELECT StudentID FROM SinhVien WHERE StudentID = %s", (student_id,))
@@ -130,10 +152,11 @@ def import_progress(conn, df):
     inserted = 0
     updated = 0
     errors = 0
+    written = set()
     
     for idx, row in df.iterrows():
         try:
-            student_id = str(row['StudentID']).strip()
+            student_id = normalize_student_id(row['StudentID'])
             year = int(row['Year'])
             semester = int(row['Semester'])
             course_code = str(row['CourseCode']).strip()
@@ -197,6 +220,8 @@ def import_progress(conn, df):
                 ))
                 inserted += 1
             
+            written.add(student_id)
+            
             # Commit mỗi 100 dòng
             if (inserted + updated) % 100 == 0:
                 conn.commit()
@@ -207,19 +232,503 @@ def import_progress(conn, df):
             print(f"⚠️  Lỗi dòng {idx + 1}: {e}")
             continue
     
+    forget_row_hashes(cursor, sorted(written))
     conn.commit()
     cursor.close()
     
     print(f"✅ Import tiến trình: {inserted} mới, {updated} cập nhật, {errors} lỗi")
 
-def main():
+# ============================================
+# IMPORT HÀNG LOẠT (BULK)
+# ============================================
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Thứ tự cột khi ghi vào TienTrinh (Type và CreatedAt được gán cố định trong câu SQL)
+PROGRESS_COLUMNS = [
+    'StudentID', 'HoTen', 'Year', 'Semester', 'CourseCode', 'CourseName', 'Credits',
+    'Score', 'GPA', 'Status', 'XepLoai', 'OnTime', 'Graduated'
+]
+
+# Cần unique key (StudentID, Year, Semester, CourseCode) - migrations/003_add_tientrinh_unique_key.sql
+PROGRESS_UPSERT_SQL = """
+    INSERT INTO TienTrinh
+    (StudentID, HoTen, Year, Semester, CourseCode, CourseName, Credits,
+     Score, GPA, Status, XepLoai, OnTime, Graduated, Type, CreatedAt)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Bắt buộc', NOW())
+    ON DUPLICATE KEY UPDATE
+        CourseName = VALUES(CourseName), Credits = VALUES(Credits), Score = VALUES(Score),
+        GPA = VALUES(GPA), Status = VALUES(Status), XepLoai = VALUES(XepLoai),
+        OnTime = VALUES(OnTime), Graduated = VALUES(Graduated)
+"""
+
+_BOOL_STRINGS = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def _bool_column(series, default):
+    """Chuyển cột OnTime/Grad (bool, 'True'/'False', 0/1) sang bool; ô trống nhận giá trị mặc định."""
+    if series.dtype == bool:
+        return series
+    return series.map(
+        lambda v: _BOOL_STRINGS.get(str(v).strip().lower(), bool(v)) if pd.notna(v) else default
+    ).astype(bool)
+
+
+def prepare_progress_frame(df):
+    """
+    Chuẩn hoá dữ liệu Excel thành các dòng TienTrinh, tính Status/XepLoai theo cả cột.
+
+    Quy tắc giống import_progress: có điểm → 'Đã học', không có điểm → 'Chưa học';
+    XepLoai: >= 8.5 A, >= 7.0 B+, >= 5.5 B, >= 4.0 C+, còn lại F.
+    Dòng thiếu StudentID/Year/Semester/CourseCode/Credits bị bỏ qua (đếm là lỗi);
+    dòng trùng khoá (StudentID, Year, Semester, CourseCode) giữ dòng xuất hiện sau cùng.
+
+    Returns:
+        Tuple (DataFrame với các cột PROGRESS_COLUMNS, số dòng lỗi)
+    """
+    out = pd.DataFrame({
+        'StudentID': normalize_student_ids(df['StudentID']),
+        'Year': pd.to_numeric(df['Year'], errors='coerce'),
+        'Semester': pd.to_numeric(df['Semester'], errors='coerce'),
+        'CourseCode': df['CourseCode'].astype(str).str.strip().where(df['CourseCode'].notna()),
+        'CourseName': df['CourseName'].astype(str).str.strip(),
+        'Credits': pd.to_numeric(df['Credits'], errors='coerce'),
+        'Score': pd.to_numeric(df['Score'], errors='coerce'),
+        'GPA': pd.to_numeric(df['GPA'], errors='coerce') if 'GPA' in df.columns else np.nan
+    })
+    out['OnTime'] = _bool_column(df['OnTime'], True) if 'OnTime' in df.columns else True
+    out['Graduated'] = _bool_column(df['Grad'], False) if 'Grad' in df.columns else False
+
+    required = ['StudentID', 'Year', 'Semester', 'CourseCode', 'Credits']
+    valid = out[required].notna().all(axis=1)
+    errors = int((~valid).sum())
+    out = out[valid].copy()
+    for column in ['Year', 'Semester', 'Credits']:
+        out[column] = out[column].astype(int)
+
+    score = out['Score']
+    out['Status'] = np.where(score.notna(), 'Đã học', 'Chưa học')
+    out['XepLoai'] = np.select(
+        [score >= 8.5, score >= 7.0, score >= 5.5, score >= 4.0, score.notna()],
+        ['A', 'B+', 'B', 'C+', 'F'],
+        default=None
+    )
+    out['HoTen'] = 'Sinh viên ' + out['StudentID']
+
+    out = out.drop_duplicates(subset=['StudentID', 'Year', 'Semester', 'CourseCode'], keep='last')
+    return out[PROGRESS_COLUMNS].reset_index(drop=True), errors
+
+
+def _progress_rows(frame):
+    """Chuyển DataFrame sang list tuple cho executemany (NaN → None, numpy → kiểu Python)."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [
+        tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+        for row in frame.itertuples(index=False, name=None)
+    ]
+
+
+def _count_progress(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM TienTrinh")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+
+def _upsert_batches(conn, frame, batch_size):
+    """Ghi theo lô bằng executemany + ON DUPLICATE KEY UPDATE, commit sau mỗi lô."""
+    cursor = conn.cursor()
+    total = len(frame)
+    for start in range(0, total, batch_size):
+        batch = frame.iloc[start:start + batch_size]
+        cursor.executemany(PROGRESS_UPSERT_SQL, _progress_rows(batch))
+        conn.commit()
+        print(f"⏳ Đã xử lý {min(start + batch_size, total)}/{total} dòng...")
+    cursor.close()
+
+
+def _load_data_infile(frame):
+    """
+    Ghi qua LOAD DATA LOCAL INFILE: CSV tạm → bảng tạm → INSERT ... SELECT ... ON DUPLICATE KEY UPDATE.
+    Dùng kết nối riêng vì cần bật allow_local_infile.
+    """
+    fd, csv_path = tempfile.mkstemp(prefix='tientrinh_', suffix='.csv')
+    os.close(fd)
+    conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+    try:
+        data = frame.copy()
+        data['OnTime'] = data['OnTime'].astype(int)
+        data['Graduated'] = data['Graduated'].astype(int)
+        data.to_csv(csv_path, index=False, header=False, na_rep='NULL',
+                    quoting=csv.QUOTE_MINIMAL, lineterminator='\n', encoding='utf-8')
+
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TEMPORARY TABLE TienTrinh_Staging (
+                StudentID varchar(10), HoTen varchar(100), Year int, Semester int,
+                CourseCode varchar(10), CourseName varchar(200), Credits int,
+                Score decimal(3,1), GPA decimal(3,2), Status varchar(20), XepLoai varchar(10),
+                OnTime tinyint(1), Graduated tinyint(1)
+            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci
+        """)
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE TienTrinh_Staging
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            ({', '.join(PROGRESS_COLUMNS)})
+        """, (csv_path,))
+        cursor.execute(f"""
+            INSERT INTO TienTrinh
+            ({', '.join(PROGRESS_COLUMNS)}, Type, CreatedAt)
+            SELECT {', '.join(PROGRESS_COLUMNS)}, 'Bắt buộc', NOW() FROM TienTrinh_Staging
+            ON DUPLICATE KEY UPDATE
+                CourseName = VALUES(CourseName), Credits = VALUES(Credits), Score = VALUES(Score),
+                GPA = VALUES(GPA), Status = VALUES(Status), XepLoai = VALUES(XepLoai),
+                OnTime = VALUES(OnTime), Graduated = VALUES(Graduated)
+        """)
+        conn.commit()
+        cursor.execute("DROP TEMPORARY TABLE TienTrinh_Staging")
+        cursor.close()
+    finally:
+        conn.close()
+        os.remove(csv_path)
+
+
+def import_progress_bulk(conn, df, batch_size=DEFAULT_BATCH_SIZE, use_load_data=False):
+    """
+    Import tiến trình học tập hàng loạt vào bảng TienTrinh (thay cho SELECT + UPDATE/INSERT từng dòng).
+
+    Args:
+        conn: Kết nối database
+        df: DataFrame đọc từ Excel
+        batch_size: Số dòng mỗi lần executemany/commit
+        use_load_data: Ghi qua LOAD DATA LOCAL INFILE từ file CSV tạm (nhanh hơn với dữ liệu rất lớn);
+            nếu server không cho phép local_infile thì tự chuyển về executemany
+
+    Returns:
+        Dict thống kê: rows, inserted, updated, errors, seconds, rows_per_sec
+    """
+    start = time.perf_counter()
+    frame, errors = prepare_progress_frame(df)
+    if errors:
+        print(f"⚠️  Bỏ qua {errors} dòng thiếu StudentID/Year/Semester/CourseCode/Credits")
+
+    before = _count_progress(conn)
+    if use_load_data:
+        try:
+            _load_data_infile(frame)
+        except mysql.connector.Error as err:
+            print(f"⚠️  LOAD DATA LOCAL INFILE không dùng được ({err}), chuyển sang executemany")
+            _upsert_batches(conn, frame, batch_size)
+    else:
+        _upsert_batches(conn, frame, batch_size)
+    cursor = conn.cursor()
+    forget_row_hashes(cursor, sorted(frame['StudentID'].unique().tolist()))
+    conn.commit()
+    cursor.close()
+    after = _count_progress(conn)
+
+    elapsed = time.perf_counter() - start
+    inserted = after - before
+    stats = {
+        'rows': len(frame),
+        'inserted': inserted,
+        'updated': len(frame) - inserted,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(len(frame) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"✅ Import tiến trình: {stats['inserted']} mới, {stats['updated']} cập nhật, {errors} lỗi "
+          f"({stats['rows']} dòng trong {elapsed:.2f}s, {stats['rows_per_sec']:.0f} dòng/s)")
+    return stats
+
+PROGRESS_KEY = ['StudentID', 'Year', 'Semester', 'CourseCode']
+
+# Cần bảng TienTrinhHash - migrations/004_add_tientrinh_hash.sql
+HASH_UPSERT_SQL = """
+    INSERT INTO TienTrinhHash (StudentID, Year, Semester, CourseCode, RowHash)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE RowHash = VALUES(RowHash)
+"""
+
+DEFAULT_CHANGESET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', '.cache', 'changesets'
+)
+
+
+def row_hashes(frame):
+    """MD5 nội dung từng dòng (các cột PROGRESS_COLUMNS, ô trống → chuỗi rỗng)."""
+    text = frame[PROGRESS_COLUMNS].astype(object).where(frame[PROGRESS_COLUMNS].notna(), '')
+    joined = text.astype(str).agg('\x1f'.join, axis=1)
+    return joined.map(lambda s: hashlib.md5(s.encode('utf-8')).hexdigest())
+
+
+def forget_row_hashes(cursor, student_ids, batch_size=1000):
+    """
+    Xoá RowHash của các sinh viên vừa được ghi TienTrinh bằng chế độ khác incremental (row/bulk, setup_database).
+
+    RowHash cũ không còn khớp nội dung dòng vừa ghi: nếu giữ lại, lần import tăng dần sau với
+    file cũ sẽ coi dòng là "không đổi" và không ghi đè. Không có RowHash → dòng được coi là thay đổi.
+    Bỏ qua nếu chưa có bảng TienTrinhHash (chưa chạy migrations/004_add_tientrinh_hash.sql).
+    """
+    try:
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            cursor.execute(f"DELETE FROM TienTrinhHash WHERE StudentID IN ({', '.join(['%s'] * len(batch))})",
+                           tuple(batch))
+    except mysql.connector.Error as err:
+        if err.errno != 1146:  # ER_NO_SUCH_TABLE
+            raise
+
+
+def _existing_hashes(conn, student_ids, batch_size=1000):
+    """
+    Các dòng TienTrinh hiện có của những sinh viên này kèm RowHash (None nếu chưa từng import tăng dần).
+
+    Returns:
+        Dict (StudentID, Year, Semester, CourseCode) → RowHash | None
+    """
+    cursor = conn.cursor()
+    existing = {}
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            SELECT t.StudentID, t.Year, t.Semester, t.CourseCode, h.RowHash
+            FROM TienTrinh t
+            LEFT JOIN TienTrinhHash h
+              ON h.StudentID = t.StudentID AND h.Year = t.Year
+             AND h.Semester = t.Semester AND h.CourseCode = t.CourseCode
+            WHERE t.StudentID IN ({placeholders})
+        """, tuple(batch))
+        for student_id, year, semester, course_code, row_hash in cursor.fetchall():
+            existing[(student_id, int(year), int(semester), course_code)] = row_hash
+    cursor.close()
+    return existing
+
+
+def diff_progress(frame, existing):
+    """
+    So sánh dữ liệu mới với các dòng đang có trong database.
+
+    Chỉ các học kỳ (StudentID, Year, Semester) xuất hiện trong file mới được coi là thay thế
+    hoàn toàn: dòng cũ thuộc các học kỳ đó mà không còn trong file bị xoá; học kỳ khác giữ nguyên.
+    Dòng đã có nhưng chưa có RowHash được coi là thay đổi và ghi lại một lần. Các chế độ ghi khác
+    (row/bulk, setup_database) xoá RowHash của sinh viên chúng ghi (forget_row_hashes), nên RowHash
+    còn lại luôn khớp nội dung TienTrinh hiện tại.
+
+    Args:
+        frame: Kết quả prepare_progress_frame
+        existing: Kết quả _existing_hashes
+
+    Returns:
+        Tuple (DataFrame dòng cần thêm, DataFrame dòng cần sửa, list khoá cần xoá); hai DataFrame có cột RowHash
+    """
+    frame = frame.copy()
+    frame['RowHash'] = row_hashes(frame)
+    keys = list(frame[PROGRESS_KEY].itertuples(index=False, name=None))
+    keys = [(sid, int(year), int(sem), code) for sid, year, sem, code in keys]
+
+    is_new = np.array([key not in existing for key in keys], dtype=bool)
+    changed = np.array(
+        [not new and existing[key] != row_hash for key, new, row_hash in zip(keys, is_new, frame['RowHash'])],
+        dtype=bool
+    )
+
+    incoming = set(keys)
+    semesters = {key[:3] for key in keys}
+    deletes = sorted(key for key in existing if key[:3] in semesters and key not in incoming)
+    return frame[is_new], frame[changed], deletes
+
+
+def import_progress_incremental(conn, df, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import tăng dần: chỉ ghi các dòng TienTrinh thêm mới / thay đổi / bị xoá so với lần import trước.
+
+    Args:
+        conn: Kết nối database
+        df: DataFrame đọc từ Excel (toàn bộ dữ liệu của các học kỳ cần cập nhật)
+        batch_size: Số dòng mỗi lần executemany/commit
+
+    Returns:
+        Change set (dict, ghi được ra JSON):
+        {inserted, updated, deleted: list [StudentID, Year, Semester, CourseCode],
+         students: list mã sinh viên bị ảnh hưởng, stats: {...}}
+    """
+    start = time.perf_counter()
+    frame, errors = prepare_progress_frame(df)
+    if errors:
+        print(f"⚠️  Bỏ qua {errors} dòng thiếu StudentID/Year/Semester/CourseCode/Credits")
+
+    student_ids = sorted(frame['StudentID'].unique().tolist())
+    existing = _existing_hashes(conn, student_ids)
+    inserts, updates, deletes = diff_progress(frame, existing)
+
+    changed = pd.concat([inserts, updates])
+    if len(changed) > 0:
+        _upsert_batches(conn, changed[PROGRESS_COLUMNS], batch_size)
+
+    cursor = conn.cursor()
+    hash_rows = [
+        (sid, int(year), int(sem), code, row_hash)
+        for sid, year, sem, code, row_hash in changed[PROGRESS_KEY + ['RowHash']].itertuples(index=False, name=None)
+    ]
+    for begin in range(0, len(hash_rows), batch_size):
+        cursor.executemany(HASH_UPSERT_SQL, hash_rows[begin:begin + batch_size])
+        conn.commit()
+    for begin in range(0, len(deletes), batch_size):
+        batch = deletes[begin:begin + batch_size]
+        cursor.executemany("""
+            DELETE FROM TienTrinh WHERE StudentID = %s AND Year = %s AND Semester = %s AND CourseCode = %s
+        """, batch)
+        cursor.executemany("""
+            DELETE FROM TienTrinhHash WHERE StudentID = %s AND Year = %s AND Semester = %s AND CourseCode = %s
+        """, batch)
+        conn.commit()
+    cursor.close()
+
+    def _keys(part):
+        return [[sid, int(year), int(sem), code]
+                for sid, year, sem, code in part[PROGRESS_KEY].itertuples(index=False, name=None)]
+
+    elapsed = time.perf_counter() - start
+    affected = set(changed['StudentID']) | {key[0] for key in deletes}
+    changeset = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'inserted': _keys(inserts),
+        'updated': _keys(updates),
+        'deleted': [list(key) for key in deletes],
+        'students': sorted(affected),
+        'stats': {
+            'rows': len(frame),
+            'inserted': len(inserts),
+            'updated': len(updates),
+            'deleted': len(deletes),
+            'unchanged': len(frame) - len(changed),
+            'errors': errors,
+            'seconds': round(elapsed, 3)
+        }
+    }
+    stats = changeset['stats']
+    print(f"✅ Import tăng dần: {stats['inserted']} mới, {stats['updated']} sửa, {stats['deleted']} xoá, "
+          f"{stats['unchanged']} không đổi ({len(affected)} sinh viên bị ảnh hưởng, {elapsed:.2f}s)")
+    return changeset
+
+
+def write_changeset(changeset, directory=DEFAULT_CHANGESET_DIR):
+    """
+    Ghi change set ra file JSON (changeset_<thời gian>.json) để các cache phía sau
+    (recommender.recommendation_cache.apply_changeset, model bundle) chỉ làm mới sinh viên bị ảnh hưởng.
+
+    Returns:
+        Đường dẫn file đã ghi
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"changeset_{datetime.now():%Y%m%d_%H%M%S_%f}.json")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(changeset, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Import dữ liệu từ Excel vào MySQL Database')
+    parser.add_argument('--file',
+                        help='File Excel/CSV, thư mục hoặc mẫu glob (vd "data/hk1/*.xlsx") cần import '
+                             '(mặc định data/student_data_100-2.xlsx)')
+    parser.add_argument('--mode', choices=['bulk', 'row', 'incremental'], default='bulk',
+                        help='bulk: ghi hàng loạt (mặc định); row: SELECT + UPDATE/INSERT từng dòng như cũ; '
+                             'incremental: chỉ ghi dòng thêm/sửa/xoá so với lần trước và xuất change set')
+    parser.add_argument('--changeset-dir', default=DEFAULT_CHANGESET_DIR,
+                        help='Chế độ incremental: thư mục ghi change set JSON')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Số dòng mỗi lô ở chế độ bulk (mặc định {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--load-data', action='store_true',
+                        help='Chế độ bulk: ghi qua LOAD DATA LOCAL INFILE từ file CSV tạm')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Số dòng đọc từ file mỗi lần (mặc định {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Số process đọc file song song khi import nhiều file (mặc định: số CPU)')
+    return parser.parse_args(argv)
+
+def import_dataframe(conn, df, args):
+    """Import sinh viên + tiến trình của một DataFrame theo chế độ đã chọn, rồi cập nhật SinhVienTongKet"""
+    print("\n📝 Bước 1: Import danh sách sinh viên...")
+    import_students(conn, df)
+    
+    print("\n📝 Bước 2: Import tiến trình học tập...")
+    if args.mode == 'bulk':
+        result = import_progress_bulk(conn, df, batch_size=args.batch_size, use_load_data=args.load_data)
+        student_ids = df['StudentID'].dropna().unique()
+    elif args.mode == 'incremental':
+        result = import_progress_incremental(conn, df, batch_size=args.batch_size)
+        print(f"🧾 Change set: {write_changeset(result, args.changeset_dir)}")
+        student_ids = result['students']
+    else:
+        result = import_progress(conn, df)
+        student_ids = df['StudentID'].dropna().unique()
+    
+    print("\n📝 Bước 3: Cập nhật bảng tổng hợp SinhVienTongKet...")
+    cursor = conn.cursor()
+    refreshed = refresh_student_summary(cursor, [normalize_student_id(s) for s in student_ids])
+    conn.commit()
+    cursor.close()
+    print(f"✅ Đã cập nhật tổng hợp cho {refreshed} sinh viên")
+    return result
+
+def import_many_files(conn, paths, args):
+    """
+    Import nhiều file một lượt: đọc song song bằng process pool, gộp + bỏ trùng rồi ghi một lần.
+
+    Args:
+        conn: Kết nối database
+        paths: Danh sách file (từ resolve_student_files)
+        args: Tham số dòng lệnh (mode, batch_size, load_data, chunk_size, workers)
+
+    Returns:
+        Dict thống kê: files, rows_read, rows_merged, read_seconds, slowest_file_seconds, total_seconds
+    """
+    start = time.perf_counter()
+    print(f"\n📂 Đọc song song {len(paths)} file...")
+    results = read_student_files(paths, max_workers=args.workers, chunk_size=args.chunk_size)
+    read_seconds = time.perf_counter() - start
+    
+    rows_read = sum(result['rows'] for result in results)
+    df = merge_student_frames([result['frame'] for result in results])
+    print(f"🔗 Gộp {rows_read} dòng → {len(df)} dòng sau khi bỏ trùng")
+    
+    if len(df) > 0:
+        import_dataframe(conn, df, args)
+    
+    slowest = max((result['seconds'] for result in results), default=0.0)
+    stats = {
+        'files': len(results),
+        'rows_read': rows_read,
+        'rows_merged': len(df),
+        'read_seconds': round(read_seconds, 3),
+        'slowest_file_seconds': slowest,
+        'total_seconds': round(time.perf_counter() - start, 3)
+    }
+    print(f"\n⏱️  Thời gian đọc từng file:")
+    for result in results:
+        print(f"   {result['seconds']:>8.2f}s  {result['rows']:>8} dòng  {result['path']}")
+    print(f"⏱️  Đọc {stats['files']} file mất {stats['read_seconds']:.2f}s "
+          f"(file chậm nhất {slowest:.2f}s, tổng tuần tự {sum(r['seconds'] for r in results):.2f}s); "
+          f"toàn bộ {stats['total_seconds']:.2f}s")
+    return stats
+
+def main(argv=None):
     """Hàm chính"""
+    args = parse_args(argv)
     print("=" * 60)
     print("🚀 BẮT ĐẦU IMPORT DỮ LIỆU TỪ EXCEL VÀO DATABASE")
     print("=" * 60)
     
     # Đường dẫn file Excel
-    excel_file = os.path.join(
+    excel_file = args.file or os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
         'data',
         'student_data_100-2.xlsx'
@@ -237,20 +746,34 @@ def main():
         'migrations'
     )
     
-    # Chạy migration cập nhật schema
-    migration_file = os.path.join(migrations_dir, '002_update_tientrinh_schema.sql')
-    if os.path.exists(migration_file):
-        run_migration(conn, migration_file)
-    
-    # Đọc dữ liệu Excel
-    df = load_excel_data(excel_file)
+    # Chạy migration cập nhật schema (003: unique key cần cho chế độ bulk, 004: bảng hash cho incremental,
+    # 005: bảng tổng hợp SinhVienTongKet, 006: index cho phân trang/tìm kiếm ở trang quản trị,
+    # 007: chuẩn hoá StudentID đã lưu)
+    for migration_name in ['002_update_tientrinh_schema.sql', '003_add_tientrinh_unique_key.sql',
+                           '004_add_tientrinh_hash.sql', '005_add_sinhvien_tongket.sql',
+                           '006_add_admin_list_indexes.sql', '007_normalize_student_ids.sql']:
+        migration_file = os.path.join(migrations_dir, migration_name)
+        if os.path.exists(migration_file):
+            run_migration(conn, migration_file)
     
-    # Import dữ liệu
-    print("\n📝 Bước 1: Import danh sách sinh viên...")
-    import_students(conn, df)
+    input_files = resolve_student_files(excel_file)
+    if not input_files:
+        print(f"❌ Không tìm thấy file: {excel_file}")
+        sys.exit(1)
     
-    print("\n📝 Bước 2: Import tiến trình học tập...")
-    import_progress(conn, df)
+    if args.mode == 'incremental' and len(input_files) == 1:
+        # Tăng dần: cần đủ dữ liệu mỗi học kỳ để xác định dòng bị xoá, nên không chia khối
+        import_dataframe(conn, read_student_file(input_files[0], args.chunk_size), args)
+    elif len(input_files) > 1 or os.path.isdir(excel_file):
+        # Nhiều file (thư mục / glob): đọc song song, gộp rồi ghi một lần
+        import_many_files(conn, input_files, args)
+    else:
+        # Một file: đọc và import theo từng khối (không nạp cả file lớn vào bộ nhớ)
+        total_rows = 0
+        for chunk_no, df in enumerate(iter_student_chunks(input_files[0], args.chunk_size), start=1):
+            total_rows += len(df)
+            print(f"\n📦 Khối {chunk_no}: {len(df)} dòng (đã đọc {total_rows} dòng)")
+            import_dataframe(conn, df, args)
     
     # Thống kê
     cursor = conn.cursor()
@@ -280,5 +803,5 @@ def main():
     conn.close()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
 
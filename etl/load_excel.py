@@ -1,9 +1,9 @@
-import pandas as pd
+from etl.chunked_reader import read_student_file
 
 def load_graduate_data(excel_path):
     # use the variable excel_path (not the literal string)
-    df = pd.read_excel(excel_path)
-    df = df.dropna(subset=['StudentID'])
+    # đọc theo khối (xlsx/csv) và đã bỏ dòng thiếu StudentID
+    df = read_student_file(excel_path)
     if 'Credits' in df.columns:
         df['TotalCredits'] = df.groupby('StudentID')['Credits'].transform('sum')
     else:
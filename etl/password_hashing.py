@@ -0,0 +1,105 @@
+"""
+Hash mật khẩu hàng loạt bằng process pool.
+
+generate_password_hash('pbkdf2:sha256') cố ý tốn CPU (hàng trăm nghìn vòng lặp), nên hash
+tuần tự cho hàng chục nghìn tài khoản chỉ dùng một core. PasswordHasher chia danh sách
+thành từng lô, hash song song trên nhiều process và trả về từng lô ngay khi xong để người
+gọi ghi vào database bằng executemany:
+
+    with PasswordHasher(workers=4) as hasher:
+        for batch in hasher.iter_hashes([(student_id, password), ...]):
+            cursor.executemany("UPDATE SinhVien SET Password=%s WHERE StudentID=%s",
+                               [(hashed, student_id) for student_id, hashed in batch])
+            print(hasher.hashed, hasher.rate())
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from werkzeug.security import generate_password_hash
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256'
+DEFAULT_HASH_BATCH_SIZE = 50
+
+
+def hash_batch(items: List[Tuple[str, str]], method: str = DEFAULT_HASH_METHOD) -> List[Tuple[str, str]]:
+    """Chạy trong process con: hash một lô (khoá, mật khẩu) → (khoá, hash)."""
+    return [(key, generate_password_hash(password, method=method)) for key, password in items]
+
+
+class PasswordHasher:
+    """Process pool hash mật khẩu theo lô; dùng trong khối `with` để đóng pool khi xong."""
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = DEFAULT_HASH_BATCH_SIZE,
+                 method: str = DEFAULT_HASH_METHOD):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.batch_size = max(1, batch_size)
+        self.method = method
+        self.hashed = 0
+        self.seconds = 0.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> 'PasswordHasher':
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def rate(self) -> float:
+        """Số mật khẩu hash được mỗi giây (tính trên các lần gọi iter_hashes)."""
+        return self.hashed / self.seconds if self.seconds > 0 else 0.0
+
+    def iter_hashes(self, items: Iterable[Tuple[str, str]]) -> Iterator[List[Tuple[str, str]]]:
+        """
+        Hash các cặp (khoá, mật khẩu), trả về từng lô (khoá, hash) theo thứ tự lô nào xong trước.
+
+        Mỗi lúc chỉ có tối đa 2 × workers lô đang chờ, nên danh sách đầu vào có thể là
+        generator rất dài mà không phải giữ hết kết quả trong bộ nhớ.
+
+        Args:
+            items: Các cặp (khoá, mật khẩu), khoá thường là StudentID
+
+        Yields:
+            List (khoá, hash) của một lô
+        """
+        start = time.perf_counter()
+        base_seconds = self.seconds
+        batches = self._batches(items)
+
+        def finished(result):
+            self.hashed += len(result)
+            self.seconds = base_seconds + time.perf_counter() - start
+            return result
+
+        if self._executor is None:
+            for batch in batches:
+                yield finished(hash_batch(batch, self.method))
+            return
+
+        running = set()
+        while True:
+            while len(running) < self.workers * 2:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                running.add(self._executor.submit(hash_batch, batch, self.method))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield finished(future.result())
+
+    def _batches(self, items: Iterable[Tuple[str, str]]) -> Iterator[List[Tuple[str, str]]]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
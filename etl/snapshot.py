@@ -0,0 +1,263 @@
+"""
+Chuyển file Excel lịch sử học tập sang snapshot dạng cột (mỗi cột một file .npy).
+
+Snapshot được đặt trong thư mục `.cache/` cạnh file nguồn và được định danh bằng
+hash nội dung (sha256) của workbook. Khi đọc, các cột số và cờ được mở bằng memory-mapped
+I/O (np.load(..., mmap_mode='r')) và DataFrame dùng thẳng các mảng đó, không sao chép.
+Cột chuỗi được lưu dạng mã hoá từ điển (mảng mã int32 + danh sách giá trị khác nhau):
+pandas cần cột object, nên mỗi giá trị khác nhau chỉ tạo một lần rồi các dòng dùng chung
+tham chiếu. Chỉ khi snapshot không khớp với nội dung file Excel mới phải đọc lại file nguồn.
+
+Dùng từ dòng lệnh:
+  python3 etl/snapshot.py [data/student_data_100-2.xlsx ...]
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etl.chunked_reader import iter_student_chunks
+from etl.student_id import normalize_student_ids
+
+SNAPSHOT_FORMAT = 3  # 2: StudentID viết hoa (etl/student_id.py), 3: cột chuỗi mã hoá từ điển
+
+# Các cột được lưu trong snapshot (CourseName giữ lại cho phần gợi ý HK1 năm 5)
+SNAPSHOT_COLUMNS = ['StudentID', 'Year', 'Semester', 'CourseCode', 'CourseName',
+                    'Credits', 'Score', 'OnTime', 'Grad']
+_STRING_COLUMNS = {'StudentID', 'CourseCode', 'CourseName'}
+_INT_COLUMNS = {'Year', 'Semester', 'Credits'}
+_BOOL_COLUMNS = {'OnTime', 'Grad'}
+_BOOL_STRINGS = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Tính sha256 nội dung file (đọc theo khối để không tốn bộ nhớ)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_cache_dir(excel_path: str) -> str:
+    """Thư mục chứa snapshot: `.cache/` nằm cạnh file nguồn."""
+    return os.path.join(os.path.dirname(os.path.abspath(excel_path)), '.cache')
+
+
+def snapshot_dir(excel_path: str, content_hash: str, cache_dir: Optional[str] = None) -> str:
+    """Đường dẫn thư mục snapshot tương ứng với một phiên bản nội dung của file."""
+    name = os.path.splitext(os.path.basename(excel_path))[0]
+    return os.path.join(cache_dir or default_cache_dir(excel_path), f"{name}.{content_hash[:16]}")
+
+
+def normalize_student_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Bỏ dòng thiếu StudentID và chuẩn hoá StudentID giống khi ghi vào database (etl/student_id.py)."""
+    df = df.dropna(subset=['StudentID'])
+    df['StudentID'] = normalize_student_ids(df['StudentID'])
+    return df.reset_index(drop=True)
+
+
+def _to_bool(series: pd.Series) -> np.ndarray:
+    """Chuyển cột OnTime/Grad ('True'/'False', bool, 0/1) sang bool; giá trị trống là False."""
+    if series.dtype == bool:
+        return series.to_numpy()
+    return series.map(
+        lambda v: _BOOL_STRINGS.get(str(v).strip().lower(), False) if pd.notna(v) else False
+    ).to_numpy(dtype=bool)
+
+
+def _column_array(series: pd.Series, column: str) -> np.ndarray:
+    """Chuyển một cột DataFrame sang numpy array có kiểu cố định để lưu .npy."""
+    if column in _STRING_COLUMNS:
+        return series.fillna('').astype(str).to_numpy(dtype=str)
+    if column in _BOOL_COLUMNS:
+        return _to_bool(series)
+    values = pd.to_numeric(series, errors='coerce')
+    if column in _INT_COLUMNS and values.notna().all() and (values % 1 == 0).all():
+        return values.to_numpy(dtype=np.int32)
+    return values.to_numpy(dtype=np.float64)
+
+
+def to_snapshot_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Giữ lại các cột của snapshot với kiểu cố định (chuỗi là object, số là int32/float64, cờ là bool)."""
+    data = {}
+    for column in SNAPSHOT_COLUMNS:
+        if column in df.columns:
+            arr = _column_array(df[column], column)
+            data[column] = arr.astype(object) if arr.dtype.kind == 'U' else arr
+    return pd.DataFrame(data)
+
+
+def write_snapshot(df: pd.DataFrame, target_dir: str, source: str, content_hash: str) -> str:
+    """
+    Ghi snapshot (DataFrame từ to_snapshot_frame) vào `target_dir`.
+    Ghi vào thư mục tạm rồi rename để không bao giờ có snapshot ghi dở.
+
+    Returns:
+        Đường dẫn thư mục snapshot
+    """
+    parent = os.path.dirname(target_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        dtypes = {}
+        encoded = []
+        for column in df.columns:
+            arr = df[column].to_numpy()
+            if arr.dtype == object:
+                # Cột chuỗi: mã int32 theo dòng + các giá trị khác nhau
+                codes, uniques = pd.factorize(arr.astype(str), use_na_sentinel=False)
+                np.save(os.path.join(tmp_dir, f"{column}.codes.npy"), codes.astype(np.int32), allow_pickle=False)
+                arr = np.asarray(uniques, dtype=str)
+                encoded.append(column)
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), arr, allow_pickle=False)
+            dtypes[column] = arr.dtype.str
+
+        meta = {
+            'format': SNAPSHOT_FORMAT,
+            'source': os.path.basename(source),
+            'content_hash': content_hash,
+            'rows': int(len(df)),
+            'columns': list(df.columns),
+            'dtypes': dtypes,
+            'encoded': encoded
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        try:
+            os.replace(tmp_dir, target_dir)
+        except OSError:
+            # Worker khác đã ghi xong cùng snapshot
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _remove_stale_snapshots(target_dir)
+    return target_dir
+
+
+def _remove_stale_snapshots(current_dir: str) -> None:
+    """Xoá các snapshot cũ của cùng file nguồn."""
+    parent = os.path.dirname(current_dir)
+    stem = os.path.basename(current_dir).rsplit('.', 1)[0]
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if name.rsplit('.', 1)[0] == stem and path != current_dir and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def read_snapshot(target_dir: str, content_hash: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Đọc snapshot bằng memory-mapped I/O: cột số/cờ là mảng mmap chỉ đọc (không sao chép),
+    cột chuỗi được dựng lại từ mã hoá từ điển.
+
+    Returns:
+        DataFrame hoặc None nếu snapshot không tồn tại / không khớp hash / sai định dạng
+    """
+    meta_path = os.path.join(target_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != SNAPSHOT_FORMAT:
+            return None
+        if content_hash is not None and meta.get('content_hash') != content_hash:
+            return None
+
+        encoded = set(meta.get('encoded', []))
+        data = {}
+        for column in meta['columns']:
+            arr = np.load(os.path.join(target_dir, f"{column}.npy"), mmap_mode='r', allow_pickle=False)
+            if column in encoded:
+                # Cột chuỗi về object để hành vi giống DataFrame đọc từ Excel; các dòng
+                # cùng giá trị dùng chung một đối tượng str
+                codes = np.load(os.path.join(target_dir, f"{column}.codes.npy"), mmap_mode='r', allow_pickle=False)
+                arr = np.asarray(arr).astype(object).take(codes)
+            data[column] = arr
+        # copy=False: DataFrame giữ nguyên các mảng mmap (chỉ đọc, xem dataset_store.get_student_data)
+        return pd.DataFrame(data, columns=meta['columns'], copy=False)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️  Snapshot hỏng, sẽ đọc lại từ Excel: {target_dir} ({e})")
+        return None
+
+
+def read_student_frame(excel_path: str) -> pd.DataFrame:
+    """
+    Đọc file Excel/CSV theo từng khối thành DataFrame giống snapshot, không ghi gì ra đĩa
+    (dùng cho file chỉ đọc một lần, ví dụ file upload để train).
+    Mỗi khối được chuyển ngay sang cột có kiểu cố định nên bộ nhớ chỉ tăng theo dữ liệu đã nén.
+    """
+    frames = [to_snapshot_frame(chunk) for chunk in iter_student_chunks(excel_path)]
+    if frames:
+        return pd.concat(frames, ignore_index=True)
+    return to_snapshot_frame(pd.DataFrame(columns=SNAPSHOT_COLUMNS))
+
+
+def build_snapshot(excel_path: str, cache_dir: Optional[str] = None,
+                   content_hash: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Đọc file Excel/CSV (read_student_frame) và ghi snapshot dạng cột.
+
+    Returns:
+        Tuple (DataFrame đã chuẩn hoá, content hash)
+    """
+    content_hash = content_hash or file_content_hash(excel_path)
+    df = read_student_frame(excel_path)
+    target_dir = snapshot_dir(excel_path, content_hash, cache_dir)
+    try:
+        write_snapshot(df, target_dir, excel_path, content_hash)
+    except OSError as e:
+        # Không ghi được cache (ví dụ thư mục chỉ đọc) thì vẫn trả dữ liệu
+        print(f"⚠️  Không thể ghi snapshot {target_dir}: {e}")
+    return df, content_hash
+
+
+def load_student_snapshot(excel_path: str, cache_dir: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Tải dữ liệu học tập, ưu tiên snapshot; chỉ đọc Excel khi snapshot đã cũ.
+
+    Args:
+        excel_path: Đường dẫn đến file Excel
+        cache_dir: Thư mục chứa snapshot (mặc định `.cache/` cạnh file Excel)
+
+    Returns:
+        Tuple (DataFrame, content hash của file nguồn)
+    """
+    content_hash = file_content_hash(excel_path)
+    df = read_snapshot(snapshot_dir(excel_path, content_hash, cache_dir), content_hash)
+    if df is not None:
+        return df, content_hash
+    return build_snapshot(excel_path, cache_dir, content_hash)
+
+
+def main(paths) -> int:
+    if not paths:
+        paths = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'data', 'student_data_100-2.xlsx')]
+    for path in paths:
+        start = time.perf_counter()
+        df, content_hash = build_snapshot(path)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_snapshot(snapshot_dir(path, content_hash), content_hash)
+        load_time = time.perf_counter() - start
+
+        print(f"✅ {path}: {len(df)} dòng, hash {content_hash[:16]}")
+        print(f"   Excel → snapshot: {build_time * 1000:.0f} ms, đọc snapshot: {load_time * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
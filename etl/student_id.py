@@ -0,0 +1,32 @@
+"""
+Chuẩn hoá mã sinh viên (StudentID) trước khi ghi vào database.
+
+StudentID luôn được lưu ở dạng đã bỏ khoảng trắng đầu/cuối và viết hoa (ví dụ " b2100001 "
+→ "B2100001"), nhờ vậy đăng nhập và các truy vấn tra cứu theo khoá chính bằng
+`WHERE StudentID = %s` mà không cần bọc cột trong TRIM/UPPER (làm mất index).
+Dữ liệu cũ được chuẩn hoá một lần bởi migrations/007_normalize_student_ids.sql.
+"""
+from typing import Optional
+
+import pandas as pd
+
+
+def normalize_student_id(value) -> Optional[str]:
+    """
+    Mã sinh viên đã chuẩn hoá.
+
+    Args:
+        value: Mã sinh viên (chuỗi, số từ Excel, hoặc None)
+
+    Returns:
+        Chuỗi đã strip và viết hoa; None nếu giá trị trống
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    student_id = str(value).strip().upper()
+    return student_id or None
+
+
+def normalize_student_ids(series: pd.Series) -> pd.Series:
+    """Chuẩn hoá cả cột StudentID (ô trống giữ nguyên là NaN/None)."""
+    return series.astype(str).str.strip().str.upper().where(series.notna())
@@ -0,0 +1,70 @@
+"""
+Bảng tổng hợp SinhVienTongKet (migrations/005_add_sinhvien_tongket.sql): mỗi sinh viên một dòng
+gồm số môn đã học, tín chỉ tích lũy, GPA và học kỳ gần nhất.
+
+Danh sách sinh viên ở trang quản trị đọc bảng này thay vì GROUP BY toàn bộ TienTrinh (dashboard
+của sinh viên vẫn cộng tín chỉ từ danh sách môn đã tải, gồm cả Status 'Đã qua'); pipeline import
+và các route thêm/xoá gọi refresh_student_summary / delete_student_summary sau khi ghi.
+Các hàm nhận cursor nên dùng được với cả kết nối riêng (ETL) lẫn db.cursor() (app).
+"""
+from typing import Iterable, Optional
+
+CREATE_SUMMARY_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS SinhVienTongKet (
+        StudentID varchar(10) NOT NULL,
+        TotalCourses int NOT NULL DEFAULT 0 COMMENT 'Số môn đã học (Status = Đã học)',
+        CreditsEarned int NOT NULL DEFAULT 0 COMMENT 'Tổng tín chỉ các môn đã học',
+        GPA decimal(4,2) NULL COMMENT 'Điểm trung bình các môn đạt (Score >= 4.0)',
+        LatestYear int NULL,
+        LatestSemester int NULL,
+        UpdatedAt datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (StudentID)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+# Cùng quy tắc với truy vấn GROUP BY cũ của admin_students (môn có Status = 'Đã học')
+_REFRESH_SQL = """
+    REPLACE INTO SinhVienTongKet (StudentID, TotalCourses, CreditsEarned, GPA, LatestYear, LatestSemester)
+    SELECT
+        sv.StudentID,
+        COUNT(DISTINCT CASE WHEN tt.Status = 'Đã học' THEN tt.CourseCode END),
+        COALESCE(SUM(CASE WHEN tt.Status = 'Đã học' THEN tt.Credits END), 0),
+        AVG(CASE WHEN tt.Score >= 4.0 THEN tt.Score END),
+        FLOOR(MAX(tt.Year * 10 + tt.Semester) / 10),
+        MOD(MAX(tt.Year * 10 + tt.Semester), 10)
+    FROM SinhVien sv
+    LEFT JOIN TienTrinh tt ON tt.StudentID = sv.StudentID
+    {where}
+    GROUP BY sv.StudentID
+"""
+
+
+def refresh_student_summary(cursor, student_ids: Optional[Iterable[str]] = None, batch_size: int = 1000) -> int:
+    """
+    Tính lại dòng tổng hợp của các sinh viên (mặc định: tất cả).
+
+    Args:
+        cursor: Cursor MySQL (người gọi tự commit)
+        student_ids: Mã sinh viên cần tính lại; None = toàn bộ bảng SinhVien
+        batch_size: Số mã tối đa trong một mệnh đề IN
+
+    Returns:
+        Số sinh viên đã tính lại
+    """
+    if student_ids is None:
+        cursor.execute("DELETE FROM SinhVienTongKet WHERE StudentID NOT IN (SELECT StudentID FROM SinhVien)")
+        cursor.execute(_REFRESH_SQL.format(where=''))
+        cursor.execute("SELECT COUNT(*) FROM SinhVienTongKet")
+        return cursor.fetchone()[0]
+
+    student_ids = sorted(set(student_ids))
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(_REFRESH_SQL.format(where=f"WHERE sv.StudentID IN ({placeholders})"), tuple(batch))
+    return len(student_ids)
+
+
+def delete_student_summary(cursor, student_id: str) -> None:
+    """Xoá dòng tổng hợp khi sinh viên bị xoá."""
+    cursor.execute("DELETE FROM SinhVienTongKet WHERE StudentID = %s", (student_id,))
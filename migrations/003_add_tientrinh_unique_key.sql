@@ -0,0 +1,21 @@
+-- Migration: Thêm unique key (StudentID, Year, Semester, CourseCode) cho bảng TienTrinh
+-- Cần cho chế độ import hàng loạt (INSERT ... ON DUPLICATE KEY UPDATE) trong etl/import_excel_to_db.py
+
+USE QuanLyHocTap;
+
+-- Xoá các dòng trùng khoá (giữ dòng có ID lớn nhất, tức dòng ghi gần nhất - giống import giữ dòng sau cùng)
+DELETE t1 FROM TienTrinh t1
+JOIN TienTrinh t2
+  ON t1.StudentID = t2.StudentID
+ AND t1.Year = t2.Year
+ AND t1.Semester = t2.Semester
+ AND t1.CourseCode = t2.CourseCode
+ AND t1.ID < t2.ID;
+
+-- Thêm unique key nếu chưa có
+SET @exist := (SELECT COUNT(*) FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = 'QuanLyHocTap' AND TABLE_NAME = 'TienTrinh' AND INDEX_NAME = 'uq_tientrinh_student_course');
+SET @sqlstmt := IF(@exist > 0, 'SELECT ''Index uq_tientrinh_student_course already exists''',
+'ALTER TABLE TienTrinh ADD UNIQUE KEY uq_tientrinh_student_course (StudentID, Year, Semester, CourseCode)');
+PREPARE stmt FROM @sqlstmt;
+EXECUTE stmt;
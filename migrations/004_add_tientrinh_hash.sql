@@ -0,0 +1,14 @@
+-- Migration: Bảng băm nội dung từng dòng TienTrinh cho chế độ import tăng dần (--mode incremental)
+-- etl/import_excel_to_db.py so sánh RowHash với dữ liệu mới để chỉ ghi các dòng thêm/sửa/xoá
+
+USE QuanLyHocTap;
+
+CREATE TABLE IF NOT EXISTS TienTrinhHash (
+    StudentID varchar(10) NOT NULL,
+    Year int NOT NULL,
+    Semester int NOT NULL,
+    CourseCode varchar(10) NOT NULL,
+    RowHash char(32) NOT NULL COMMENT 'MD5 nội dung dòng lúc import',
+    UpdatedAt datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (StudentID, Year, Semester, CourseCode)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,28 @@
+-- Migration: Bảng tổng hợp theo sinh viên (số môn đã học, tín chỉ tích lũy, GPA, học kỳ gần nhất)
+-- Được cập nhật bởi etl/import_excel_to_db.py, setup_database.py và các route quản trị (etl/student_summary.py)
+
+USE QuanLyHocTap;
+
+CREATE TABLE IF NOT EXISTS SinhVienTongKet (
+    StudentID varchar(10) NOT NULL,
+    TotalCourses int NOT NULL DEFAULT 0 COMMENT 'Số môn đã học (Status = Đã học)',
+    CreditsEarned int NOT NULL DEFAULT 0 COMMENT 'Tổng tín chỉ các môn đã học',
+    GPA decimal(4,2) NULL COMMENT 'Điểm trung bình các môn đạt (Score >= 4.0)',
+    LatestYear int NULL,
+    LatestSemester int NULL,
+    UpdatedAt datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (StudentID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Tính lần đầu cho toàn bộ sinh viên
+REPLACE INTO SinhVienTongKet (StudentID, TotalCourses, CreditsEarned, GPA, LatestYear, LatestSemester)
+SELECT
+    sv.StudentID,
+    COUNT(DISTINCT CASE WHEN tt.Status = 'Đã học' THEN tt.CourseCode END),
+    COALESCE(SUM(CASE WHEN tt.Status = 'Đã học' THEN tt.Credits END), 0),
+    AVG(CASE WHEN tt.Score >= 4.0 THEN tt.Score END),
+    FLOOR(MAX(tt.Year * 10 + tt.Semester) / 10),
+    MOD(MAX(tt.Year * 10 + tt.Semester), 10)
+FROM SinhVien sv
+LEFT JOIN TienTrinh tt ON tt.StudentID = sv.StudentID
+GROUP BY sv.StudentID;
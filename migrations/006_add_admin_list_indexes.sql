@@ -0,0 +1,27 @@
+-- Migration: Index cho phân trang keyset và tìm kiếm theo tiền tố ở trang quản trị
+-- idx_sinhvien_hoten: tìm sinh viên theo đầu họ tên (StudentID đã là khoá chính)
+-- idx_monhoc_name: tìm môn học theo đầu tên môn
+-- idx_tientrinh_course_term: danh sách sinh viên của một môn theo (Year, Semester, StudentID)
+
+USE QuanLyHocTap;
+
+SET @exist := (SELECT COUNT(*) FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = 'QuanLyHocTap' AND TABLE_NAME = 'SinhVien' AND INDEX_NAME = 'idx_sinhvien_hoten');
+SET @sqlstmt := IF(@exist > 0, 'SELECT ''Index idx_sinhvien_hoten already exists''',
+'ALTER TABLE SinhVien ADD INDEX idx_sinhvien_hoten (HoTen)');
+PREPARE stmt FROM @sqlstmt;
+EXECUTE stmt;
+
+SET @exist := (SELECT COUNT(*) FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = 'QuanLyHocTap' AND TABLE_NAME = 'MonHoc' AND INDEX_NAME = 'idx_monhoc_name');
+SET @sqlstmt := IF(@exist > 0, 'SELECT ''Index idx_monhoc_name already exists''',
+'ALTER TABLE MonHoc ADD INDEX idx_monhoc_name (CourseName(100))');
+PREPARE stmt FROM @sqlstmt;
+EXECUTE stmt;
+
+SET @exist := (SELECT COUNT(*) FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = 'QuanLyHocTap' AND TABLE_NAME = 'TienTrinh' AND INDEX_NAME = 'idx_tientrinh_course_term');
+SET @sqlstmt := IF(@exist > 0, 'SELECT ''Index idx_tientrinh_course_term already exists''',
+'ALTER TABLE TienTrinh ADD INDEX idx_tientrinh_course_term (CourseCode, Year, Semester, StudentID)');
+PREPARE stmt FROM @sqlstmt;
+EXECUTE stmt;
@@ -0,0 +1,25 @@
+-- Migration: Chuẩn hoá StudentID đã lưu (bỏ khoảng trắng đầu/cuối, viết hoa) theo etl/student_id.py
+-- Sau migration này đăng nhập tra cứu thẳng theo khoá chính (WHERE StudentID = %s), không dùng TRIM(StudentID).
+-- Các bảng con được cập nhật cùng lúc nên tạm tắt kiểm tra khoá ngoại (KeHoachHocTap → SinhVien).
+-- Nếu hai mã chỉ khác nhau bởi khoảng trắng đầu dòng cùng tồn tại, UPDATE sẽ báo trùng khoá: gộp tay trước khi chạy lại.
+
+USE QuanLyHocTap;
+
+SET FOREIGN_KEY_CHECKS = 0;
+
+UPDATE SinhVien SET StudentID = UPPER(TRIM(StudentID))
+WHERE BINARY StudentID <> BINARY UPPER(TRIM(StudentID));
+
+UPDATE TienTrinh SET StudentID = UPPER(TRIM(StudentID))
+WHERE BINARY StudentID <> BINARY UPPER(TRIM(StudentID));
+
+UPDATE TienTrinhHash SET StudentID = UPPER(TRIM(StudentID))
+WHERE BINARY StudentID <> BINARY UPPER(TRIM(StudentID));
+
+UPDATE SinhVienTongKet SET StudentID = UPPER(TRIM(StudentID))
+WHERE BINARY StudentID <> BINARY UPPER(TRIM(StudentID));
+
+UPDATE KeHoachHocTap SET StudentID = UPPER(TRIM(StudentID))
+WHERE BINARY StudentID <> BINARY UPPER(TRIM(StudentID));
+
+SET FOREIGN_KEY_CHECKS = 1;
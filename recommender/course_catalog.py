@@ -0,0 +1,114 @@
+"""
+Danh mục môn học (bảng MonHoc) giữ trong bộ nhớ.
+
+Danh mục được nạp bằng một truy vấn và dùng chung cho các module gợi ý; các route
+quản trị thêm/xoá môn học gọi invalidate_course_catalog() để lần sau nạp lại.
+Môn học chỉ có trong file Excel (chưa có trong MonHoc) được lấy từ build_excel_catalog.
+"""
+import threading
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+import db
+
+
+class CourseCatalog:
+    """Tra cứu CourseCode → {CourseCode, CourseName, Credits, Type}."""
+
+    def __init__(self, rows: Iterable[Dict]):
+        self._courses: Dict[str, Dict] = {}
+        for row in rows:
+            code = row.get('CourseCode')
+            if code:
+                self._courses[code] = {
+                    'CourseCode': code,
+                    'CourseName': row.get('CourseName'),
+                    'Credits': row.get('Credits'),
+                    'Type': row.get('Type')
+                }
+
+    @classmethod
+    def load(cls) -> 'CourseCatalog':
+        """Nạp toàn bộ bảng MonHoc bằng một truy vấn."""
+        with db.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT CourseCode, CourseName, Credits, Type FROM MonHoc")
+            rows = cursor.fetchall()
+        return cls(rows)
+
+    def __contains__(self, course_code: str) -> bool:
+        return course_code in self._courses
+
+    def __len__(self) -> int:
+        return len(self._courses)
+
+    def get(self, course_code: str, fallback: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """
+        Thông tin một môn học (bản sao).
+
+        Args:
+            course_code: Mã môn
+            fallback: Danh mục phụ (ví dụ từ build_excel_catalog) dùng khi môn không có trong MonHoc
+
+        Returns:
+            Dict thông tin môn học hoặc None nếu không tìm thấy
+        """
+        course = self._courses.get(course_code)
+        if course is None and fallback is not None:
+            course = fallback.get(course_code)
+        return dict(course) if course is not None else None
+
+    def codes(self) -> List[str]:
+        """Danh sách mã môn, sắp xếp tăng dần."""
+        return sorted(self._courses)
+
+
+def build_excel_catalog(df: pd.DataFrame, year: Optional[int] = None,
+                        semester: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Danh mục môn học lấy từ dữ liệu Excel (dòng đầu tiên của mỗi CourseCode).
+
+    Args:
+        df: DataFrame lịch sử học tập (CourseCode, CourseName, Credits, Year, Semester)
+        year, semester: Chỉ lấy các dòng thuộc học kỳ này (nếu truyền)
+
+    Returns:
+        Dict CourseCode → {CourseCode, CourseName, Credits}
+    """
+    if year is not None:
+        df = df[df['Year'] == year]
+    if semester is not None:
+        df = df[df['Semester'] == semester]
+    df = df.drop_duplicates(subset=['CourseCode'], keep='first')
+
+    catalog = {}
+    for row in df.to_dict('records'):
+        code = row['CourseCode']
+        credits = row.get('Credits', 0)
+        catalog[code] = {
+            'CourseCode': code,
+            'CourseName': row.get('CourseName', str(code)),
+            'Credits': int(credits) if pd.notna(credits) else 0
+        }
+    return catalog
+
+
+_catalog: Optional[CourseCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_course_catalog() -> CourseCatalog:
+    """Lấy danh mục môn học dùng chung (nạp một lần, nạp lại sau invalidate_course_catalog)."""
+    global _catalog
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = CourseCatalog.load()
+            catalog = _catalog
+    return catalog
+
+
+def invalidate_course_catalog() -> None:
+    """Gọi sau khi bảng MonHoc thay đổi để lần truy vấn sau nạp lại danh mục."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
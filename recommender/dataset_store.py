@@ -0,0 +1,122 @@
+"""
+Kho dữ liệu dùng chung cho file Excel lịch sử học tập của sinh viên.
+
+Workbook chỉ được đọc một lần cho mỗi phiên bản file (mtime + size) và được giữ
+trong bộ nhớ. Các module gợi ý nhận một view chỉ đọc thay vì gọi pd.read_excel
+ở mỗi request. Khi file đổi, dữ liệu được nạp từ snapshot dạng cột (etl/snapshot.py)
+và chỉ đọc lại Excel nếu snapshot đã cũ.
+"""
+import os
+import threading
+import pandas as pd
+from typing import Callable, Dict, Tuple
+from etl.snapshot import file_content_hash, load_student_snapshot, read_student_frame
+
+
+DEFAULT_EXCEL_PATH = 'data/student_data_100-2.xlsx'
+
+_lock = threading.RLock()
+_entries: Dict[str, Dict] = {}
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """Trả về (mtime_ns, size) của file, dùng để phát hiện file đã thay đổi."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _get_entry(excel_path: str) -> Dict:
+    """Lấy entry trong cache, nạp lại nếu file đã đổi mtime/size."""
+    key = os.path.abspath(excel_path)
+    signature = _file_signature(key)
+
+    entry = _entries.get(key)
+    if entry is not None and entry['signature'] == signature:
+        return entry
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry['signature'] == signature:
+            return entry
+
+        # StudentID đã được chuẩn hoá khi tạo snapshot
+        frame, content_hash = load_student_snapshot(key)
+        entry = {
+            'signature': signature,
+            'version': content_hash[:16],
+            'frame': frame,
+            'derived': {}
+        }
+        _entries[key] = entry
+        return entry
+
+
+def get_student_data(excel_path: str = DEFAULT_EXCEL_PATH) -> pd.DataFrame:
+    """
+    Lấy dữ liệu học tập từ file Excel (đã cache).
+
+    DataFrame trả về là bản sao nông (shallow copy) của dữ liệu dùng chung:
+    có thể thêm/gán lại cột, nhưng không được sửa giá trị tại chỗ (.loc, .iloc, inplace=True).
+
+    Args:
+        excel_path: Đường dẫn đến file Excel
+
+    Returns:
+        DataFrame với StudentID đã được chuẩn hoá thành string
+    """
+    return _get_entry(excel_path)['frame'].copy(deep=False)
+
+
+def read_student_data(excel_path: str) -> Tuple[pd.DataFrame, str]:
+    """
+    Đọc dữ liệu của một file dùng một lần (ví dụ file upload để train) mà không thêm vào cache
+    và không ghi snapshot vào `.cache/`. Nếu file đang có sẵn trong cache thì dùng lại.
+
+    Returns:
+        Tuple (DataFrame, phiên bản dữ liệu giống get_dataset_version)
+    """
+    key = os.path.abspath(excel_path)
+    entry = _entries.get(key)
+    if entry is not None and entry['signature'] == _file_signature(key):
+        return entry['frame'].copy(deep=False), entry['version']
+    return read_student_frame(key), file_content_hash(key)[:16]
+
+
+def get_derived(excel_path: str, name: str, builder: Callable[[pd.DataFrame], object]):
+    """
+    Lấy đối tượng dẫn xuất từ dữ liệu Excel (bảng đã lọc, ma trận, index...).
+
+    `builder` chỉ được gọi một lần cho mỗi phiên bản file; kết quả được giữ lại
+    cho tới khi file thay đổi.
+
+    Args:
+        excel_path: Đường dẫn đến file Excel
+        name: Tên định danh của đối tượng dẫn xuất
+        builder: Hàm nhận DataFrame gốc và trả về đối tượng dẫn xuất
+
+    Returns:
+        Đối tượng do `builder` tạo ra (dùng chung, không được sửa)
+    """
+    entry = _get_entry(excel_path)
+    derived = entry['derived']
+    if name not in derived:
+        with _lock:
+            if name not in derived:
+                derived[name] = builder(entry['frame'])
+    return derived[name]
+
+
+def get_derived_frame(excel_path: str, name: str, builder: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+    """Giống get_derived nhưng trả về view chỉ đọc của DataFrame dẫn xuất."""
+    return get_derived(excel_path, name, builder).copy(deep=False)
+
+
+def get_dataset_version(excel_path: str = DEFAULT_EXCEL_PATH) -> str:
+    """Trả về phiên bản (hash nội dung) của dữ liệu hiện đang được cache."""
+    return _get_entry(excel_path)['version']
+
+
+def clear_cache() -> None:
+    """Xoá toàn bộ dữ liệu đã cache (dùng sau khi upload file mới hoặc khi test)."""
+    with _lock:
+        _entries.clear()
@@ -2,25 +2,28 @@
 Module K-Means Clustering để phân nhóm sinh viên và tính khoảng cách đến các cluster.
 Tạo 5 kế hoạch học tập dựa trên sinh viên trội nhất mỗi cluster.
 """
-import mysql.connector
-import joblib
 import os
 import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from config import DB_CONFIG
+import db
+from etl.student_id import normalize_student_id, normalize_student_ids
+from recommender.dataset_store import get_student_data, get_dataset_version
+from recommender.course_catalog import get_course_catalog
+from recommender.model_registry import get_model_registry
+from recommender.train_model import (
+    BUNDLE_FORMAT,
+    build_feature_matrix,
+    compute_student_gpas,
+    compute_top_students
+)
 from typing import List, Dict, Tuple, Optional
 
 
 def get_all_courses() -> List[str]:
-    """Lấy danh sách tất cả mã môn học từ database."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT CourseCode FROM MonHoc ORDER BY CourseCode")
-    courses = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return courses
+    """Lấy danh sách tất cả mã môn học (từ danh mục MonHoc đã nạp sẵn)."""
+    return get_course_catalog().codes()
 
 
 def get_student_feature_vector(student_id: str) -> np.ndarray:
@@ -35,19 +38,16 @@ def get_student_feature_vector(student_id: str) -> np.ndarray:
     """
     all_courses = get_all_courses()
     
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor(dictionary=True)
-    
-    # Lấy các môn đã học và đạt (Score >= 4.0 hoặc Status = 'Đã qua')
-    cursor.execute("""
-        SELECT CourseCode, Credits 
-        FROM TienTrinh 
-        WHERE StudentID = %s 
-        AND (Score >= 4.0 OR Status IN ('Đã học', 'Đã qua'))
-    """, (student_id,))
-    
-    passed_courses = {row['CourseCode']: row['Credits'] or 0 for row in cursor.fetchall()}
-    conn.close()
+    with db.cursor(dictionary=True) as cursor:
+        # Lấy các môn đã học và đạt (Score >= 4.0 hoặc Status = 'Đã qua')
+        cursor.execute("""
+            SELECT CourseCode, Credits 
+            FROM TienTrinh 
+            WHERE StudentID = %s 
+            AND (Score >= 4.0 OR Status IN ('Đã học', 'Đã qua'))
+        """, (student_id,))
+        
+        passed_courses = {row['CourseCode']: row['Credits'] or 0 for row in cursor.fetchall()}
     
     # Tạo feature vector
     feature_vector = np.array([
@@ -59,25 +59,137 @@ def get_student_feature_vector(student_id: str) -> np.ndarray:
 
 def load_kmeans_model(model_path: str = 'models/kmeans_model.pkl') -> Tuple[KMeans, StandardScaler]:
     """
-    Load K-Means model và scaler.
+    Load K-Means model và scaler (bản giữ trong bộ nhớ của model_registry, chỉ nạp lại khi có phiên bản mới).
     
     Returns:
         Tuple (kmeans_model, scaler)
     """
-    if not os.path.exists(model_path):
+    entry = get_model_registry(model_path).load()
+    if entry is None:
         raise FileNotFoundError(f"Model không tồn tại: {model_path}")
     
-    model = joblib.load(model_path)
-    
-    # Load scaler nếu có
-    scaler_path = model_path.replace('.pkl', '_scaler.pkl')
-    if os.path.exists(scaler_path):
-        scaler = joblib.load(scaler_path)
-    else:
+    scaler = entry['scaler']
+    if scaler is None:
         # Tạo scaler mới nếu chưa có
         scaler = StandardScaler()
     
-    return model, scaler
+    return entry['model'], scaler
+
+
+def load_kmeans_bundle(model_path: str = 'models/kmeans_model.pkl') -> Optional[Dict]:
+    """
+    Load bundle do train_kmeans lưu cùng model (centroids, scaler, nhãn cluster, GPA, top student...).
+    Bundle thuộc cùng phiên bản với model trong model_registry.
+    
+    Returns:
+        Dict bundle, hoặc None nếu chưa có bundle (model train bằng phiên bản cũ)
+    """
+    try:
+        entry = get_model_registry(model_path).load()
+    except Exception as e:
+        print(f"⚠️  Không đọc được model {model_path}: {e}")
+        return None
+    bundle = entry['bundle'] if entry is not None else None
+    if not isinstance(bundle, dict) or bundle.get('format') != BUNDLE_FORMAT:
+        return None
+    return bundle
+
+
+def get_model_courses(model_path: str = 'models/kmeans_model.pkl') -> List[str]:
+    """
+    Thứ tự cột (mã môn) của feature matrix lúc train model.
+
+    Danh mục MonHoc có thể đổi sau khi train (thêm/xoá môn), nên feature lúc request phải dựng
+    theo danh sách môn lưu trong bundle để scaler/model nhận đúng số chiều. Model train bằng
+    phiên bản cũ (chưa có bundle) thì dùng danh mục hiện tại.
+    """
+    bundle = load_kmeans_bundle(model_path)
+    if bundle is not None and bundle.get('all_courses'):
+        return list(bundle['all_courses'])
+    return get_all_courses()
+
+
+def changeset_affects_bundle(changeset: Dict, model_path: str = 'models/kmeans_model.pkl') -> bool:
+    """
+    Change set của import tăng dần có làm bundle (nhãn cluster, GPA, top student) lỗi thời không.
+    
+    Chỉ sinh viên đã có trong bundle mới ảnh hưởng; sinh viên mới chỉ được tính khi train lại.
+    
+    Returns:
+        True nếu nên train lại model
+    """
+    bundle = load_kmeans_bundle(model_path)
+    if bundle is None:
+        return False
+    trained = set(bundle.get('student_ids', []))
+    return any(student_id in trained for student_id in changeset.get('students', []))
+
+
+def build_passed_feature_matrix(student_ids: List[str], all_courses: List[str],
+                                batch_size: int = 1000) -> np.ndarray:
+    """
+    Feature matrix (số sinh viên x số môn) từ TienTrinh cho nhiều sinh viên, cùng quy tắc với
+    get_student_feature_vector nhưng chỉ một truy vấn IN (chia lô batch_size mã) và gán ô theo mảng.
+    
+    Args:
+        student_ids: Thứ tự hàng (mã đã chuẩn hoá, không trùng - xem etl.student_id)
+        all_courses: Thứ tự cột
+        batch_size: Số mã sinh viên tối đa trong một mệnh đề IN
+        
+    Returns:
+        numpy array shape (len(student_ids), len(all_courses)); sinh viên không có dữ liệu là hàng 0
+    """
+    rows = []
+    with db.cursor() as cursor:
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"""
+                SELECT StudentID, CourseCode, Credits
+                FROM TienTrinh
+                WHERE StudentID IN ({placeholders})
+                AND (Score >= 4.0 OR Status IN ('Đã học', 'Đã qua'))
+            """, tuple(batch))
+            rows.extend(cursor.fetchall())
+    
+    X = np.zeros((len(student_ids), len(all_courses)))
+    if not rows:
+        return X
+    
+    data = pd.DataFrame(rows, columns=['StudentID', 'CourseCode', 'Credits'])
+    # Collation của MySQL không phân biệt hoa/thường → so khớp theo mã đã chuẩn hoá
+    row_idx = pd.Index(student_ids).get_indexer(normalize_student_ids(data['StudentID']))
+    col_idx = pd.Index(list(all_courses)).get_indexer(data['CourseCode'])
+    credits = pd.to_numeric(data['Credits'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    mask = (row_idx >= 0) & (col_idx >= 0)
+    X[row_idx[mask], col_idx[mask]] = credits[mask]
+    return X
+
+
+def calculate_distances_batch(student_ids: List[str],
+                              model_path: str = 'models/kmeans_model.pkl') -> Tuple[np.ndarray, List[str]]:
+    """
+    Khoảng cách từ nhiều sinh viên đến tâm mọi cluster (ví dụ cả một lớp) trong một lượt.
+    
+    Args:
+        student_ids: Danh sách mã sinh viên (được chuẩn hoá; mã trùng chỉ tính một lần)
+        model_path: Đường dẫn đến model
+        
+    Returns:
+        Tuple (ma trận khoảng cách Euclidean shape (N, số cluster), danh sách StudentID theo hàng)
+    """
+    model, scaler = load_kmeans_model(model_path)
+    ids = list(dict.fromkeys(filter(None, (normalize_student_id(s) for s in student_ids))))
+    if not ids:
+        return np.zeros((0, len(model.cluster_centers_))), ids
+    
+    X = build_passed_feature_matrix(ids, get_model_courses(model_path))
+    X_normalized = scaler.transform(X)
+    
+    # Ma trận N x K bằng broadcasting: (N, 1, D) - (1, K, D)
+    centers = model.cluster_centers_
+    distances = np.linalg.norm(X_normalized[:, None, :] - centers[None, :, :], axis=2)
+    return distances, ids
 
 
 def calculate_distance_to_clusters(student_id: str, model_path: str = 'models/kmeans_model.pkl') -> Dict[int, float]:
@@ -92,22 +204,8 @@ def calculate_distance_to_clusters(student_id: str, model_path: str = 'models/km
         Dict với key là cluster_id (0-4), value là khoảng cách (Euclidean distance)
     """
     try:
-        model, scaler = load_kmeans_model(model_path)
-        feature_vector = get_student_feature_vector(student_id)
-        
-        # Normalize feature vector
-        feature_normalized = scaler.transform([feature_vector])[0]
-        
-        # Lấy tâm của các cluster
-        cluster_centers = model.cluster_centers_
-        
-        # Tính khoảng cách đến mỗi cluster
-        distances = {}
-        for cluster_id in range(len(cluster_centers)):
-            distance = np.linalg.norm(feature_normalized - cluster_centers[cluster_id])
-            distances[cluster_id] = float(distance)
-        
-        return distances
+        distances, _ = calculate_distances_batch([student_id], model_path)
+        return {cluster_id: float(distance) for cluster_id, distance in enumerate(distances[0])}
     except Exception as e:
         print(f"Lỗi tính khoảng cách: {e}")
         return {i: 999.0 for i in range(5)}
@@ -128,10 +226,16 @@ def get_top_student_per_cluster(excel_path: str = 'data/student_data_100-2.xlsx'
     try:
         # Load model
         model_path = 'models/kmeans_model.pkl'
-        if not os.path.exists(model_path):
+        if not get_model_registry(model_path).exists():
             print(f"⚠️  Model chưa tồn tại: {model_path}. Cần train model trước.")
             return {i: None for i in range(5)}
         
+        # Dùng kết quả đã tính sẵn lúc train nếu bundle khớp với dữ liệu hiện tại
+        bundle = load_kmeans_bundle(model_path)
+        if bundle is not None and bundle.get('use_graduated_only') == use_graduated_only:
+            if not os.path.exists(excel_path) or bundle.get('dataset_version') == get_dataset_version(excel_path):
+                return dict(bundle['top_students'])
+        
         model, scaler = load_kmeans_model(model_path)
         
         # Đọc dữ liệu từ Excel
@@ -139,9 +243,7 @@ def get_top_student_per_cluster(excel_path: str = 'data/student_data_100-2.xlsx'
             print(f"⚠️  File Excel không tồn tại: {excel_path}")
             return {i: None for i in range(5)}
         
-        df = pd.read_excel(excel_path)
-        df = df.dropna(subset=['StudentID'])
-        df['StudentID'] = df['StudentID'].astype(str).str.strip()
+        df = get_student_data(excel_path)
         
         # Nếu chỉ dùng sinh viên tốt nghiệp, lọc dữ liệu
         if use_graduated_only:
@@ -156,68 +258,20 @@ def get_top_student_per_cluster(excel_path: str = 'data/student_data_100-2.xlsx'
             # Chỉ giữ lại dữ liệu của sinh viên tốt nghiệp
             df = df[df['StudentID'].isin(graduated_students)]
         
-        # Lấy danh sách tất cả môn học
-        all_courses = get_all_courses()
-        
-        # Tính feature vector cho mỗi sinh viên và assign cluster
-        student_clusters = {}
-        student_gpas = {}
+        # Các môn theo đúng thứ tự cột lúc train
+        all_courses = get_model_courses(model_path)
         
-        unique_students = df['StudentID'].unique()
-        print(f"👥 Xử lý {len(unique_students)} sinh viên để tìm top student")
+        # Tính feature matrix cho tất cả sinh viên và assign cluster trong một lượt
+        X, student_ids = build_feature_matrix(df, all_courses)
+        print(f"👥 Xử lý {len(student_ids)} sinh viên để tìm top student")
+        if not student_ids:
+            return {i: None for i in range(5)}
         
-        for student_id in unique_students:
-            try:
-                # Lấy dữ liệu của sinh viên này
-                student_data = df[df['StudentID'] == student_id]
-                
-                # Tạo feature vector
-                passed_courses = {}
-                for _, row in student_data.iterrows():
-                    course_code = str(row.get('CourseCode', ''))
-                    if course_code in all_courses:
-                        score = float(row.get('Score', 0)) if pd.notna(row.get('Score')) else 0
-                        credits = float(row.get('Credits', 0)) if pd.notna(row.get('Credits')) else 0
-                        if score >= 4.0:
-                            passed_courses[course_code] = credits
-                
-                feature_vector = np.array([
-                    passed_courses.get(course, 0) for course in all_courses
-                ])
-                
-                # Normalize và predict cluster
-                if len(feature_vector) == len(all_courses):
-                    feature_normalized = scaler.transform([feature_vector])[0]
-                    cluster_id = model.predict([feature_normalized])[0]
-                    
-                    student_clusters[student_id] = cluster_id
-                    
-                    # Tính GPA trung bình
-                    scores = student_data[student_data['Score'] >= 4.0]['Score'].values
-                    if len(scores) > 0:
-                        student_gpas[student_id] = float(np.mean(scores))
-                    else:
-                        student_gpas[student_id] = 0.0
-                    
-            except Exception as e:
-                print(f"Lỗi xử lý sinh viên {student_id}: {e}")
-                continue
+        labels = model.predict(scaler.transform(X))
+        gpas = compute_student_gpas(df, student_ids)
         
         # Tìm sinh viên trội nhất mỗi cluster
-        top_students = {}
-        for cluster_id in range(5):
-            cluster_students = [
-                (sid, gpa) for sid, gpa in student_gpas.items()
-                if student_clusters.get(sid) == cluster_id
-            ]
-            if cluster_students:
-                top_student = max(cluster_students, key=lambda x: x[1])
-                top_students[cluster_id] = top_student[0]
-            else:
-                # Fallback: lấy sinh viên đầu tiên nếu không có
-                top_students[cluster_id] = None
-        
-        return top_students
+        return compute_top_students(student_ids, labels, gpas, n_clusters=5)
         
     except Exception as e:
         print(f"Lỗi lấy sinh viên trội nhất: {e}")
@@ -236,18 +290,15 @@ def get_student_progress_by_semester(student_id: str) -> Dict[Tuple[int, int], L
     Returns:
         Dict với key là (Year, Semester), value là list các môn học
     """
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor(dictionary=True)
-    
-    cursor.execute("""
-        SELECT Year, Semester, CourseCode, CourseName, Credits, Score, Status
-        FROM TienTrinh
-        WHERE StudentID = %s
-        ORDER BY Year, Semester
-    """, (student_id,))
-    
-    records = cursor.fetchall()
-    conn.close()
+    with db.cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT Year, Semester, CourseCode, CourseName, Credits, Score, Status
+            FROM TienTrinh
+            WHERE StudentID = %s
+            ORDER BY Year, Semester
+        """, (student_id,))
+        
+        records = cursor.fetchall()
     
     # Nhóm theo (Year, Semester)
     grouped = {}
@@ -0,0 +1,200 @@
+"""
+Kho model K-Means có phiên bản, nạp một lần cho mỗi worker.
+
+Mỗi lần train tạo một thư mục phiên bản mới cạnh model, rồi trỏ con trỏ CURRENT sang
+nó bằng os.replace (nguyên tử):
+
+    models/kmeans_model_versions/
+        CURRENT                             ← "20250101_120000_123456_ab12cd"
+        20250101_120000_123456_ab12cd/
+            model.pkl  scaler.pkl  bundle.pkl
+
+Mỗi worker giữ một bản model trong bộ nhớ và chỉ unpickle lại khi CURRENT đổi (một
+os.stat mỗi lần gọi). Nếu chưa có CURRENT, kho đọc các file cũ kmeans_model.pkl /
+kmeans_model_scaler.pkl / kmeans_model_bundle.pkl để tương thích với model train trước đây.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import joblib
+from datetime import datetime
+from typing import Dict, Hashable, Optional
+
+KEEP_VERSIONS = 3
+POINTER_NAME = 'CURRENT'
+MODEL_FILE = 'model.pkl'
+SCALER_FILE = 'scaler.pkl'
+BUNDLE_FILE = 'bundle.pkl'
+
+
+def _stat_signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class ModelRegistry:
+    """Các phiên bản của một model (theo đường dẫn model cũ, ví dụ models/kmeans_model.pkl)."""
+
+    def __init__(self, model_path: str, keep: int = KEEP_VERSIONS):
+        self.model_path = os.path.abspath(model_path)
+        self.root = os.path.splitext(self.model_path)[0] + '_versions'
+        self.pointer_path = os.path.join(self.root, POINTER_NAME)
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._loaded = None  # (signature, entry)
+
+    # ---- Đường dẫn ----
+
+    def legacy_paths(self) -> Dict[str, str]:
+        """Đường dẫn các file model/scaler/bundle kiểu cũ (nằm cạnh nhau trong models/)."""
+        return {
+            'model': self.model_path,
+            'scaler': self.model_path.replace('.pkl', '_scaler.pkl'),
+            'bundle': self.model_path.replace('.pkl', '_bundle.pkl')
+        }
+
+    def version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def current_version(self) -> Optional[str]:
+        """Tên phiên bản CURRENT đang trỏ tới, None nếu chưa publish phiên bản nào."""
+        try:
+            with open(self.pointer_path, encoding='utf-8') as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version or None
+
+    def _signature(self) -> Optional[tuple]:
+        signature = _stat_signature(self.pointer_path)
+        if signature is not None:
+            return ('current',) + signature
+        signature = _stat_signature(self.model_path)
+        if signature is not None:
+            return ('legacy',) + signature
+        return None
+
+    def version(self) -> Hashable:
+        """Định danh phiên bản model hiện tại (đổi mỗi khi có model mới); None nếu chưa có model."""
+        return self._signature()
+
+    def exists(self) -> bool:
+        return self._signature() is not None
+
+    # ---- Ghi ----
+
+    def publish(self, model, scaler, bundle: Optional[Dict] = None) -> str:
+        """
+        Lưu một phiên bản mới rồi chuyển CURRENT sang phiên bản đó.
+
+        Thư mục phiên bản được ghi đầy đủ trước khi CURRENT đổi, nên worker đang phục vụ
+        request luôn thấy trọn vẹn phiên bản cũ hoặc phiên bản mới.
+
+        Returns:
+            Tên phiên bản mới
+        """
+        # Tên phiên bản sắp xếp theo thời gian (đến micro giây) để prune giữ đúng các bản mới nhất
+        version = f"{datetime.now():%Y%m%d_%H%M%S_%f}_{uuid.uuid4().hex[:6]}"
+        directory = self.version_dir(version)
+        os.makedirs(directory)
+        joblib.dump(model, os.path.join(directory, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(directory, SCALER_FILE))
+        if bundle is not None:
+            joblib.dump(bundle, os.path.join(directory, BUNDLE_FILE))
+
+        fd, tmp_path = tempfile.mkstemp(prefix='.CURRENT_', dir=self.root)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, self.pointer_path)
+
+        self.prune()
+        return version
+
+    def prune(self) -> None:
+        """Xoá các phiên bản cũ, giữ lại `keep` phiên bản mới nhất (luôn giữ CURRENT)."""
+        current = self.current_version()
+        try:
+            versions = sorted(
+                name for name in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, name))
+            )
+        except OSError:
+            return
+        for name in versions[:max(0, len(versions) - self.keep)]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    # ---- Đọc ----
+
+    def _load_files(self, paths: Dict[str, str]) -> Dict:
+        entry = {'model': joblib.load(paths['model']), 'scaler': None, 'bundle': None}
+        for key in ('scaler', 'bundle'):
+            if os.path.exists(paths[key]):
+                entry[key] = joblib.load(paths[key])
+        return entry
+
+    def _load_current(self) -> Optional[Dict]:
+        version = self.current_version()
+        if version is None:
+            if not os.path.exists(self.model_path):
+                return None
+            entry = self._load_files(self.legacy_paths())
+            entry['version'] = 'legacy'
+            return entry
+
+        directory = self.version_dir(version)
+        entry = self._load_files({
+            'model': os.path.join(directory, MODEL_FILE),
+            'scaler': os.path.join(directory, SCALER_FILE),
+            'bundle': os.path.join(directory, BUNDLE_FILE)
+        })
+        entry['version'] = version
+        return entry
+
+    def load(self) -> Optional[Dict]:
+        """
+        Model hiện tại (giữ trong bộ nhớ, chỉ nạp lại khi CURRENT đổi).
+
+        Returns:
+            Dict {version, model, scaler, bundle} (scaler/bundle có thể None), hoặc None nếu chưa có model
+        """
+        signature = self._signature()
+        loaded = self._loaded
+        if loaded is not None and loaded[0] == signature:
+            return loaded[1]
+
+        with self._lock:
+            signature = self._signature()
+            loaded = self._loaded
+            if loaded is not None and loaded[0] == signature:
+                return loaded[1]
+            if signature is None:
+                return None
+            try:
+                entry = self._load_current()
+            except FileNotFoundError:
+                # CURRENT vừa đổi và phiên bản cũ bị prune giữa chừng → đọc lại con trỏ
+                signature = self._signature()
+                entry = self._load_current()
+            self._loaded = (signature, entry)
+            print(f"📦 Đã nạp model {entry['version'] if entry else None} ({self.model_path})")
+            return entry
+
+
+_registries: Dict[str, ModelRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(model_path: str = 'models/kmeans_model.pkl') -> ModelRegistry:
+    """Kho model dùng chung trong tiến trình cho đường dẫn model này."""
+    key = os.path.abspath(model_path)
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(key, ModelRegistry(key))
+    return registry
@@ -4,9 +4,31 @@ Module gợi ý môn học dựa trên lịch sử học tập của các sinh v
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Set, Tuple
-import mysql.connector
-from config import DB_CONFIG
-from recommender.prerequisite_utils import get_prerequisites
+import db
+from recommender.prerequisite_utils import get_prerequisite_graph
+from recommender.course_catalog import get_course_catalog, build_excel_catalog
+from recommender.dataset_store import get_derived, get_derived_frame
+from recommender.similarity_index import CourseBitsetIndex
+
+
+def _filter_ontime_graduates(df: pd.DataFrame) -> pd.DataFrame:
+    """Lọc chỉ lấy các dòng của sinh viên tốt nghiệp đúng hạn."""
+    return df[(df['OnTime'] == True) & (df['Grad'] == True)].copy()
+
+
+def _build_ontime_bitset_index(df: pd.DataFrame) -> CourseBitsetIndex:
+    """Dựng bitset tập môn học của các sinh viên tốt nghiệp đúng hạn."""
+    return CourseBitsetIndex.from_frame(_filter_ontime_graduates(df))
+
+
+def load_ontime_bitset_index(excel_path: str) -> CourseBitsetIndex:
+    """Lấy bitset index (đã cache theo phiên bản dữ liệu) của sinh viên tốt nghiệp đúng hạn."""
+    return get_derived(excel_path, 'ontime_course_bitsets', _build_ontime_bitset_index)
+
+
+def _build_year5_sem1_catalog(df: pd.DataFrame) -> Dict[str, Dict]:
+    """Danh mục môn HK1 năm 5 lấy từ Excel, dùng khi môn chưa có trong MonHoc."""
+    return build_excel_catalog(_filter_ontime_graduates(df), year=5, semester=1)
 
 
 def load_ontime_graduates_data(excel_path: str) -> pd.DataFrame:
@@ -17,18 +39,10 @@ def load_ontime_graduates_data(excel_path: str) -> pd.DataFrame:
         excel_path: Đường dẫn đến file Excel chứa dữ liệu sinh viên
         
     Returns:
-        DataFrame chứa dữ liệu của các sinh viên tốt nghiệp đúng hạn
+        DataFrame (view chỉ đọc, dùng chung giữa các request) chứa dữ liệu của các sinh viên tốt nghiệp đúng hạn
     """
-    df = pd.read_excel(excel_path)
-    df = df.dropna(subset=['StudentID'])
-    
-    # Lọc chỉ lấy sinh viên tốt nghiệp đúng hạn
-    ontime_graduates = df[(df['OnTime'] == True) & (df['Grad'] == True)].copy()
-    
-    # Chuẩn hoá StudentID
-    ontime_graduates['StudentID'] = ontime_graduates['StudentID'].astype(str).str.strip()
-    
-    return ontime_graduates
+    # Dữ liệu đã được cache và StudentID đã chuẩn hoá trong dataset_store
+    return get_derived_frame(excel_path, 'ontime_graduates', _filter_ontime_graduates)
 
 
 def get_course_sequence_by_semester(df: pd.DataFrame, student_id: str) -> List[Tuple[int, int, str, float]]:
@@ -62,7 +76,7 @@ def get_course_sequence_by_semester(df: pd.DataFrame, student_id: str) -> List[T
 
 
 def find_similar_ontime_students(df: pd.DataFrame, current_student_courses: Set[str], 
-                                  n_similar: int = 10) -> List[str]:
+                                  n_similar: int = 10, index: CourseBitsetIndex = None) -> List[str]:
     """
     Tìm các sinh viên tốt nghiệp đúng hạn có lịch sử học tập tương tự với sinh viên hiện tại.
     
@@ -70,6 +84,7 @@ def find_similar_ontime_students(df: pd.DataFrame, current_student_courses: Set[
         df: DataFrame chứa dữ liệu của các sinh viên tốt nghiệp đúng hạn
         current_student_courses: Set các mã môn học mà sinh viên hiện tại đã học
         n_similar: Số lượng sinh viên tương tự cần tìm
+        index: Bitset index dựng sẵn từ `df` (nếu không truyền sẽ dựng cho lần gọi này)
         
     Returns:
         List các StudentID của sinh viên tương tự
@@ -77,24 +92,10 @@ def find_similar_ontime_students(df: pd.DataFrame, current_student_courses: Set[
     if not current_student_courses:
         return []
     
-    # Tính điểm tương đồng dựa trên số môn học chung
-    student_ids = df['StudentID'].unique()
-    similarities = {}
-    
-    for student_id in student_ids:
-        student_courses = set(df[df['StudentID'] == student_id]['CourseCode'].astype(str).unique())
-        
-        # Tính Jaccard similarity
-        intersection = len(current_student_courses & student_courses)
-        union = len(current_student_courses | student_courses)
-        
-        if union > 0:
-            similarity = intersection / union
-            similarities[student_id] = similarity
-    
-    # Sắp xếp và lấy top n_similar sinh viên
-    similar_students = sorted(similarities.items(), key=lambda x: x[1], reverse=True)[:n_similar]
-    return [sid for sid, score in similar_students if score > 0]
+    # Jaccard similarity dựa trên số môn học chung, tính cho mọi sinh viên trong một lượt
+    if index is None:
+        index = CourseBitsetIndex.from_frame(df)
+    return index.most_similar(current_student_courses, n_similar)
 
 
 def get_recommended_courses_for_specific_semester(df: pd.DataFrame, student_ids: List[str], 
@@ -292,22 +293,16 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
     Returns:
         List các Dict chứa thông tin môn học được gợi ý
     """
-    conn = None
-    cursor = None
-    
     try:
-        # Kết nối DB
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-        
         # Lấy thông tin học tập hiện tại của sinh viên
-        cursor.execute("""
-            SELECT CourseCode, Year, Semester, Status, Score, Credits
-            FROM TienTrinh 
-            WHERE StudentID=%s 
-            ORDER BY Year, Semester
-        """, (student_id,))
-        current_courses = cursor.fetchall()
+        with db.cursor(dictionary=True) as cursor:
+            cursor.execute("""
+                SELECT CourseCode, Year, Semester, Status, Score, Credits
+                FROM TienTrinh 
+                WHERE StudentID=%s 
+                ORDER BY Year, Semester
+            """, (student_id,))
+            current_courses = cursor.fetchall()
         
         if not current_courses:
             return []
@@ -362,7 +357,9 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
         print(f"DEBUG: Số môn đã học: {len(passed_courses)}")
         
         # Tìm sinh viên tương tự
-        similar_students = find_similar_ontime_students(ontime_df, passed_courses, n_similar=10)
+        similar_students = find_similar_ontime_students(
+            ontime_df, passed_courses, n_similar=10, index=load_ontime_bitset_index(excel_path)
+        )
         
         if not similar_students:
             print(f"DEBUG: Không tìm thấy sinh viên tương tự")
@@ -482,6 +479,9 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
                         }
         
         recommendations = []
+        prerequisite_graph = get_prerequisite_graph()
+        course_catalog = get_course_catalog()
+        year5_sem1_catalog = get_derived(excel_path, 'ontime_year5_sem1_catalog', _build_year5_sem1_catalog)
         
         # Debug: Đếm số môn HK1 năm 5 trong course_by_code_and_semester
         year5_sem1_in_dict = sum(1 for (code, y, s) in course_by_code_and_semester.keys() if y == 5 and s == 1)
@@ -495,35 +495,17 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
             if recommended_year == 5 and recommended_semester == 1:
                 print(f"DEBUG: Xử lý môn HK1 năm 5: {course_code}")
             
-            # Lấy thông tin chi tiết môn học từ database
-            cursor.execute("""
-                SELECT CourseCode, CourseName, Credits
-                FROM MonHoc
-                WHERE CourseCode=%s
-            """, (course_code,))
-            course_info = cursor.fetchone()
+            # Lấy thông tin chi tiết môn học từ danh mục MonHoc (đã nạp sẵn)
+            course_info = course_catalog.get(course_code)
             
             # Nếu không tìm thấy trong database, thử lấy từ Excel (đặc biệt cho HK1 năm 5)
             if not course_info:
                 if recommended_year == 5 and recommended_semester == 1:
                     print(f"DEBUG: {course_code} (HK1 năm 5) không tìm thấy trong MonHoc, thử lấy từ Excel")
-                    # Lấy thông tin từ Excel
-                    course_from_excel = ontime_df[
-                        (ontime_df['CourseCode'] == course_code) & 
-                        (ontime_df['Year'] == 5) & 
-                        (ontime_df['Semester'] == 1)
-                    ].iloc[0] if len(ontime_df[
-                        (ontime_df['CourseCode'] == course_code) & 
-                        (ontime_df['Year'] == 5) & 
-                        (ontime_df['Semester'] == 1)
-                    ]) > 0 else None
+                    # Lấy thông tin từ danh mục Excel của HK1 năm 5
+                    course_info = year5_sem1_catalog.get(course_code)
                     
-                    if course_from_excel is not None:
-                        course_info = {
-                            'CourseCode': course_from_excel['CourseCode'],
-                            'CourseName': course_from_excel.get('CourseName', str(course_code)),
-                            'Credits': int(course_from_excel.get('Credits', 0)) if pd.notna(course_from_excel.get('Credits')) else 0
-                        }
+                    if course_info is not None:
                         print(f"DEBUG: Lấy {course_code} từ Excel: {course_info.get('CourseName')}, {course_info.get('Credits')} tín chỉ")
                     else:
                         print(f"DEBUG: Bỏ qua {course_code} (HK1 năm 5) vì không tìm thấy trong cả MonHoc và Excel")
@@ -532,7 +514,7 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
                     continue
             
             # Kiểm tra điều kiện tiên quyết (nới lỏng hơn cho học kỳ 1 năm 5)
-            prereqs = get_prerequisites(course_code)
+            prereqs = prerequisite_graph.prereqs(course_code)
             # Cho học kỳ 1 năm 5, bỏ qua điều kiện tiên quyết hoàn toàn (vì là năm cuối)
             if recommended_year == 5 and recommended_semester == 1:
                 # Bỏ qua kiểm tra điều kiện tiên quyết cho HK1 năm 5
@@ -540,8 +522,9 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
                     print(f"DEBUG: {course_code} (HK1 năm 5) có điều kiện tiên quyết {prereqs} nhưng sẽ bỏ qua")
             else:
                 # Các học kỳ khác yêu cầu tất cả điều kiện tiên quyết
-                if not all(p in passed_courses for p in prereqs):
-                    print(f"DEBUG: Bỏ qua {course_code} (HK{recommended_semester} năm {recommended_year}) vì thiếu điều kiện tiên quyết: {[p for p in prereqs if p not in passed_courses]}")
+                missing_prereqs = prerequisite_graph.missing(course_code, passed_courses)
+                if missing_prereqs:
+                    print(f"DEBUG: Bỏ qua {course_code} (HK{recommended_semester} năm {recommended_year}) vì thiếu điều kiện tiên quyết: {missing_prereqs}")
                     continue
             
             # Nới lỏng điều kiện: pass_rate >= 0.6 (60%) cho học kỳ 1 năm 5, >= 0.7 cho các học kỳ khác
@@ -655,9 +638,4 @@ def recommend_based_on_ontime_graduates(student_id: str, excel_path: str = 'data
         import traceback
         traceback.print_exc()
         return []
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
@@ -0,0 +1,252 @@
+"""
+Lưu trên đĩa các file PDF kế hoạch học tập đã render.
+
+Mỗi file được khoá theo (StudentID, cluster_id, phiên bản kế hoạch, phiên bản model):
+phiên bản là recommendation_cache.current_version (fingerprint tiến trình, phiên bản
+model, phiên bản dữ liệu), nên khi điểm được import lại hoặc model được train lại thì
+file cũ không còn được dùng. Tổng dung lượng thư mục bị giới hạn bởi PDF_CACHE_MAX_BYTES
+(xoá file lâu nhất không được dùng trước; file vừa ghi/đọc trong EVICT_MIN_AGE giây không bị
+xoá để request đang trả file không mất file giữa chừng).
+
+Khi chưa có file, PdfRenderQueue render ở thread nền: một job tính 5 kế hoạch của sinh
+viên một lần rồi render cả 5 file, request chỉ chờ job đó xong rồi trả file bằng send_file.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, PDF_RENDER_WORKERS
+from etl.student_id import normalize_student_id
+from recommender.plan_pdf import PLAN_NAMES, render_plan_pdf
+from recommender.recommendation_cache import current_version, get_learning_plans
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# File được ghi hoặc đọc trong khoảng này (giây) không bị evict xoá
+EVICT_MIN_AGE = 60
+
+
+def artifact_key(student_id: str, cluster_id: int, version: Hashable) -> str:
+    """Khoá (cũng là ETag) của file PDF cho sinh viên, kế hoạch và phiên bản này."""
+    raw = repr((student_id, cluster_id, version)).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+class PdfArtifactCache:
+    """Thư mục file PDF đã render, giới hạn dung lượng."""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        directory = directory or PDF_CACHE_DIR
+        self.directory = directory if os.path.isabs(directory) else os.path.join(_REPO_ROOT, directory)
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+
+    def path_for(self, student_id: str, cluster_id: int, version: Hashable) -> str:
+        key = artifact_key(student_id, cluster_id, version)
+        return os.path.join(self.directory, f"{student_id}_{cluster_id}_{key}.pdf")
+
+    def get(self, student_id: str, cluster_id: int, version: Hashable) -> Optional[str]:
+        """Đường dẫn file PDF nếu đã render cho đúng phiên bản (cập nhật thời điểm dùng), ngược lại None."""
+        path = self.path_for(student_id, cluster_id, version)
+        return path if self.touch(path) else None
+
+    def touch(self, path: str) -> bool:
+        """Đánh dấu file vừa được dùng (evict xoá file lâu không dùng trước); False nếu file không còn."""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def put(self, student_id: str, cluster_id: int, version: Hashable, data: bytes,
+            evict: bool = True) -> str:
+        """
+        Ghi file PDF (ghi file tạm rồi os.replace), xoá bản của phiên bản cũ và dọn thư mục nếu quá dung lượng.
+        evict=False để người gọi tự dọn một lần sau khi ghi nhiều file (xem evict(keep=...)).
+
+        Returns:
+            Đường dẫn file đã ghi
+        """
+        path = self.path_for(student_id, cluster_id, version)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.pdf', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        pattern = os.path.join(glob.escape(self.directory), f"{glob.escape(student_id)}_{cluster_id}_*.pdf")
+        for old_path in glob.glob(pattern):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        if evict:
+            self.evict(keep=[path])
+        return path
+
+    def evict(self, keep: Iterable[str] = (), min_age: float = EVICT_MIN_AGE) -> int:
+        """
+        Xoá các file lâu không dùng nhất tới khi tổng dung lượng không vượt max_bytes.
+
+        Không xoá các file `keep` và các file được ghi/đọc trong `min_age` giây gần đây
+        (có thể đang được job khác trả về cho request), nên thư mục có thể tạm vượt max_bytes.
+        """
+        keep = set(keep)
+        cutoff = time.time() - min_age
+        with self._evict_lock:
+            files = []
+            total = 0
+            try:
+                entries = list(os.scandir(self.directory))
+            except OSError:
+                return 0
+            for entry in entries:
+                if not entry.name.endswith('.pdf') or entry.name.startswith('.tmp_'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                total += st.st_size
+                if entry.path not in keep and st.st_mtime < cutoff:
+                    files.append((st.st_mtime, st.st_size, entry.path))
+
+            removed = 0
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            return removed
+
+
+class PdfRenderQueue:
+    """Render PDF kế hoạch học tập trên các thread nền; mỗi (sinh viên, phiên bản) chỉ một job."""
+
+    def __init__(self, cache: PdfArtifactCache, max_workers: int = PDF_RENDER_WORKERS):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf')
+        self._pending: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, student_id: str, version: Hashable, model_path: str,
+               student_name: Optional[str] = None) -> Future:
+        """
+        Đưa job render 5 kế hoạch của sinh viên vào hàng đợi (hoặc trả về job đang chờ/chạy).
+
+        Returns:
+            Future hoàn thành khi tất cả file PDF đã được ghi vào cache, kết quả là list đường dẫn
+            file theo chỉ số kế hoạch
+        """
+        job_key = (student_id, version)
+        with self._lock:
+            future = self._pending.get(job_key)
+            if future is None:
+                future = self._executor.submit(self._render, student_id, version, model_path, student_name)
+                self._pending[job_key] = future
+        # Ngoài khoá: nếu job đã xong, callback chạy ngay trong thread này
+        future.add_done_callback(lambda _: self._done(job_key))
+        return future
+
+    def _done(self, job_key: tuple) -> None:
+        with self._lock:
+            self._pending.pop(job_key, None)
+
+    def _render(self, student_id: str, version: Hashable, model_path: str,
+                student_name: Optional[str]) -> List[str]:
+        try:
+            plans = get_learning_plans(student_id, model_path)
+            paths = []
+            for cluster_id, plan_data in enumerate(plans[:len(PLAN_NAMES)]):
+                data = render_plan_pdf(plan_data, cluster_id, student_id, student_name)
+                paths.append(self.cache.put(student_id, cluster_id, version, data, evict=False))
+            # Dọn một lần sau khi ghi đủ, không xoá nhầm file vừa render cho request đang chờ
+            self.cache.evict(keep=paths)
+            return paths
+        except Exception:
+            traceback.print_exc()
+            raise
+
+
+_cache: Optional[PdfArtifactCache] = None
+_queue: Optional[PdfRenderQueue] = None
+_queue_pid: Optional[int] = None
+_queue_lock = threading.Lock()
+
+
+def get_pdf_cache() -> PdfArtifactCache:
+    """Cache file PDF dùng chung trong tiến trình."""
+    global _cache
+    with _queue_lock:
+        if _cache is None:
+            _cache = PdfArtifactCache()
+        return _cache
+
+
+def get_pdf_render_queue() -> PdfRenderQueue:
+    """Hàng đợi render dùng chung trong tiến trình (tạo lại sau fork vì thread không đi theo tiến trình con)."""
+    global _queue, _queue_pid
+    cache = get_pdf_cache()
+    with _queue_lock:
+        if _queue is None or _queue_pid != os.getpid():
+            _queue = PdfRenderQueue(cache)
+            _queue_pid = os.getpid()
+        return _queue
+
+
+def get_plan_pdf(student_id: str, cluster_id: int, model_path: str = 'models/kmeans_model.pkl',
+                 student_name: Optional[str] = None, wait: Optional[float] = None) -> Optional[Dict]:
+    """
+    File PDF của một kế hoạch: lấy từ cache, hoặc render ở nền rồi chờ tối đa `wait` giây.
+
+    Args:
+        student_id: Mã sinh viên (được chuẩn hoá, xem etl.student_id)
+        cluster_id: Chỉ số kế hoạch (0-4)
+        model_path: Đường dẫn model
+        student_name: Họ tên hiển thị trong PDF
+        wait: Số giây chờ render (None = chờ tới khi xong)
+
+    Returns:
+        Dict {path, etag} hoặc None nếu chưa render xong trong thời gian chờ
+
+    Raises:
+        IndexError: Sinh viên không có kế hoạch cluster_id
+        Exception: Lỗi khi tính kế hoạch / render (từ thread nền)
+    """
+    student_id = normalize_student_id(student_id)
+    version = current_version(student_id, model_path)
+    etag = artifact_key(student_id, cluster_id, version)
+    cache = get_pdf_cache()
+
+    path = cache.get(student_id, cluster_id, version)
+    if path is None:
+        future = get_pdf_render_queue().submit(student_id, version, model_path, student_name)
+        try:
+            paths = future.result(timeout=wait)
+        except FutureTimeoutError:
+            return None
+        if cluster_id >= len(paths):
+            raise IndexError(f'Không tìm thấy kế hoạch {cluster_id} của sinh viên {student_id}')
+        path = paths[cluster_id]
+        if not cache.touch(path):
+            # Job đã xong từ trước và file đã bị job khác dọn đi → render lại riêng kế hoạch này
+            plan_data = get_learning_plans(student_id, model_path)[cluster_id]
+            data = render_plan_pdf(plan_data, cluster_id, student_id, student_name)
+            path = cache.put(student_id, cluster_id, version, data)
+    return {'path': path, 'etag': etag}
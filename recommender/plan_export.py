@@ -0,0 +1,242 @@
+"""
+Xuất hàng loạt kế hoạch học tập được gợi ý (kế hoạch gần sinh viên nhất) của cả lớp ra
+một file ZIP gồm các file PDF.
+
+PDF được render trên một thread pool dùng chung cho mọi lượt xuất trong process
+(PLAN_EXPORT_WORKERS thread, dùng renderer chung của recommender/plan_pdf.py nên font chỉ
+đăng ký một lần); nhiều quản trị viên xuất cùng lúc chỉ chia nhau các thread đó. File nào
+xong thì ghi ngay vào ZIP và phát ra ngoài, nên trang quản trị có thể stream ZIP về trình
+duyệt mà không giữ toàn bộ file trong bộ nhớ.
+
+Chạy từ dòng lệnh:
+    python -m recommender.plan_export --lop DA21TTA -o KeHoach_DA21TTA.zip [--workers 4]
+    python -m recommender.plan_export --student B2100001 B2100002 -o KeHoach.zip
+
+hoặc từ trang quản trị: GET /admin/export-plans?lop=DA21TTA
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from config import PLAN_EXPORT_WORKERS
+from etl.student_id import normalize_student_id
+from recommender.plan_pdf import PLAN_NAMES, get_plan_pdf_renderer
+from recommender.recommendation_cache import get_learning_plans
+
+SUMMARY_NAME = '_tong_ket.txt'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_export_executor() -> ThreadPoolExecutor:
+    """Thread pool render PDF dùng chung cho mọi lượt xuất (tạo lại sau fork vì thread không đi theo tiến trình con)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=PLAN_EXPORT_WORKERS, thread_name_prefix='plan-export')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def list_export_students(lop: Optional[str] = None,
+                         student_ids: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """
+    Sinh viên cần xuất kế hoạch.
+
+    Args:
+        lop: Chỉ lấy sinh viên của lớp này (SinhVien.Lop)
+        student_ids: Chỉ lấy các mã sinh viên này (được chuẩn hoá, xem etl.student_id)
+
+    Returns:
+        List (StudentID, HoTen) sắp theo StudentID
+    """
+    conditions = []
+    params = []
+    student_ids = [s for s in map(normalize_student_id, student_ids or []) if s]
+    if lop:
+        conditions.append("Lop = %s")
+        params.append(lop)
+    if student_ids:
+        conditions.append(f"StudentID IN ({', '.join(['%s'] * len(student_ids))})")
+        params.extend(student_ids)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with db.cursor() as cursor:
+        cursor.execute(f"SELECT StudentID, HoTen FROM SinhVien {where} ORDER BY StudentID", params)
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+def render_recommended_plan(student_id: str, student_name: Optional[str],
+                            model_path: str) -> Dict:
+    """
+    Chạy trong thread của pool xuất: render kế hoạch gần sinh viên nhất.
+
+    get_learning_plans đã sắp các kế hoạch theo khoảng cách tới sinh viên, nên kế hoạch gợi ý
+    là phần tử đầu tiên và được render như kế hoạch số 0 (giống trang kế hoạch học tập).
+
+    Returns:
+        Dict {student_id, name (tên file trong ZIP), data, pages} hoặc {student_id, error}
+    """
+    try:
+        plans = get_learning_plans(student_id, model_path)[:len(PLAN_NAMES)]
+        if not plans:
+            return {'student_id': student_id, 'error': 'không có kế hoạch'}
+        data, pages = get_plan_pdf_renderer().render_with_pages(plans[0], 0, student_id, student_name)
+        return {
+            'student_id': student_id,
+            'name': f'KeHoach_Nhom0_{student_id}.pdf',
+            'data': data,
+            'pages': pages
+        }
+    except Exception as e:
+        return {'student_id': student_id, 'error': str(e)}
+
+
+class _ZipStream:
+    """File chỉ-ghi, không seek được cho zipfile: gom các byte đã ghi để lấy ra theo từng phần."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_plans_zip(students: List[Tuple[str, str]], model_path: str = 'models/kmeans_model.pkl',
+                   workers: Optional[int] = None, stats: Optional[Dict] = None,
+                   executor: Optional[Executor] = None) -> Iterator[bytes]:
+    """
+    Render kế hoạch của các sinh viên trên thread pool và phát ra ZIP theo từng phần.
+
+    Mỗi lúc chỉ giữ tối đa 2 × workers file PDF đang chờ ghi; cuối ZIP có file _tong_ket.txt
+    (số file, số trang, trang/giây, các sinh viên bị lỗi). Nếu generator bị đóng giữa chừng
+    (client ngắt kết nối), các sinh viên chưa render bị huỷ, pool dùng chung vẫn giữ nguyên.
+
+    Args:
+        students: List (StudentID, HoTen) (xem list_export_students)
+        model_path: Đường dẫn model
+        workers: Số sinh viên render đồng thời của lượt xuất này (mặc định PLAN_EXPORT_WORKERS)
+        stats: Dict (tuỳ chọn) được cập nhật thống kê khi xuất xong
+        executor: Pool dùng để render (mặc định get_export_executor())
+
+    Yields:
+        Các phần liên tiếp của file ZIP
+    """
+    start = time.perf_counter()
+    workers = max(1, min(workers or PLAN_EXPORT_WORKERS, len(students) or 1))
+    executor = executor or get_export_executor()
+    stream = _ZipStream()
+    files = pages = 0
+    errors = []
+
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as zf:
+        # PDF đã nén sẵn nội dung → ZIP_STORED, không tốn CPU nén lại
+        pending = iter(students)
+        running = set()
+        try:
+            while True:
+                while len(running) < workers * 2:
+                    student = next(pending, None)
+                    if student is None:
+                        break
+                    running.add(executor.submit(render_recommended_plan, student[0], student[1], model_path))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if 'error' in result:
+                        errors.append((result['student_id'], result['error']))
+                        continue
+                    zf.writestr(result['name'], result['data'])
+                    files += 1
+                    pages += result['pages']
+                yield stream.drain()
+        finally:
+            # Client ngắt kết nối giữa chừng → huỷ các sinh viên chưa render
+            for future in running:
+                future.cancel()
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            'students': len(students),
+            'files': files,
+            'pages': pages,
+            'errors': len(errors),
+            'seconds': round(elapsed, 3),
+            'pages_per_sec': round(pages / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        lines = [f"{key}: {value}" for key, value in summary.items()]
+        lines += [f"Lỗi {student_id}: {message}" for student_id, message in errors]
+        zf.writestr(SUMMARY_NAME, '\n'.join(lines) + '\n')
+
+    if stats is not None:
+        stats.update(summary)
+    print(f"✅ Đã xuất {files}/{len(students)} kế hoạch ({pages} trang, {len(errors)} lỗi) "
+          f"trong {elapsed:.2f}s - {summary['pages_per_sec']} trang/s")
+    yield stream.drain()
+
+
+def export_plans_zip(students: List[Tuple[str, str]], output_path: str,
+                     model_path: str = 'models/kmeans_model.pkl', workers: Optional[int] = None) -> Dict:
+    """
+    Xuất ZIP kế hoạch của các sinh viên ra file (thread pool riêng `workers` thread, dùng cho dòng lệnh).
+
+    Returns:
+        Dict thống kê: students, files, pages, errors, seconds, pages_per_sec
+    """
+    workers = max(1, workers or PLAN_EXPORT_WORKERS)
+    stats = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='plan-export') as executor:
+        with open(output_path, 'wb') as f:
+            for chunk in iter_plans_zip(students, model_path, workers, stats, executor):
+                f.write(chunk)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Xuất kế hoạch học tập được gợi ý của cả lớp ra file ZIP')
+    parser.add_argument('--lop', help='Mã lớp (SinhVien.Lop)')
+    parser.add_argument('--student', nargs='*', help='Chỉ xuất cho các mã sinh viên này')
+    parser.add_argument('-o', '--output', required=True, help='File ZIP đầu ra')
+    parser.add_argument('--workers', type=int, default=None, help=f'Số thread render (mặc định: {PLAN_EXPORT_WORKERS})')
+    parser.add_argument('--model', default='models/kmeans_model.pkl', help='Đường dẫn model')
+    args = parser.parse_args(argv)
+
+    if not args.lop and not args.student:
+        parser.error('cần --lop hoặc --student')
+
+    students = list_export_students(args.lop, args.student)
+    if not students:
+        print("⚠️  Không có sinh viên nào phù hợp")
+        return 1
+    print(f"📄 Xuất kế hoạch cho {len(students)} sinh viên → {args.output}")
+    stats = export_plans_zip(students, args.output, model_path=args.model, workers=args.workers)
+    return 0 if stats['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
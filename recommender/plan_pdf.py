@@ -0,0 +1,253 @@
+"""
+Xuất kế hoạch học tập ra PDF.
+
+Font tiếng Việt, các ParagraphStyle và TableStyle chỉ được tạo một lần cho mỗi tiến trình
+(lần render đầu tiên): đăng ký TTFont phải đọc toàn bộ file font nên rất tốn thời gian
+nếu làm lại ở mỗi request. Các lần sau chỉ còn việc dựng bảng môn học của kế hoạch.
+"""
+import os
+import platform
+import threading
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+VIETNAMESE_FONT_NAME = 'VietnameseFont'
+
+PLAN_NAMES = [
+    'Kế hoạch Chuẩn (Ổn định)',
+    'Kế hoạch Nhanh (Tốt nghiệp sớm)',
+    'Kế hoạch Vừa phải (Cân bằng)',
+    'Kế hoạch Chậm (Tích lũy từ từ)',
+    'Kế hoạch Tùy chỉnh (Linh hoạt)'
+]
+
+COLUMN_WIDTHS = [1*cm, 2*cm, 8*cm, 2*cm, 2*cm]
+
+
+def _font_candidates() -> List[str]:
+    """Các font hỗ trợ tiếng Việt thường có sẵn trên hệ điều hành hiện tại."""
+    if platform.system() == 'Darwin':  # macOS
+        return [
+            '/System/Library/Fonts/Supplemental/Arial Unicode.ttf',
+            '/Library/Fonts/Arial Unicode.ttf',
+            '/System/Library/Fonts/Helvetica.ttc',
+            '/System/Library/Fonts/STHeiti Light.ttc',
+            '/System/Library/Fonts/STHeiti Medium.ttc',
+        ]
+    if platform.system() == 'Windows':
+        return [
+            'C:/Windows/Fonts/arial.ttf',
+            'C:/Windows/Fonts/arialuni.ttf',
+            'C:/Windows/Fonts/times.ttf',
+            'C:/Windows/Fonts/timesi.ttf',
+        ]
+    # Linux
+    return [
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+        '/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf',
+    ]
+
+
+def _register_vietnamese_font() -> Tuple[str, bool]:
+    """
+    Đăng ký font tiếng Việt với reportlab.
+
+    Returns:
+        (tên font dùng trong style, True nếu là font Unicode)
+    """
+    for font_path in _font_candidates():
+        if not os.path.exists(font_path):
+            continue
+        try:
+            # File .ttc (TrueType Collection) trên macOS cần chỉ định index
+            if font_path.endswith('.ttc'):
+                pdfmetrics.registerFont(TTFont(VIETNAMESE_FONT_NAME, font_path, subfontIndex=0))
+            else:
+                pdfmetrics.registerFont(TTFont(VIETNAMESE_FONT_NAME, font_path))
+            print(f"✅ Đã đăng ký font: {font_path}")
+            return VIETNAMESE_FONT_NAME, True
+        except Exception as e:
+            print(f"⚠️ Không thể đăng ký font {font_path}: {e}")
+
+    # Không có font hệ thống: thử font CJK có sẵn trong reportlab (hỗ trợ Unicode tốt hơn)
+    try:
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+        print("✅ Đã đăng ký font CJK")
+        return 'STSong-Light', True
+    except Exception:
+        pass
+
+    # Fallback cuối cùng: Helvetica (có thể không hiển thị đúng tiếng Việt)
+    print("⚠️ Không tìm thấy font tiếng Việt, sử dụng Helvetica (có thể không hiển thị đúng)")
+    return 'Helvetica', False
+
+
+def normalize_semesters(semesters_raw: Dict) -> Dict[Tuple[int, int], List[Dict]]:
+    """
+    Chuẩn hoá danh sách học kỳ của kế hoạch về dạng {(năm, học kỳ): [môn học]}.
+
+    Kế hoạch có thể dùng key tuple (tính trực tiếp) hoặc chuỗi "năm_học kỳ" (đọc từ JSON);
+    value có thể là list môn học hoặc dict có key 'courses'.
+    """
+    semesters = {}
+    for key, value in semesters_raw.items():
+        courses = value if isinstance(value, list) else value.get('courses', [])
+        if isinstance(key, tuple):
+            semesters[key] = courses
+        elif isinstance(key, str) and '_' in key:
+            parts = key.split('_')
+            if len(parts) == 2:
+                semesters[(int(parts[0]), int(parts[1]))] = courses
+    return semesters
+
+
+class PlanPdfRenderer:
+    """Render kế hoạch học tập ra PDF; giữ font và style dùng chung cho mọi lần render."""
+
+    def __init__(self):
+        self.font_name, self.unicode_font = _register_vietnamese_font()
+
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName=self.font_name,
+            fontSize=18,
+            textColor=colors.HexColor('#1f5ca9'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        self.normal_style = ParagraphStyle(
+            'VietnameseNormal',
+            parent=styles['Normal'],
+            fontName=self.font_name,
+            fontSize=10
+        )
+        self.heading2_style = ParagraphStyle(
+            'VietnameseHeading2',
+            parent=styles['Heading2'],
+            fontName=self.font_name,
+            fontSize=14
+        )
+
+        table_style = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f5ca9')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), self.font_name),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]
+        if self.unicode_font:
+            table_style.extend([
+                ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+                ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ])
+        self.table_style = TableStyle(table_style)
+
+    def _cell(self, text: str) -> Paragraph:
+        # Dùng Paragraph trong ô bảng để hiển thị đúng font tiếng Việt
+        return Paragraph(text, self.normal_style)
+
+    def _semester_table(self, courses: List[Dict]) -> Table:
+        table_data = [[self._cell('STT'), self._cell('Mã môn'), self._cell('Tên môn học'),
+                       self._cell('Tín chỉ'), self._cell('Điểm')]]
+        for idx, course in enumerate(courses, 1):
+            table_data.append([
+                self._cell(str(idx)),
+                self._cell(course.get('CourseCode', '') or ''),
+                self._cell(course.get('CourseName', '') or ''),
+                self._cell(str(course.get('Credits', 0) or 0)),
+                self._cell(str(course.get('Score', '-') or '-'))
+            ])
+
+        semester_credits = sum(c.get('Credits', 0) or 0 for c in courses)
+        table_data.append([self._cell(''), self._cell(''), self._cell('<b>Tổng</b>'),
+                           self._cell(f'<b>{semester_credits}</b>'), self._cell('')])
+
+        table = Table(table_data, colWidths=COLUMN_WIDTHS)
+        table.setStyle(self.table_style)
+        return table
+
+    def render(self, plan_data: Dict, cluster_id: int, student_id: str,
+               student_name: Optional[str] = None) -> bytes:
+        """Render một kế hoạch học tập, trả về nội dung file PDF (xem render_with_pages)."""
+        return self.render_with_pages(plan_data, cluster_id, student_id, student_name)[0]
+
+    def render_with_pages(self, plan_data: Dict, cluster_id: int, student_id: str,
+                          student_name: Optional[str] = None) -> Tuple[bytes, int]:
+        """
+        Render một kế hoạch học tập.
+
+        Args:
+            plan_data: Một phần tử của get_learning_plans (có 'semesters', 'total_credits')
+            cluster_id: Chỉ số kế hoạch (0-4), dùng để lấy tên kế hoạch
+            student_id: Mã sinh viên
+            student_name: Họ tên sinh viên (mặc định hiển thị mã sinh viên)
+
+        Returns:
+            (nội dung file PDF, số trang)
+        """
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4,
+                                rightMargin=2*cm, leftMargin=2*cm,
+                                topMargin=2*cm, bottomMargin=2*cm)
+
+        story = [
+            Paragraph(f"KẾ HOẠCH HỌC TẬP - {PLAN_NAMES[cluster_id]}", self.title_style),
+            Spacer(1, 0.5*cm)
+        ]
+
+        info_text = f"""
+        <b>Sinh viên:</b> {student_name or student_id} ({student_id})<br/>
+        <b>Ngày tạo:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
+        <b>Tổng tín chỉ:</b> {plan_data.get('total_credits', 0)} / 156 TC
+        """
+        story.append(Paragraph(info_text, self.normal_style))
+        story.append(Spacer(1, 1*cm))
+
+        # Bảng môn học theo học kỳ
+        semesters = normalize_semesters(plan_data.get('semesters', {}))
+        for (year, semester), courses in sorted(semesters.items()):
+            story.append(Paragraph(f"<b>Năm {year} - Học kỳ {semester}</b>", self.heading2_style))
+            story.append(Spacer(1, 0.3*cm))
+            story.append(self._semester_table(courses))
+            story.append(Spacer(1, 0.5*cm))
+
+        doc.build(story)
+        return buffer.getvalue(), doc.page
+
+
+_renderer: Optional[PlanPdfRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_plan_pdf_renderer() -> PlanPdfRenderer:
+    """Renderer dùng chung trong tiến trình (đăng ký font ở lần gọi đầu tiên)."""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PlanPdfRenderer()
+    return _renderer
+
+
+def render_plan_pdf(plan_data: Dict, cluster_id: int, student_id: str,
+                    student_name: Optional[str] = None) -> bytes:
+    """Render kế hoạch học tập ra PDF bằng renderer dùng chung (xem PlanPdfRenderer.render)."""
+    return get_plan_pdf_renderer().render(plan_data, cluster_id, student_id, student_name)
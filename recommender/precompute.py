@@ -0,0 +1,188 @@
+"""
+Tính sẵn gợi ý môn học và 5 kế hoạch học tập cho mọi sinh viên (chạy sau khi import điểm
+hoặc train lại model), để lần đăng nhập đầu tiên không phải tính trực tiếp.
+
+Chạy từ dòng lệnh:
+    python -m recommender.precompute [--workers 4] [--student B2100001 ...]
+
+hoặc từ trang quản trị (POST /admin/precompute), job chạy ở nền trong tiến trình web.
+Kết quả được ghi vào recommender/precomputed_store.py; recommendation_cache đọc chúng.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from recommender.dataset_store import DEFAULT_EXCEL_PATH
+from recommender.kmeans_clustering import get_learning_plans_for_student
+from recommender.precomputed_store import save_precomputed
+from recommender.recommend import recommend_next_courses
+from recommender.recommendation_cache import current_version
+
+DEFAULT_CHUNK_SIZE = 25
+
+
+def list_student_ids() -> List[str]:
+    """Mã tất cả sinh viên trong bảng SinhVien."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT StudentID FROM SinhVien ORDER BY StudentID")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def precompute_student(student_id: str, model_path: str = 'models/kmeans_model.pkl',
+                       excel_path: str = DEFAULT_EXCEL_PATH, directory: Optional[str] = None) -> None:
+    """Tính và lưu gợi ý + kế hoạch học tập của một sinh viên."""
+    # Lấy phiên bản trước khi tính: nếu dữ liệu đổi trong lúc tính, kết quả sẽ bị coi là cũ
+    version = current_version(student_id, model_path, excel_path)
+    recommendations = recommend_next_courses(student_id, model_path=model_path, excel_path=excel_path)
+    plans = get_learning_plans_for_student(student_id, excel_path)
+    save_precomputed(student_id, version, recommendations, plans, directory)
+
+
+def _precompute_chunk(student_ids: List[str], model_path: str, excel_path: str,
+                      directory: Optional[str]) -> Dict:
+    """Chạy trong process con: tính một nhóm sinh viên, trả về số đã ghi và lỗi."""
+    written = 0
+    errors = []
+    for student_id in student_ids:
+        try:
+            precompute_student(student_id, model_path, excel_path, directory)
+            written += 1
+        except Exception as e:
+            errors.append((student_id, str(e)))
+    return {'written': written, 'errors': errors}
+
+
+def precompute_all(student_ids: Optional[List[str]] = None, model_path: str = 'models/kmeans_model.pkl',
+                   excel_path: str = DEFAULT_EXCEL_PATH, workers: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, directory: Optional[str] = None,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Tính sẵn cho nhiều sinh viên bằng process pool.
+
+    Args:
+        student_ids: Danh sách mã sinh viên (mặc định: tất cả SinhVien)
+        model_path, excel_path: Model và dữ liệu dùng để tính
+        workers: Số process (mặc định số CPU); 1 = chạy trong process hiện tại
+        chunk_size: Số sinh viên mỗi lần giao cho một process
+        directory: Thư mục lưu (mặc định PRECOMPUTE_DIR)
+        progress: Hàm progress(done, total) gọi sau mỗi nhóm
+
+    Returns:
+        Dict thống kê: students, written, errors, seconds, students_per_sec
+    """
+    start = time.perf_counter()
+    if student_ids is None:
+        student_ids = list_student_ids()
+    total = len(student_ids)
+    chunks = [student_ids[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    written = 0
+    errors = []
+    done = 0
+
+    def collect(result, size):
+        nonlocal written, done
+        written += result['written']
+        errors.extend(result['errors'])
+        done += size
+        print(f"⏳ Đã tính {done}/{total} sinh viên...")
+        if progress is not None:
+            progress(done, total)
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            collect(_precompute_chunk(chunk, model_path, excel_path, directory), len(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            futures = [
+                (executor.submit(_precompute_chunk, chunk, model_path, excel_path, directory), len(chunk))
+                for chunk in chunks
+            ]
+            for future, size in futures:
+                collect(future.result(), size)
+
+    elapsed = time.perf_counter() - start
+    for student_id, message in errors[:5]:
+        print(f"⚠️  Lỗi tính sẵn cho {student_id}: {message}")
+    stats = {
+        'students': total,
+        'written': written,
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'students_per_sec': round(total / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"✅ Đã tính sẵn {written}/{total} sinh viên ({len(errors)} lỗi) trong {elapsed:.2f}s")
+    return stats
+
+
+# ---- Job nền cho trang quản trị (mỗi lúc một job trong tiến trình web) ----
+
+_job_lock = threading.Lock()
+_job: Dict = {'status': 'idle'}
+
+
+def start_precompute_job(model_path: str = 'models/kmeans_model.pkl',
+                         excel_path: str = DEFAULT_EXCEL_PATH, workers: Optional[int] = None) -> Dict:
+    """
+    Chạy precompute_all trên một thread nền; nếu đang có job chạy thì trả về trạng thái job đó.
+
+    Returns:
+        Dict trạng thái job (bản sao)
+    """
+    global _job
+    with _job_lock:
+        if _job.get('status') == 'running':
+            return dict(_job)
+        _job = {'status': 'running', 'done': 0, 'total': None, 'started_at': time.time(),
+                'finished_at': None, 'stats': None, 'error': None}
+        snapshot = dict(_job)
+
+    def update(**fields):
+        with _job_lock:
+            _job.update(fields)
+
+    def run():
+        try:
+            stats = precompute_all(model_path=model_path, excel_path=excel_path, workers=workers,
+                                   progress=lambda done, total: update(done=done, total=total))
+            update(status='done', stats=stats, finished_at=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            update(status='failed', error=str(e), finished_at=time.time())
+
+    threading.Thread(target=run, name='precompute', daemon=True).start()
+    return snapshot
+
+
+def get_precompute_status() -> Dict:
+    """Trạng thái job tính sẵn gần nhất trong tiến trình này."""
+    with _job_lock:
+        return dict(_job)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tính sẵn gợi ý môn học và kế hoạch học tập cho sinh viên')
+    parser.add_argument('--student', nargs='*', help='Chỉ tính cho các mã sinh viên này (mặc định: tất cả)')
+    parser.add_argument('--workers', type=int, default=None, help='Số process (mặc định: số CPU)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Số sinh viên mỗi lần giao cho một process (mặc định {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--model', default='models/kmeans_model.pkl', help='Đường dẫn model')
+    parser.add_argument('--excel', default=DEFAULT_EXCEL_PATH, help='File dữ liệu Excel')
+    args = parser.parse_args(argv)
+
+    stats = precompute_all(args.student or None, model_path=args.model, excel_path=args.excel,
+                           workers=args.workers, chunk_size=args.chunk_size)
+    return 0 if stats['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""
+Lưu trên đĩa kết quả gợi ý môn học và 5 kế hoạch học tập đã tính sẵn cho từng sinh viên.
+
+Mỗi sinh viên một file pickle chứa phiên bản (fingerprint tiến trình, phiên bản model,
+phiên bản dữ liệu) lúc tính. Trang dashboard / kế hoạch chỉ dùng kết quả khi phiên bản còn
+khớp và chưa quá PRECOMPUTE_MAX_AGE giây; ngược lại tính trực tiếp như trước.
+"""
+import os
+import pickle
+import tempfile
+import time
+from typing import Dict, Hashable, List, Optional
+
+from config import PRECOMPUTE_DIR, PRECOMPUTE_MAX_AGE
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def store_dir(directory: Optional[str] = None) -> str:
+    """Thư mục lưu kết quả (đường dẫn tương đối tính từ thư mục gốc project)."""
+    directory = directory or PRECOMPUTE_DIR
+    return directory if os.path.isabs(directory) else os.path.join(_REPO_ROOT, directory)
+
+
+def _entry_path(student_id: str, directory: Optional[str] = None) -> str:
+    return os.path.join(store_dir(directory), f"{student_id}.pkl")
+
+
+def save_precomputed(student_id: str, version: Hashable, recommendations: List[Dict],
+                     plans: List[Dict], directory: Optional[str] = None) -> str:
+    """
+    Ghi kết quả tính sẵn của một sinh viên (ghi file tạm rồi os.replace).
+
+    Returns:
+        Đường dẫn file đã ghi
+    """
+    path = _entry_path(student_id, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {
+        'student_id': student_id,
+        'version': version,
+        'recommendations': recommendations,
+        'plans': plans,
+        'computed_at': time.time()
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.pkl', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def load_precomputed(student_id: str, version: Hashable, directory: Optional[str] = None,
+                     max_age: float = PRECOMPUTE_MAX_AGE) -> Optional[Dict]:
+    """
+    Kết quả tính sẵn của sinh viên nếu còn mới.
+
+    Args:
+        student_id: Mã sinh viên
+        version: Phiên bản hiện tại (recommendation_cache.current_version)
+        directory: Thư mục lưu (mặc định PRECOMPUTE_DIR)
+        max_age: Số giây tối đa kể từ lúc tính
+
+    Returns:
+        Dict {student_id, version, recommendations, plans, computed_at} hoặc None nếu không có / đã cũ
+    """
+    try:
+        with open(_entry_path(student_id, directory), 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if entry.get('version') != version or time.time() - entry.get('computed_at', 0) > max_age:
+        return None
+    return entry
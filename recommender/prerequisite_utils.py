@@ -1,14 +1,121 @@
-import mysql.connector
-from config import DB_CONFIG
+import threading
+import db
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class PrerequisiteGraph:
+    """
+    Đồ thị tiên quyết nạp từ bảng `TienQuyet` (CourseCode, PrerequisiteCode) trong một truy vấn.
+    Bao đóng bắc cầu và cấp topo (level) được tính sẵn khi dựng đồ thị.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[str, str]]):
+        self._prereqs: Dict[str, List[str]] = {}
+        for course_code, prereq_code in edges:
+            if not course_code or not prereq_code:
+                continue
+            self._prereqs.setdefault(course_code, []).append(prereq_code)
+
+        self._closure: Dict[str, Set[str]] = {}
+        self._level: Dict[str, int] = {}
+        nodes = set(self._prereqs)
+        for prereqs in self._prereqs.values():
+            nodes.update(prereqs)
+        for code in sorted(nodes):
+            self._closure[code] = self._reachable(code)
+            self._visit(code, set())
+
+    def _reachable(self, code: str) -> Set[str]:
+        """Tất cả môn đi tới được từ `code` theo cạnh tiên quyết (đúng cả khi dữ liệu lỗi có chu trình)."""
+        closure: Set[str] = set()
+        stack = [code]
+        while stack:
+            for prereq in self._prereqs.get(stack.pop(), []):
+                if prereq not in closure:
+                    closure.add(prereq)
+                    stack.append(prereq)
+        return closure
+
+    def _visit(self, code: str, visiting: Set[str]) -> int:
+        """Tính level của `code` (bỏ qua cạnh tạo chu trình nếu dữ liệu lỗi)."""
+        if code in self._level:
+            return self._level[code]
+
+        visiting.add(code)
+        level = 0
+        for prereq in self._prereqs.get(code, []):
+            if prereq in visiting:
+                continue
+            level = max(level, self._visit(prereq, visiting) + 1)
+        visiting.discard(code)
+
+        self._level[code] = level
+        return level
+
+    @classmethod
+    def load(cls) -> 'PrerequisiteGraph':
+        """Nạp toàn bộ bảng TienQuyet bằng một truy vấn."""
+        with db.cursor() as cursor:
+            cursor.execute("SELECT CourseCode, PrerequisiteCode FROM TienQuyet ORDER BY ID")
+            edges = cursor.fetchall()
+        return cls(edges)
+
+    def prereqs(self, course_code: str) -> List[str]:
+        """Danh sách môn tiên quyết trực tiếp của `course_code`."""
+        return list(self._prereqs.get(course_code, []))
+
+    def closure(self, course_code: str) -> Set[str]:
+        """Tất cả môn tiên quyết (trực tiếp và bắc cầu) của `course_code`."""
+        return set(self._closure.get(course_code, set()))
+
+    def level(self, course_code: str) -> int:
+        """Cấp topo: 0 nếu không có tiên quyết, ngược lại 1 + cấp lớn nhất của các môn tiên quyết."""
+        return self._level.get(course_code, 0)
+
+    def levels(self) -> Dict[int, List[str]]:
+        """Các môn trong đồ thị nhóm theo cấp topo."""
+        grouped: Dict[int, List[str]] = {}
+        for code, level in sorted(self._level.items()):
+            grouped.setdefault(level, []).append(code)
+        return grouped
+
+    def missing(self, course_code: str, passed: Iterable[str]) -> List[str]:
+        """Các môn tiên quyết trực tiếp của `course_code` chưa có trong `passed`."""
+        passed = passed if isinstance(passed, (set, frozenset)) else set(passed)
+        return [p for p in self._prereqs.get(course_code, []) if p not in passed]
+
+    def eligible(self, candidates: Iterable[str], passed: Iterable[str]) -> List[str]:
+        """Lọc `candidates` (giữ thứ tự) chỉ còn các môn đã đủ điều kiện tiên quyết."""
+        passed = set(passed)
+        return [code for code in candidates if not self.missing(code, passed)]
+
+
+_graph: Optional[PrerequisiteGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_prerequisite_graph() -> PrerequisiteGraph:
+    """Lấy đồ thị tiên quyết dùng chung (nạp một lần, nạp lại sau invalidate_prerequisite_graph)."""
+    global _graph
+    graph = _graph
+    if graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = PrerequisiteGraph.load()
+            graph = _graph
+    return graph
+
+
+def invalidate_prerequisite_graph() -> None:
+    """Gọi sau khi bảng TienQuyet thay đổi để lần truy vấn sau nạp lại đồ thị."""
+    global _graph
+    with _graph_lock:
+        _graph = None
+
 
 def get_prerequisites(course_code):
     """
     Map to SQL schema: use table `TienQuyet` with columns `CourseCode` and `PrerequisiteCode`.
     Return a list of prerequisite course codes for the given course_code.
     """
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT PrerequisiteCode FROM TienQuyet WHERE CourseCode=%s", (course_code,))
-    rows = [r['PrerequisiteCode'] for r in cursor.fetchall()]
-    conn.close()
-    return rows
+    return get_prerequisite_graph().prereqs(course_code)
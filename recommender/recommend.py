@@ -1,57 +1,24 @@
-import mysql.connector
-import joblib
 import os
-import numpy as np
-from sklearn.cluster import KMeans
-import pandas as pd
-from config import DB_CONFIG
-from recommender.prerequisite_utils import get_prerequisites
+import db
+from recommender.prerequisite_utils import get_prerequisite_graph
+from recommender.course_catalog import get_course_catalog
 from recommender.ontime_graduate_recommender import recommend_based_on_ontime_graduates
+from recommender.dataset_store import get_student_data, get_derived
+from recommender.similarity_index import StudentCourseMatrix
 
 
-def get_similar_students(student_data, student_id, n_similar=5):
+def get_similar_students(student_data, student_id, n_similar=5, matrix=None):
     """Tìm n sinh viên có lịch sử học tập tương tự nhất.
 
     Trả về danh sách StudentID (cùng kiểu như trong file) của những sinh viên tương tự.
     Nếu student_id không có trong dữ liệu, trả về danh sách rỗng.
-    """
-    # Chuẩn hoá cột StudentID thành string để tránh mismatch (ví dụ: số vs str)
-    student_data = student_data.copy()
-    if 'StudentID' not in student_data.columns or 'CourseCode' not in student_data.columns:
-        return []
-    student_data['StudentID'] = student_data['StudentID'].astype(str).str.strip()
-    student_id = str(student_id).strip()
-
-    # Pivot table để có ma trận sinh viên-môn học (dùng Score nếu có, else 1/0)
-    value_col = 'Score' if 'Score' in student_data.columns else None
-    if value_col:
-        student_course_matrix = pd.pivot_table(
-            student_data, values='Score', index='StudentID', columns='CourseCode', fill_value=0
-        )
-    else:
-        # nếu không có điểm, chỉ đánh dấu đã học = 1
-        student_data['_taken'] = 1
-        student_course_matrix = pd.pivot_table(
-            student_data, values='_taken', index='StudentID', columns='CourseCode', fill_value=0
-        )
-
-    if student_id not in student_course_matrix.index:
-        return []
 
-    current_student = student_course_matrix.loc[student_id].values
-    similarities = {}
-    for other_id in student_course_matrix.index:
-        if other_id == student_id:
-            continue
-        other_student = student_course_matrix.loc[other_id].values
-        dot_product = np.dot(current_student, other_student)
-        norm_product = np.linalg.norm(current_student) * np.linalg.norm(other_student)
-        if norm_product == 0:
-            continue
-        similarities[other_id] = dot_product / norm_product
-
-    similar_students = sorted(similarities.items(), key=lambda x: x[1], reverse=True)[:n_similar]
-    return [sid for sid, _ in similar_students]
+    `matrix` là StudentCourseMatrix dựng sẵn từ `student_data`; nếu không truyền,
+    index sẽ được dựng từ `student_data` cho lần gọi này.
+    """
+    if matrix is None:
+        matrix = StudentCourseMatrix.from_frame(student_data)
+    return matrix.most_similar(str(student_id).strip(), n_similar)
 
 
 def recommend_next_courses(student_id, model_path='models/kmeans_model.pkl', excel_path='data/student_data_100-2.xlsx', use_ontime_graduates=True):
@@ -94,31 +61,27 @@ def recommend_next_courses(student_id, model_path='models/kmeans_model.pkl', exc
             # Fallback về phương pháp cũ
     
     # Fallback về phương pháp cũ (giữ nguyên logic cũ)
-    conn = None
-    cursor = None
     try:
-        # Kết nối DB
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True)
-
         # Lấy danh sách môn học đã qua của sinh viên hiện tại
-        cursor.execute("SELECT * FROM TienTrinh WHERE StudentID=%s", (student_id,))
-        results = cursor.fetchall()
+        with db.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM TienTrinh WHERE StudentID=%s", (student_id,))
+            results = cursor.fetchall()
         passed_courses = [r['CourseCode'] for r in results if r.get('Status') in ("Đã học", 'Đã học')]
 
-        # Đọc dữ liệu từ file Excel (nếu có). Nếu thiếu, trả về [] chứ không raise
+        # Đọc dữ liệu từ file Excel (nếu có, đã cache). Nếu thiếu, trả về [] chứ không raise
         if os.path.exists(excel_path):
-            student_data = pd.read_excel(excel_path)
+            student_data = get_student_data(excel_path)
         else:
             # file không có -> không phá vỡ dashboard, trả về []
             print(f"Cảnh báo: file Excel '{excel_path}' không tồn tại. Bỏ qua gợi ý theo sinh viên tương tự.")
             return []
 
-        # Chuẩn hoá StudentID trong Excel
-        student_data['StudentID'] = student_data['StudentID'].astype(str).str.strip()
+        # StudentID trong dữ liệu cache đã được chuẩn hoá
         sid_str = str(student_id).strip()
 
-        similar_students = get_similar_students(student_data, sid_str)
+        # Ma trận sinh viên × môn học được dựng một lần cho mỗi phiên bản dữ liệu
+        matrix = get_derived(excel_path, 'student_course_matrix', StudentCourseMatrix.from_frame)
+        similar_students = get_similar_students(student_data, sid_str, matrix=matrix)
         if not similar_students:
             # không tìm thấy sinh viên tương tự (hoặc student_id không có trong Excel)
             return []
@@ -141,27 +104,29 @@ def recommend_next_courses(student_id, model_path='models/kmeans_model.pkl', exc
         else:
             similar_courses = []
 
-        # Lấy thông tin chi tiết của các môn học được đề xuất từ bảng MonHoc
+        # Lấy thông tin chi tiết của các môn học được đề xuất từ danh mục MonHoc
+        catalog = get_course_catalog()
         potential_courses = []
-        if len(similar_courses) > 0:
-            placeholders = ','.join(['%s'] * len(similar_courses))
-            cursor.execute(f"""
-                SELECT DISTINCT CourseCode, CourseName, Credits 
-                FROM MonHoc 
-                WHERE CourseCode IN ({placeholders})
-            """, tuple(similar_courses))
-            potential_courses = cursor.fetchall()
-
-        # Lọc theo điều kiện tiên quyết và loại bỏ môn đã học
+        for code in similar_courses:
+            course = catalog.get(code)
+            if course is not None:
+                potential_courses.append({
+                    'CourseCode': course['CourseCode'],
+                    'CourseName': course['CourseName'],
+                    'Credits': course['Credits']
+                })
+
+        # Lọc theo điều kiện tiên quyết (đồ thị đã nạp sẵn) và loại bỏ môn đã học
+        graph = get_prerequisite_graph()
+        passed_set = set(passed_courses)
         recs = []
         for course in potential_courses:
             code = course.get('CourseCode')
             if not code:
                 continue
-            if code in passed_courses:
+            if code in passed_set:
                 continue
-            prereqs = get_prerequisites(code)
-            if all(p in passed_courses for p in prereqs):
+            if not graph.missing(code, passed_set):
                 recs.append(course)
 
         return recs
@@ -169,9 +134,4 @@ def recommend_next_courses(student_id, model_path='models/kmeans_model.pkl', exc
         # Ghi log ngắn; không làm vỡ giao diện người dùng
         print(f"Lỗi khi tạo gợi ý: {e}")
         return []
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
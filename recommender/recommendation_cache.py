@@ -0,0 +1,193 @@
+"""
+Cache kết quả gợi ý môn học theo từng sinh viên.
+
+Mỗi sinh viên có một entry (LRU, có TTL) chứa danh sách gợi ý cuối cùng cùng với
+phiên bản đã dùng để tính ra nó: fingerprint các dòng TienTrinh của sinh viên,
+phiên bản model và phiên bản dữ liệu Excel. Khi điểm được import lại hoặc model được
+train lại, phiên bản đổi nên entry cũ tự động bị tính lại ở lần xem kế tiếp.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import db
+from config import RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL
+from recommender.dataset_store import DEFAULT_EXCEL_PATH, get_dataset_version
+from recommender.model_registry import get_model_registry
+from recommender.precomputed_store import load_precomputed
+from recommender.kmeans_clustering import get_learning_plans_for_student
+from recommender.recommend import recommend_next_courses
+
+
+class RecommendationCache:
+    """LRU + TTL: mỗi StudentID giữ một entry (phiên bản, danh sách gợi ý, thời điểm hết hạn)."""
+
+    def __init__(self, max_entries: int = RECOMMENDATION_CACHE_SIZE, ttl: float = RECOMMENDATION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Hashable, List[Dict], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_id: str, version: Hashable) -> Optional[List[Dict]]:
+        """Lấy bản sao danh sách gợi ý nếu entry còn hạn và cùng phiên bản."""
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if entry is None or entry[0] != version or entry[2] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(student_id)
+            self.hits += 1
+            recs = entry[1]
+        # Các route còn bổ sung thông tin vào từng dict → trả về bản sao
+        return copy.deepcopy(recs)
+
+    def put(self, student_id: str, version: Hashable, recs: List[Dict]) -> None:
+        """Lưu (bản sao của) danh sách gợi ý, loại entry ít dùng nhất nếu vượt giới hạn."""
+        recs = copy.deepcopy(recs)
+        with self._lock:
+            self._entries[student_id] = (version, recs, time.monotonic() + self.ttl)
+            self._entries.move_to_end(student_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, student_id: str) -> None:
+        with self._lock:
+            self._entries.pop(student_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_cache = RecommendationCache()
+
+
+def progress_fingerprint(student_id: str) -> Tuple[int, int]:
+    """
+    Fingerprint các dòng TienTrinh của sinh viên (số dòng, checksum nội dung).
+    Đổi khi có môn được thêm/xoá hoặc điểm/trạng thái được cập nhật.
+    """
+    with db.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(CRC32(CONCAT_WS('|', CourseCode, Year, Semester, Score, Status, Credits))), 0)
+            FROM TienTrinh
+            WHERE StudentID=%s
+        """, (student_id,))
+        count, checksum = cursor.fetchone()
+    return int(count), int(checksum)
+
+
+def model_version(model_path: str) -> Hashable:
+    """Phiên bản model hiện tại trong model_registry; None nếu chưa có model."""
+    return get_model_registry(model_path).version()
+
+
+def current_version(student_id: str, model_path: str = 'models/kmeans_model.pkl',
+                    excel_path: str = DEFAULT_EXCEL_PATH) -> Tuple:
+    """Phiên bản dùng làm khoá cache: (fingerprint tiến trình, phiên bản model, phiên bản dữ liệu Excel)."""
+    dataset_version = get_dataset_version(excel_path) if os.path.exists(excel_path) else None
+    return progress_fingerprint(student_id), model_version(model_path), dataset_version
+
+
+def get_recommendations(student_id: str, model_path: str = 'models/kmeans_model.pkl',
+                        excel_path: str = DEFAULT_EXCEL_PATH) -> List[Dict]:
+    """
+    Giống recommend_next_courses nhưng dùng cache khi tiến trình học tập, model và dữ liệu không đổi:
+    cache trong bộ nhớ, rồi đến kết quả tính sẵn (recommender/precompute.py), cuối cùng mới tính trực tiếp.
+
+    Args:
+        student_id: Mã sinh viên
+        model_path: Đường dẫn đến model
+        excel_path: Đường dẫn đến file Excel chứa dữ liệu
+
+    Returns:
+        List các dict chứa thông tin môn học được gợi ý (bản sao, được phép sửa)
+    """
+    student_id = str(student_id).strip()
+    try:
+        version = current_version(student_id, model_path, excel_path)
+    except Exception as e:
+        # Không xác định được phiên bản (ví dụ mất kết nối DB) → tính trực tiếp, không cache
+        print(f"Cảnh báo: không dùng được cache gợi ý: {e}")
+        return recommend_next_courses(student_id, model_path=model_path, excel_path=excel_path)
+
+    recs = _cache.get(student_id, version)
+    if recs is not None:
+        return recs
+
+    entry = load_precomputed(student_id, version)
+    if entry is not None:
+        recs = entry['recommendations']
+    else:
+        recs = recommend_next_courses(student_id, model_path=model_path, excel_path=excel_path)
+    # Danh sách rỗng có thể do lỗi tạm thời (DB, file) → không cache
+    if recs:
+        _cache.put(student_id, version, recs)
+    return recs
+
+
+def get_learning_plans(student_id: str, model_path: str = 'models/kmeans_model.pkl',
+                       excel_path: str = DEFAULT_EXCEL_PATH) -> List[Dict]:
+    """
+    5 kế hoạch học tập của sinh viên: dùng kết quả tính sẵn nếu còn mới,
+    ngược lại tính trực tiếp bằng get_learning_plans_for_student.
+    """
+    student_id = str(student_id).strip()
+    try:
+        entry = load_precomputed(student_id, current_version(student_id, model_path, excel_path))
+    except Exception as e:
+        print(f"Cảnh báo: không đọc được kế hoạch tính sẵn: {e}")
+        entry = None
+    if entry is not None:
+        return entry['plans']
+    return get_learning_plans_for_student(student_id, excel_path)
+
+
+def invalidate_student(student_id: str) -> None:
+    """Xoá gợi ý đã cache của một sinh viên."""
+    _cache.invalidate(str(student_id).strip())
+
+
+def invalidate_students(student_ids: Iterable[str]) -> int:
+    """Xoá gợi ý đã cache của nhiều sinh viên, trả về số sinh viên."""
+    count = 0
+    for student_id in student_ids:
+        invalidate_student(student_id)
+        count += 1
+    return count
+
+
+def apply_changeset(changeset: Dict) -> int:
+    """
+    Làm mới cache theo change set của import tăng dần (etl/import_excel_to_db.py --mode incremental):
+    chỉ sinh viên có dòng TienTrinh thêm/sửa/xoá bị xoá khỏi cache.
+
+    Returns:
+        Số sinh viên đã xoá khỏi cache
+    """
+    return invalidate_students(changeset.get('students', []))
+
+
+def clear_recommendation_cache() -> None:
+    """Xoá toàn bộ gợi ý đã cache (ví dụ sau khi danh mục môn học / tiên quyết thay đổi)."""
+    _cache.clear()
+
+
+def recommendation_cache_stats() -> Dict:
+    return _cache.stats()
@@ -0,0 +1,185 @@
+"""
+Index dùng cho tìm kiếm sinh viên tương tự.
+
+StudentCourseMatrix giữ ma trận sinh viên × môn học cùng norm L2 của từng hàng, kèm
+index ổn định StudentID → hàng. Cosine similarity của một sinh viên với tất cả
+sinh viên khác chỉ là một phép nhân ma trận-vector, top-k lấy bằng argpartition.
+
+CourseBitsetIndex giữ tập môn học của mỗi sinh viên dưới dạng bitset (mảng uint64);
+Jaccard similarity với tất cả sinh viên được tính trong một lượt AND + popcount.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Bảng đếm bit cho numpy cũ chưa có np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Vị trí của k điểm cao nhất, giảm dần; điểm bằng nhau thì vị trí nhỏ hơn đứng trước
+    (giống sorted(..., reverse=True) ổn định trên thứ tự ban đầu).
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    # argpartition chọn tuỳ ý giữa các điểm bằng nhau ở biên → lấy mọi ứng viên >= ngưỡng
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    candidates = np.flatnonzero(scores >= threshold)
+    order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return order[:k]
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Đếm số bit 1 của từng phần tử uint64."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    words = np.ascontiguousarray(words)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1)
+
+
+class StudentCourseMatrix:
+    """Ma trận sinh viên × môn học (Score, hoặc 1/0 nếu không có điểm) kèm norm của từng hàng."""
+
+    def __init__(self, student_ids: Sequence[str], course_codes: Sequence[str], matrix: np.ndarray):
+        self.student_ids = list(student_ids)
+        self.course_codes = list(course_codes)
+        self.row_index: Dict[str, int] = {sid: i for i, sid in enumerate(self.student_ids)}
+
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.norms = np.linalg.norm(self.matrix, axis=1)
+        # Hàng có norm = 0 không so sánh được (giống cách cũ bỏ qua khi norm_product == 0)
+        self.valid = self.norms > 0
+
+    @classmethod
+    def from_frame(cls, student_data: pd.DataFrame) -> 'StudentCourseMatrix':
+        """
+        Tạo index từ DataFrame lịch sử học tập (cột StudentID, CourseCode, Score tuỳ chọn).
+
+        Dùng cùng pivot_table như get_similar_students trước đây để giữ nguyên giá trị.
+        """
+        if 'StudentID' not in student_data.columns or 'CourseCode' not in student_data.columns:
+            return cls([], [], np.zeros((0, 0)))
+
+        student_data = student_data.assign(
+            StudentID=student_data['StudentID'].astype(str).str.strip()
+        )
+        if 'Score' in student_data.columns:
+            value_col = 'Score'
+        else:
+            # nếu không có điểm, chỉ đánh dấu đã học = 1
+            student_data = student_data.assign(_taken=1)
+            value_col = '_taken'
+
+        pivot = pd.pivot_table(
+            student_data, values=value_col, index='StudentID', columns='CourseCode', fill_value=0
+        )
+        return cls(pivot.index.tolist(), pivot.columns.tolist(), pivot.to_numpy(dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    def similarities(self, student_id: str) -> np.ndarray:
+        """
+        Cosine similarity của `student_id` với mọi hàng trong ma trận.
+
+        Returns:
+            Mảng float, -inf ở chính sinh viên đó và các hàng không so sánh được;
+            mảng rỗng nếu sinh viên không có trong index.
+        """
+        row = self.row_index.get(str(student_id).strip())
+        if row is None or not self.valid[row]:
+            return np.empty(0)
+
+        # Cùng biểu thức dot / (norm * norm) như vòng lặp cũ (không chia trước từng hàng),
+        # để các sinh viên có similarity bằng nhau vẫn bằng nhau chính xác và giữ thứ tự cũ
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sims = (self.matrix @ self.matrix[row]) / (self.norms * self.norms[row])
+        sims[~self.valid] = -np.inf
+        sims[row] = -np.inf
+        return sims
+
+    def most_similar(self, student_id: str, n_similar: int = 5) -> List[str]:
+        """
+        Lấy n StudentID tương tự nhất (giảm dần theo similarity; bằng nhau thì theo thứ tự index).
+        """
+        sims = self.similarities(student_id)
+        if sims.size == 0 or n_similar <= 0:
+            return []
+
+        k = min(n_similar, int(np.isfinite(sims).sum()))
+        return [self.student_ids[i] for i in _top_k(sims, k)]
+
+
+class CourseBitsetIndex:
+    """Tập môn học của mỗi sinh viên dưới dạng bitset để tính Jaccard hàng loạt."""
+
+    def __init__(self, student_ids: Sequence[str], course_codes: Sequence[str], bits: np.ndarray):
+        self.student_ids = list(student_ids)
+        self.course_codes = list(course_codes)
+        self.course_index: Dict[str, int] = {code: i for i, code in enumerate(self.course_codes)}
+        self.bits = bits
+        self.sizes = _popcount(bits).sum(axis=1) if bits.size else np.zeros(len(self.student_ids), dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, course_universe: Optional[Iterable[str]] = None) -> 'CourseBitsetIndex':
+        """
+        Tạo index từ DataFrame (cột StudentID, CourseCode).
+
+        Thứ tự sinh viên là thứ tự xuất hiện trong DataFrame (giống df['StudentID'].unique()).
+        Môn học ngoài `course_universe` vẫn được thêm vào để không mất thông tin.
+        """
+        student_col = df['StudentID']
+        course_col = df['CourseCode'].astype(str)
+
+        student_ids = pd.unique(student_col)
+        universe = sorted(set(course_universe or []) | set(course_col.unique()))
+        n_words = max(1, (len(universe) + 63) // 64)
+
+        rows = pd.Index(student_ids).get_indexer(student_col)
+        cols = pd.Index(universe).get_indexer(course_col)
+
+        bits = np.zeros((len(student_ids), n_words), dtype=np.uint64)
+        masks = np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64))
+        np.bitwise_or.at(bits, (rows, cols >> 6), masks)
+        return cls(student_ids, universe, bits)
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    def encode(self, courses: Iterable[str]) -> Tuple[np.ndarray, int]:
+        """
+        Mã hoá một tập môn học thành bitset.
+
+        Returns:
+            Tuple (bitset, số môn không có trong index - chỉ tính vào phần hợp)
+        """
+        query = np.zeros(self.bits.shape[1] if self.bits.ndim == 2 else 1, dtype=np.uint64)
+        extra = 0
+        for code in set(courses):
+            col = self.course_index.get(code)
+            if col is None:
+                extra += 1
+            else:
+                query[col >> 6] |= np.uint64(1) << np.uint64(col & 63)
+        return query, extra
+
+    def jaccard(self, courses: Iterable[str]) -> np.ndarray:
+        """Jaccard similarity giữa tập `courses` và tập môn học của mọi sinh viên trong index."""
+        query, extra = self.encode(courses)
+        query_size = int(_popcount(query).sum()) + extra
+
+        intersection = _popcount(self.bits & query).sum(axis=1)
+        union = self.sizes + query_size - intersection
+        return np.divide(intersection, union, out=np.zeros(len(self.student_ids)), where=union > 0)
+
+    def most_similar(self, courses: Iterable[str], n_similar: int = 10) -> List[str]:
+        """
+        Lấy tối đa n StudentID có Jaccard > 0 cao nhất (bằng nhau thì theo thứ tự trong index).
+        """
+        if len(self.student_ids) == 0 or n_similar <= 0:
+            return []
+
+        sims = self.jaccard(courses)
+        return [self.student_ids[i] for i in _top_k(sims, n_similar) if sims[i] > 0]
@@ -2,37 +2,113 @@ import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-import joblib
-import mysql.connector
-from config import DB_CONFIG
+import time
+from recommender.course_catalog import get_course_catalog
+from recommender.model_registry import get_model_registry
+from recommender.dataset_store import get_student_data, get_dataset_version, read_student_data
+
+BUNDLE_FORMAT = 1
+
+
+def build_feature_matrix(df, all_courses, min_score=4.0, student_ids=None):
+    """
+    Tạo feature matrix (số sinh viên x số môn) trong một lượt, không lặp theo từng sinh viên.
+
+    Mỗi ô là số tín chỉ của môn đã đạt (Score >= min_score); môn học nhiều lần thì lấy
+    lần đạt xuất hiện sau cùng trong dữ liệu. Môn không có trong `all_courses` bị bỏ qua.
+
+    Args:
+        df: DataFrame có các cột StudentID, CourseCode, Score, Credits
+        all_courses: Thứ tự cột (danh sách mã môn)
+        min_score: Điểm tối thiểu để tính là đạt
+        student_ids: Thứ tự hàng; mặc định là thứ tự xuất hiện trong df
+
+    Returns:
+        Tuple (ma trận float32, danh sách StudentID theo hàng)
+    """
+    if student_ids is None:
+        student_ids = pd.unique(df['StudentID'])
+    student_ids = list(student_ids)
+
+    # CourseCode → chỉ số cột (môn ngoài all_courses là -1)
+    cols = pd.Index(list(all_courses)).get_indexer(df['CourseCode'].astype(str))
+    rows = pd.Index(student_ids).get_indexer(df['StudentID'])
+    scores = pd.to_numeric(df['Score'], errors='coerce').to_numpy(dtype=float)
+    credits = pd.to_numeric(df['Credits'], errors='coerce').fillna(0).to_numpy(dtype=np.float32)
+
+    mask = (cols >= 0) & (rows >= 0) & (scores >= min_score)
+    cells = pd.DataFrame({'row': rows[mask], 'col': cols[mask], 'credits': credits[mask]})
+    cells = cells.drop_duplicates(subset=['row', 'col'], keep='last')
+
+    X = np.zeros((len(student_ids), len(all_courses)), dtype=np.float32)
+    X[cells['row'].to_numpy(), cells['col'].to_numpy()] = cells['credits'].to_numpy()
+    return X, student_ids
+
+
+def compute_student_gpas(df, student_ids, min_score=4.0):
+    """GPA của từng sinh viên = điểm trung bình các môn đạt (0.0 nếu chưa đạt môn nào)."""
+    return (
+        df[df['Score'] >= min_score].groupby('StudentID')['Score'].mean()
+        .reindex(list(student_ids)).fillna(0.0).to_numpy(dtype=float)
+    )
+
+
+def compute_top_students(student_ids, labels, gpas, n_clusters=5):
+    """
+    Sinh viên có GPA cao nhất của mỗi cluster (GPA bằng nhau thì lấy sinh viên xuất hiện trước).
+
+    Returns:
+        Dict với key là cluster_id, value là StudentID (None nếu cluster rỗng)
+    """
+    labels = np.asarray(labels)
+    gpas = np.asarray(gpas, dtype=float)
+    top_students = {}
+    for cluster_id in range(n_clusters):
+        members = np.flatnonzero(labels == cluster_id)
+        if len(members) > 0:
+            top_students[cluster_id] = student_ids[members[np.argmax(gpas[members])]]
+        else:
+            top_students[cluster_id] = None
+    return top_students
 
 
 def get_all_courses():
-    """Lấy danh sách tất cả mã môn học từ database."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT CourseCode FROM MonHoc ORDER BY CourseCode")
-    courses = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return courses
+    """Lấy danh sách tất cả mã môn học (từ danh mục MonHoc đã nạp sẵn)."""
+    return get_course_catalog().codes()
 
 
-def train_kmeans(excel_path, out_model='models/kmeans_model.pkl', use_graduated_only=True):
+def train_kmeans(excel_path, out_model='models/kmeans_model.pkl', use_graduated_only=True, progress=None,
+                 cache_dataset=True):
     """
     Train K-Means với 5 clusters dựa trên feature vector 53 chiều (mỗi chiều = số tín chỉ đạt được cho mỗi môn).
     
     Args:
         excel_path: Đường dẫn đến file Excel chứa dữ liệu sinh viên
-        out_model: Đường dẫn để lưu model
+        out_model: Đường dẫn model (kho phiên bản nằm ở <out_model bỏ .pkl>_versions/)
         use_graduated_only: Nếu True, chỉ train với sinh viên tốt nghiệp (đã học CT555 với điểm >= 5.0)
+        progress: Hàm progress(fraction, message) để báo tiến độ (ví dụ từ training_jobs), có thể None
+        cache_dataset: False với file chỉ train một lần (file upload): đọc trực tiếp, không giữ
+            trong dataset_store và không ghi snapshot
         
     Returns:
         Đường dẫn đến model đã lưu
+
+    Ngoài model và scaler, hàm còn lưu bundle chứa tâm cluster,
+    thứ tự cột all_courses, nhãn cluster và GPA của từng sinh viên cùng sinh viên trội nhất
+    mỗi cluster, để các trang kế hoạch học tập không phải tính lại lúc request.
+    Cả ba được lưu thành một phiên bản mới trong model_registry rồi mới chuyển con trỏ CURRENT.
     """
-    # Đọc dữ liệu từ Excel
-    df = pd.read_excel(excel_path)
-    df = df.dropna(subset=['StudentID'])
-    df['StudentID'] = df['StudentID'].astype(str).str.strip()
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+    
+    # Đọc dữ liệu từ Excel (qua cache; tự nạp lại nếu file vừa được thay)
+    report(0.05, 'Đọc dữ liệu')
+    if cache_dataset:
+        df = get_student_data(excel_path)
+        dataset_version = get_dataset_version(excel_path)
+    else:
+        df, dataset_version = read_student_data(excel_path)
     
     # Nếu chỉ dùng sinh viên tốt nghiệp, lọc dữ liệu
     if use_graduated_only:
@@ -54,37 +130,10 @@ def train_kmeans(excel_path, out_model='models/kmeans_model.pkl', use_graduated_
     all_courses = get_all_courses()
     print(f"📖 Tìm thấy {len(all_courses)} môn học")
     
-    # Tạo feature matrix: mỗi hàng là một sinh viên, mỗi cột là một môn học
-    feature_matrix = []
-    student_ids = []
-    
-    unique_students = df['StudentID'].unique()
-    print(f"👥 Số sinh viên sẽ train: {len(unique_students)}")
-    
-    for student_id in unique_students:
-        student_data = df[df['StudentID'] == student_id]
-        
-        # Tạo feature vector: số tín chỉ đạt được cho mỗi môn
-        passed_courses = {}
-        for _, row in student_data.iterrows():
-            course_code = str(row.get('CourseCode', ''))
-            if course_code in all_courses:
-                score = float(row.get('Score', 0)) if pd.notna(row.get('Score')) else 0
-                credits = float(row.get('Credits', 0)) if pd.notna(row.get('Credits')) else 0
-                # Chỉ tính các môn đã đạt (score >= 4.0)
-                if score >= 4.0:
-                    passed_courses[course_code] = credits
-        
-        # Tạo vector 53 chiều
-        feature_vector = np.array([
-            passed_courses.get(course, 0) for course in all_courses
-        ])
-        
-        feature_matrix.append(feature_vector)
-        student_ids.append(student_id)
-    
-    # Chuyển thành numpy array
-    X = np.array(feature_matrix)
+    # Tạo feature matrix: mỗi hàng là một sinh viên, mỗi cột là số tín chỉ đạt được của một môn
+    report(0.2, 'Tạo feature matrix')
+    X, student_ids = build_feature_matrix(df, all_courses)
+    print(f"👥 Số sinh viên sẽ train: {len(student_ids)}")
     print(f"Feature matrix shape: {X.shape} (số sinh viên x số môn học)")
     
     # Normalize dữ liệu
@@ -92,22 +141,45 @@ def train_kmeans(excel_path, out_model='models/kmeans_model.pkl', use_graduated_
     X_normalized = scaler.fit_transform(X)
     
     # Train K-Means với 5 clusters
+    report(0.35, 'Train K-Means')
     kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
     kmeans.fit(X_normalized)
     
-    # Lưu model và scaler
-    joblib.dump(kmeans, out_model)
-    scaler_path = out_model.replace('.pkl', '_scaler.pkl')
-    joblib.dump(scaler, scaler_path)
+    # Gán cluster giống cách tính lúc request (predict trên dữ liệu đã normalize)
+    labels = kmeans.predict(X_normalized)
+    
+    # GPA = điểm trung bình các môn đạt (Score >= 4.0)
+    report(0.8, 'Tính GPA và sinh viên trội nhất mỗi cluster')
+    gpas = compute_student_gpas(df, student_ids)
+    top_students = compute_top_students(student_ids, labels, gpas, n_clusters=5)
+    
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'model': kmeans,
+        'scaler': scaler,
+        'centroids': kmeans.cluster_centers_,
+        'all_courses': list(all_courses),
+        'student_ids': list(student_ids),
+        'labels': labels,
+        'gpas': gpas,
+        'top_students': top_students,
+        'use_graduated_only': bool(use_graduated_only),
+        'dataset_version': dataset_version,
+        'trained_at': time.time()
+    }
+    
+    # Lưu model, scaler và bundle thành một phiên bản mới
+    report(0.9, 'Lưu model')
+    registry = get_model_registry(out_model)
+    version = registry.publish(kmeans, scaler, bundle)
     
     print(f"✅ Đã train K-Means với 5 clusters")
-    print(f"✅ Đã lưu model: {out_model}")
-    print(f"✅ Đã lưu scaler: {scaler_path}")
+    print(f"✅ Đã lưu model phiên bản {version}: {registry.version_dir(version)}")
     
     # In thống kê clusters
-    labels = kmeans.labels_
     for i in range(5):
         count = np.sum(labels == i)
         print(f"  Cluster {i}: {count} sinh viên")
     
+    report(1.0, 'Hoàn thành')
     return out_model
@@ -0,0 +1,238 @@
+"""
+Chạy train K-Means ở nền thay vì trong request.
+
+submit_training() trả về job ngay lập tức (id, trạng thái, tiến độ); job chạy trên một
+thread riêng của worker (mỗi lúc chỉ một job). Model mới được publish thành một phiên bản
+trong model_registry nên các worker khác tự nạp lại ở lần đọc kế tiếp.
+
+Nhiều worker cùng khởi động có thể cùng submit: file khoá `.training.lock` cạnh model
+bảo đảm chỉ một tiến trình train, các job còn lại kết thúc với trạng thái 'skipped'.
+
+Trạng thái mỗi job được ghi thành file JSON nhỏ trong `.training_jobs/` cạnh model, nên
+GET /train/<job_id> trả lời được ở mọi worker, không chỉ worker đã nhận POST.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from recommender.train_model import train_kmeans
+
+# Khoá cũ hơn thời gian này coi như bỏ dở (tiến trình train bị kill) và được chiếm lại
+LOCK_STALE_SECONDS = 3600
+MAX_FINISHED_JOBS = 50
+
+_ACTIVE_STATUSES = ('queued', 'running')
+
+
+def _lock_path(model_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), '.training.lock')
+
+
+def _jobs_dir(model_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), '.training_jobs')
+
+
+def _job_file(model_path: str, job_id: str) -> Optional[str]:
+    # job_id đến từ URL → chỉ nhận chuỗi hex (uuid4().hex) để không thoát khỏi thư mục
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+        return None
+    return os.path.join(_jobs_dir(model_path), f"{job_id}.json")
+
+
+def _write_job_file(job: Dict) -> None:
+    """Ghi trạng thái job ra JSON (file tạm rồi os.replace để tiến trình khác không đọc phải file ghi dở)."""
+    directory = _jobs_dir(job['model_path'])
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, f"{job['id']}.json"))
+    except OSError as e:
+        print(f"⚠️  Không ghi được trạng thái job train {job['id']}: {e}")
+
+
+def _read_job_file(model_path: str, job_id: str) -> Optional[Dict]:
+    path = _job_file(model_path, job_id)
+    if path is None:
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_job_files(model_path: str, keep: int = MAX_FINISHED_JOBS) -> None:
+    """Giữ lại `keep` file trạng thái mới nhất."""
+    directory = _jobs_dir(model_path)
+    try:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')]
+        paths.sort(key=os.path.getmtime)
+    except OSError:
+        return
+    for path in paths[:max(0, len(paths) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _acquire_lock(path: str) -> bool:
+    """Tạo file khoá (O_EXCL); False nếu tiến trình khác đang giữ khoá còn hiệu lực."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < LOCK_STALE_SECONDS:
+                    return False
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def _release_lock(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class TrainingJobRunner:
+    """Hàng đợi job train (một worker thread), lưu trạng thái các job gần nhất."""
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='train')
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_finished = max_finished
+
+    def submit(self, excel_path: str, model_path: str, use_graduated_only: bool = True,
+               cache_dataset: bool = True) -> Dict:
+        """
+        Đưa một job train vào hàng đợi.
+
+        cache_dataset=False cho file upload chỉ train một lần (xem train_kmeans).
+
+        Nếu đã có job đang chờ/chạy cho cùng model_path thì trả về job đó thay vì tạo job mới.
+
+        Returns:
+            Dict trạng thái job (bản sao)
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job['model_path'] == model_path and job['status'] in _ACTIVE_STATUSES:
+                    return dict(job)
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'status': 'queued',
+                'progress': 0.0,
+                'message': 'Đang chờ',
+                'excel_path': excel_path,
+                'model_path': model_path,
+                'use_graduated_only': use_graduated_only,
+                'cache_dataset': cache_dataset,
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None
+            }
+            self._jobs[job['id']] = job
+            self._prune()
+            snapshot = dict(job)
+
+        _write_job_file(snapshot)
+        _prune_job_files(model_path)
+        self._executor.submit(self._run, job['id'])
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Trạng thái một job (bản sao) hoặc None nếu không có."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+            snapshot = dict(self._jobs[job_id])
+        _write_job_file(snapshot)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] not in _ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        lock_path = _lock_path(job['model_path'])
+        if not _acquire_lock(lock_path):
+            self._update(job_id, status='skipped', progress=1.0, finished_at=time.time(),
+                         message='Tiến trình khác đang train model này')
+            return
+
+        self._update(job_id, status='running', started_at=time.time(), message='Bắt đầu train')
+        try:
+            train_kmeans(
+                job['excel_path'],
+                job['model_path'],
+                use_graduated_only=job['use_graduated_only'],
+                cache_dataset=job['cache_dataset'],
+                progress=lambda fraction, message: self._update(job_id, progress=round(fraction, 2),
+                                                                message=message)
+            )
+            self._update(job_id, status='done', progress=1.0, message='Hoàn thành', finished_at=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status='failed', error=str(e), message='Lỗi khi train',
+                         finished_at=time.time())
+        finally:
+            _release_lock(lock_path)
+
+
+_runner: Optional[TrainingJobRunner] = None
+_runner_lock = threading.Lock()
+_runner_pid: Optional[int] = None
+
+
+def get_training_runner() -> TrainingJobRunner:
+    """Runner dùng chung trong tiến trình (tạo lại sau fork vì thread không đi theo tiến trình con)."""
+    global _runner, _runner_pid
+    with _runner_lock:
+        if _runner is None or _runner_pid != os.getpid():
+            _runner = TrainingJobRunner()
+            _runner_pid = os.getpid()
+        return _runner
+
+
+def submit_training(excel_path: str, model_path: str, use_graduated_only: bool = True,
+                    cache_dataset: bool = True) -> Dict:
+    """Đưa job train vào hàng đợi nền, trả về trạng thái job (có 'id')."""
+    return get_training_runner().submit(excel_path, model_path, use_graduated_only, cache_dataset)
+
+
+def get_training_job(job_id: str, model_path: str) -> Optional[Dict]:
+    """
+    Trạng thái job train theo id (job của tiến trình này, hoặc file JSON do worker khác ghi),
+    None nếu không tìm thấy.
+    """
+    job = get_training_runner().get(job_id)
+    if job is not None:
+        return job
+    return _read_job_file(model_path, job_id)
@@ -3,18 +3,19 @@
 Hash remaining plaintext passwords in the SinhVien table.
 
 Usage:
-  python3 scripts/hash_remaining_passwords.py [--dry-run]
+  python3 scripts/hash_remaining_passwords.py [--dry-run] [--workers N] [--batch-size N]
 
 - Connects using DB_CONFIG from config.py
 - Detects whether a password is already a Werkzeug hash (e.g., starts with 'pbkdf2:')
-- Hashes only rows that appear to be plaintext
+- Hashes only rows that appear to be plaintext, in parallel across a process pool
+  (--workers, default: CPU count) and writes each batch with one executemany
 - With --dry-run, prints what would change without writing to DB
 """
 import sys
 import argparse
 import mysql.connector
-from werkzeug.security import generate_password_hash
 from config import DB_CONFIG
+from etl.password_hashing import DEFAULT_HASH_BATCH_SIZE, PasswordHasher
 
 
 def is_probably_hashed(password_value: str) -> bool:
@@ -35,7 +36,8 @@ def fetch_students(conn):
 essential_fields = ['StudentID', 'Password']
 
 
-def hash_remaining(dry_run: bool = False) -> int:
+def hash_remaining(dry_run: bool = False, workers: int = None,
+                   batch_size: int = DEFAULT_HASH_BATCH_SIZE) -> int:
     conn = mysql.connector.connect(**DB_CONFIG)
     try:
         students = fetch_students(conn)
@@ -59,12 +61,15 @@ def hash_remaining(dry_run: bool = False) -> int:
             return 0
 
         cur = conn.cursor()
-        for sid, plain in to_update:
-            hashed = generate_password_hash(plain, method='pbkdf2:sha256')
-            cur.execute("UPDATE SinhVien SET Password=%s WHERE StudentID=%s", (hashed, sid))
-        conn.commit()
+        with PasswordHasher(workers=workers, batch_size=batch_size) as hasher:
+            print(f"Hashing {len(to_update)} passwords with {hasher.workers} worker(s)...")
+            for batch in hasher.iter_hashes(to_update):
+                cur.executemany("UPDATE SinhVien SET Password=%s WHERE StudentID=%s",
+                                [(hashed, sid) for sid, hashed in batch])
+                conn.commit()
+                print(f"  {hasher.hashed}/{len(to_update)} hashed ({hasher.rate():.1f} passwords/s)")
         cur.close()
-        print(f"Updated {len(to_update)} accounts to hashed passwords.")
+        print(f"Updated {len(to_update)} accounts to hashed passwords in {hasher.seconds:.1f}s.")
         return 0
     finally:
         conn.close()
@@ -73,5 +78,8 @@ def hash_remaining(dry_run: bool = False) -> int:
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Hash remaining plaintext passwords in SinhVien table.')
     parser.add_argument('--dry-run', action='store_true', help='Show what would change without updating the database')
+    parser.add_argument('--workers', type=int, default=None, help='Number of hashing processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_HASH_BATCH_SIZE,
+                        help=f'Passwords per batch / UPDATE round-trip (default: {DEFAULT_HASH_BATCH_SIZE})')
     args = parser.parse_args()
-    sys.exit(hash_remaining(dry_run=args.dry_run))
+    sys.exit(hash_remaining(dry_run=args.dry_run, workers=args.workers, batch_size=args.batch_size))
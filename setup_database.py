@@ -6,8 +6,11 @@ import mysql.connector
 import pandas as pd
 import os
 import sys
-from werkzeug.security import generate_password_hash
 from config import DB_CONFIG
+from etl.chunked_reader import iter_student_chunks
+from etl.import_excel_to_db import forget_row_hashes
+from etl.password_hashing import PasswordHasher
+from etl.student_summary import CREATE_SUMMARY_TABLE_SQL, refresh_student_summary
 
 def connect_mysql_server():
     """Kết nối MySQL server (không cần database)"""
@@ -162,6 +165,44 @@ def run_migrations(conn):
             else:
                 print(f"⚠️  Lỗi thêm Graduated: {e}")
         
+        # 3. Bảng tổng hợp theo sinh viên
+        print("\n🔧 Tạo bảng SinhVienTongKet...")
+        cursor.execute(CREATE_SUMMARY_TABLE_SQL)
+        print("✅ Bảng SinhVienTongKet sẵn sàng")
+        
+        # 4. Index cho phân trang / tìm kiếm ở trang quản trị (migrations/006_add_admin_list_indexes.sql)
+        print("\n🔧 Tạo index cho trang quản trị...")
+        for table, index_name, columns in [
+            ('SinhVien', 'idx_sinhvien_hoten', 'HoTen'),
+            ('MonHoc', 'idx_monhoc_name', 'CourseName(100)'),
+            ('TienTrinh', 'idx_tientrinh_course_term', 'CourseCode, Year, Semester, StudentID')
+        ]:
+            try:
+                cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} ({columns})")
+                print(f"✅ Đã thêm index {index_name}")
+            except mysql.connector.Error as e:
+                if 'Duplicate key name' in str(e):
+                    print(f"ℹ️  Index {index_name} đã tồn tại")
+                else:
+                    print(f"⚠️  Lỗi thêm index {index_name}: {e}")
+        
+        # 5. Chuẩn hoá StudentID đã lưu (migrations/007_normalize_student_ids.sql)
+        print("\n🔧 Chuẩn hoá StudentID...")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        try:
+            for table in ['SinhVien', 'TienTrinh', 'SinhVienTongKet', 'KeHoachHocTap']:
+                try:
+                    cursor.execute(f"""
+                        UPDATE {table} SET StudentID = UPPER(TRIM(StudentID))
+                        WHERE BINARY StudentID <> BINARY UPPER(TRIM(StudentID))
+                    """)
+                    if cursor.rowcount:
+                        print(f"✅ Đã chuẩn hoá {cursor.rowcount} StudentID trong {table}")
+                except mysql.connector.Error as e:
+                    print(f"⚠️  Lỗi chuẩn hoá StudentID trong {table}: {e}")
+        finally:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        
         conn.commit()
         
     except Exception as e:
@@ -171,57 +212,44 @@ def run_migrations(conn):
     
     return True
 
-def import_excel_data(conn):
-    """Import dữ liệu từ Excel"""
-    excel_file = 'data/student_data_100-2.xlsx'
-    
-    if not os.path.exists(excel_file):
-        print(f"❌ Không tìm thấy file {excel_file}")
-        return False
-    
-    print(f"\n📊 Đọc dữ liệu từ {excel_file}...")
-    try:
-        df = pd.read_excel(excel_file)
-        print(f"✅ Đọc được {len(df)} dòng dữ liệu")
-        print(f"📋 Các cột: {', '.join(df.columns)}")
-    except Exception as e:
-        print(f"❌ Lỗi đọc Excel: {e}")
-        return False
-    
-    # Import sinh viên
-    print("\n👥 Bước 1: Import danh sách sinh viên...")
-    students = df[['StudentID']].drop_duplicates()
-    cursor = conn.cursor()
-    
-    for _, row in students.iterrows():
-        student_id = str(row['StudentID']).strip()
-        password_hash = generate_password_hash(student_id, method='pbkdf2:sha256')
-        
+STUDENT_INSERT_SQL = """
+    INSERT INTO SinhVien (StudentID, HoTen, Password, GioiTinh, NgaySinh, Email)
+    VALUES (%s, %s, %s, 'Nam', '2003-01-01', %s)
+    ON DUPLICATE KEY UPDATE HoTen = VALUES(HoTen)
+"""
+
+def _import_student_chunk(conn, cursor, df, seen_ids, hasher):
+    """
+    Import sinh viên của một khối dữ liệu (bỏ qua sinh viên đã có trong seen_ids ở khối trước).
+    Mật khẩu mặc định (= mã SV) được hash song song bằng hasher, mỗi lô ghi bằng một executemany.
+    """
+    student_ids = [sid for sid in df['StudentID'].drop_duplicates() if sid not in seen_ids]
+    seen_ids.update(student_ids)
+    
+    for batch in hasher.iter_hashes((student_id, student_id) for student_id in student_ids):
+        rows = [
+            (student_id, f"Sinh viên {student_id}", password_hash, f"{student_id}@student.ctu.edu.vn")
+            for student_id, password_hash in batch
+        ]
         try:
-            cursor.execute("""
-                INSERT INTO SinhVien (StudentID, HoTen, Password, GioiTinh, NgaySinh, Email)
-                VALUES (%s, %s, %s, 'Nam', '2003-01-01', %s)
-                ON DUPLICATE KEY UPDATE HoTen = VALUES(HoTen)
-            """, (
-                student_id,
-                f"Sinh viên {student_id}",
-                password_hash,
-                f"{student_id}@student.ctu.edu.vn"
-            ))
-        except mysql.connector.Error as err:
-            print(f"⚠️  Lỗi thêm sinh viên {student_id}: {err}")
-    
-    conn.commit()
-    print(f"✅ Đã import {len(students)} sinh viên")
-    
-    # Import tiến trình
-    print("\n📚 Bước 2: Import tiến trình học tập...")
-    inserted = 0
-    errors = 0
-    
+            cursor.executemany(STUDENT_INSERT_SQL, rows)
+            conn.commit()
+        except mysql.connector.Error:
+            # Một dòng lỗi làm hỏng cả lô → ghi lại từng dòng để chỉ bỏ qua sinh viên lỗi
+            conn.rollback()
+            for row in rows:
+                try:
+                    cursor.execute(STUDENT_INSERT_SQL, row)
+                except mysql.connector.Error as err:
+                    print(f"⚠️  Lỗi thêm sinh viên {row[0]}: {err}")
+            conn.commit()
+        print(f"🔐 Đã tạo {hasher.hashed} tài khoản ({hasher.rate():.1f} tài khoản/s)")
+
+def _import_progress_chunk(conn, cursor, df, row_offset, inserted, errors):
+    """Import tiến trình học tập của một khối dữ liệu, trả về (inserted, errors) cộng dồn"""
     for idx, row in df.iterrows():
         try:
-            student_id = str(row['StudentID']).strip()
+            student_id = row['StudentID']
             year = int(row['Year'])
             semester = int(row['Semester'])
             course_code = str(row['CourseCode']).strip()
@@ -264,16 +292,66 @@ def import_excel_data(conn):
             
             if inserted % 100 == 0:
                 conn.commit()
-                print(f"⏳ Đã import {inserted}/{len(df)} dòng...")
+                print(f"⏳ Đã import {inserted} dòng...")
                 
         except Exception as e:
             errors += 1
             if errors <= 5:  # Chỉ in 5 lỗi đầu
-                print(f"⚠️  Lỗi dòng {idx + 1}: {e}")
+                print(f"⚠️  Lỗi dòng {row_offset + idx + 1}: {e}")
+    
+    # RowHash của import tăng dần không còn khớp các dòng vừa ghi
+    forget_row_hashes(cursor, sorted(df['StudentID'].dropna().unique().tolist()))
+    return inserted, errors
+
+def import_excel_data(conn):
+    """Import dữ liệu từ Excel (đọc theo từng khối để không nạp cả file lớn vào bộ nhớ)"""
+    excel_file = 'data/student_data_100-2.xlsx'
+    
+    if not os.path.exists(excel_file):
+        print(f"❌ Không tìm thấy file {excel_file}")
+        return False
+    
+    print(f"\n📊 Đọc dữ liệu từ {excel_file}...")
+    cursor = conn.cursor()
+    total_rows = 0
+    student_ids = set()
+    inserted = 0
+    errors = 0
     
-    conn.commit()
+    try:
+        # Một process pool hash mật khẩu dùng chung cho mọi khối
+        with PasswordHasher() as hasher:
+            for chunk_no, df in enumerate(iter_student_chunks(excel_file), start=1):
+                if chunk_no == 1:
+                    print(f"📋 Các cột: {', '.join(df.columns)}")
+                print(f"\n📦 Khối {chunk_no}: {len(df)} dòng")
+                
+                # Import sinh viên
+                print(f"👥 Bước 1: Import danh sách sinh viên (hash mật khẩu trên {hasher.workers} process)...")
+                _import_student_chunk(conn, cursor, df, student_ids, hasher)
+                conn.commit()
+                
+                # Import tiến trình
+                print("📚 Bước 2: Import tiến trình học tập...")
+                inserted, errors = _import_progress_chunk(conn, cursor, df, total_rows, inserted, errors)
+                conn.commit()
+                total_rows += len(df)
+    except Exception as e:
+        print(f"❌ Lỗi đọc Excel: {e}")
+        cursor.close()
+        return False
+    
+    # Tính bảng tổng hợp một lần cho toàn bộ sinh viên
+    print("\n📊 Cập nhật bảng tổng hợp SinhVienTongKet...")
+    try:
+        refresh_student_summary(cursor)
+        conn.commit()
+    except mysql.connector.Error as err:
+        print(f"⚠️  Lỗi cập nhật SinhVienTongKet: {err}")
     cursor.close()
     
+    print(f"\n✅ Đọc được {total_rows} dòng dữ liệu")
+    print(f"✅ Đã import {len(student_ids)} sinh viên")
     print(f"✅ Đã import {inserted} records tiến trình ({errors} lỗi)")
     return True
 
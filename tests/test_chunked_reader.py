@@ -0,0 +1,110 @@
+"""
+Đọc theo khối (iter_student_chunks) phải cho cùng dữ liệu với đọc cả file một lần bằng
+pandas rồi chuẩn hoá kiểu, với mọi kích thước khối.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.chunked_reader import iter_student_chunks, read_student_file, type_student_chunk
+
+COLUMNS = ['StudentID', 'HoTen', 'Year', 'Semester', 'CourseCode', 'CourseName',
+           'Credits', 'Score', 'OnTime', 'Grad']
+
+
+def _rows(n=23):
+    rows = []
+    for i in range(n):
+        rows.append([
+            None if i == 5 else (f' b21{i:05d} ' if i % 4 == 0 else f'B21{i:05d}'),
+            f'Sinh viên {i}',
+            1 + i % 4,
+            1 + i % 2,
+            f'CT{i % 6:03d}',
+            f'Môn {i % 6}',
+            1 + i % 4,
+            'abc' if i == 7 else round(i * 0.43, 1),
+            None if i == 11 else ('True' if i % 3 else 'False'),
+            bool(i % 2)
+        ])
+    return rows
+
+
+@pytest.fixture
+def xlsx_path(tmp_path):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(COLUMNS)
+    for row in _rows():
+        sheet.append(row)
+    path = tmp_path / 'students.xlsx'
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'students.csv'
+    pd.DataFrame(_rows(), columns=COLUMNS).assign(StudentID=lambda d: d['StudentID'].str.replace('B21', '021', case=False))\
+        .to_csv(path, index=False)
+    return str(path)
+
+
+def _expected(path):
+    if path.endswith('.csv'):
+        raw = pd.read_csv(path, dtype={'StudentID': str, 'CourseCode': str})
+    else:
+        raw = pd.read_excel(path)
+    return type_student_chunk(raw)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 22, 23, 1000])
+@pytest.mark.parametrize('fixture', ['xlsx_path', 'csv_path'])
+def test_chunks_concatenate_to_whole_file(request, fixture, chunk_size):
+    path = request.getfixturevalue(fixture)
+    chunks = list(iter_student_chunks(path, chunk_size=chunk_size))
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == 22  # dòng thiếu StudentID bị bỏ
+
+    expected = _expected(path)
+    actual = pd.concat(chunks, ignore_index=True)
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual, expected)
+    pd.testing.assert_frame_equal(read_student_file(path, chunk_size), actual)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1000])
+def test_chunk_dtypes(xlsx_path, chunk_size):
+    for chunk in iter_student_chunks(xlsx_path, chunk_size=chunk_size):
+        for column in ('Year', 'Semester', 'Credits', 'Score'):
+            assert pd.api.types.is_numeric_dtype(chunk[column]), column
+        assert chunk['StudentID'].map(lambda s: s == s.strip().upper()).all()
+        assert chunk['CourseCode'].map(lambda s: isinstance(s, str)).all()
+        assert chunk['Grad'].dtype == bool
+        on_time = chunk['OnTime']
+        if on_time.notna().all():
+            assert on_time.dtype == bool
+        else:
+            assert set(on_time.dropna()) <= {True, False}
+    whole = read_student_file(xlsx_path, chunk_size)
+    assert np.isnan(whole.loc[whole['StudentID'] == 'B2100007', 'Score']).all()  # ô lỗi → NaN
+
+
+def test_csv_student_ids_keep_leading_zeros(csv_path):
+    ids = read_student_file(csv_path, chunk_size=3)['StudentID']
+    assert ids.str.startswith('021').all()
+
+
+def test_blank_xlsx_rows_are_skipped(tmp_path):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['StudentID', 'CourseCode', 'Score'])
+    sheet.append(['B1', 'CT001', 5])
+    sheet.append([None, None, None])
+    sheet.append(['B2', 'CT002', 6])
+    path = tmp_path / 'blank.xlsx'
+    workbook.save(path)
+    chunks = list(iter_student_chunks(str(path), chunk_size=1))
+    assert [chunk['StudentID'].tolist() for chunk in chunks] == [['B1'], ['B2']]
@@ -0,0 +1,110 @@
+"""
+Import tăng dần (diff_progress) phải cho cùng nội dung TienTrinh với việc thay toàn bộ các
+học kỳ có trong file mới, nhưng chỉ ghi những dòng thật sự thay đổi.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.chunked_reader import PROGRESS_KEY
+from etl.import_excel_to_db import diff_progress, prepare_progress_frame, row_hashes
+
+
+def _excel_rows(seed, n_students=8):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_students):
+        for year in (1, 2):
+            for semester in (1, 2):
+                for course in rng.choice(10, size=3, replace=False):
+                    rows.append({
+                        'StudentID': f'b21{i:05d}' if i % 3 == 0 else f'B21{i:05d}',
+                        'Year': year, 'Semester': semester,
+                        'CourseCode': f'CT{course:03d}', 'CourseName': f'Môn {course}',
+                        'Credits': int(rng.integers(1, 5)),
+                        'Score': np.nan if rng.random() < 0.1 else round(float(rng.uniform(0, 10)), 1),
+                        'OnTime': 'True', 'Grad': 'False'
+                    })
+    return pd.DataFrame(rows)
+
+
+def _key(row):
+    return (row['StudentID'], int(row['Year']), int(row['Semester']), row['CourseCode'])
+
+
+def _table(frame):
+    """Nội dung bảng TienTrinh (khoá → RowHash) sau khi ghi toàn bộ `frame`."""
+    return dict(zip((_key(r) for _, r in frame.iterrows()), row_hashes(frame)))
+
+
+def _apply(table, frame, existing_hashes=True):
+    """Chạy diff_progress trên bảng giả lập rồi áp dụng kết quả như import_progress_incremental."""
+    existing = dict(table) if existing_hashes else {key: None for key in table}
+    inserts, updates, deletes = diff_progress(frame, existing)
+    result = dict(table)
+    for part in (inserts, updates):
+        for _, row in part.iterrows():
+            result[_key(row)] = row['RowHash']
+    for key in deletes:
+        del result[key]
+    return result, inserts, updates, deletes
+
+
+def _modify(df, seed):
+    """File mới: sửa điểm, thêm môn, bỏ môn, thêm học kỳ mới; chỉ giữ năm 2 (học kỳ năm 1 không có trong file)."""
+    rng = np.random.default_rng(seed + 100)
+    df = df[df['Year'] == 2].copy().reset_index(drop=True)
+    df.loc[rng.choice(len(df), size=5, replace=False), 'Score'] = 9.9
+    df = df.drop(index=rng.choice(len(df), size=4, replace=False))
+    extra = df.iloc[:3].copy()
+    extra['CourseCode'] = 'CT999'
+    new_semester = df.iloc[:2].copy()
+    new_semester['Year'] = 3
+    return pd.concat([df, extra, new_semester], ignore_index=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_matches_full_semester_replace(seed):
+    old_frame, _ = prepare_progress_frame(_excel_rows(seed))
+    table = _table(old_frame)
+
+    new_frame, errors = prepare_progress_frame(_modify(_excel_rows(seed), seed))
+    assert errors == 0
+    result, inserts, updates, deletes = _apply(table, new_frame)
+
+    new_semesters = set(map(tuple, new_frame[PROGRESS_KEY[:3]].itertuples(index=False, name=None)))
+    expected = {key: h for key, h in table.items() if key[:3] not in new_semesters}
+    expected.update(_table(new_frame))
+    assert result == expected
+
+    # Chỉ ghi dòng thật sự đổi: dòng trùng nội dung với bảng cũ không nằm trong inserts/updates
+    written = {_key(r) for part in (inserts, updates) for _, r in part.iterrows()}
+    assert written == {key for key, h in expected.items() if table.get(key) != h}
+    assert all(key[1] == 2 for key in deletes)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_reimporting_same_file_writes_nothing(seed):
+    frame, _ = prepare_progress_frame(_excel_rows(seed))
+    result, inserts, updates, deletes = _apply(_table(frame), frame)
+    assert (len(inserts), len(updates), deletes) == (0, 0, [])
+    assert result == _table(frame)
+
+
+def test_rows_without_hash_are_rewritten_once():
+    frame, _ = prepare_progress_frame(_excel_rows(0))
+    table = _table(frame)
+    _, inserts, updates, deletes = _apply(table, frame, existing_hashes=False)
+    assert len(inserts) == 0 and len(updates) == len(frame) and deletes == []
+
+
+@pytest.mark.parametrize('column, value', [
+    ('Score', 1.0), ('Credits', 9), ('CourseName', 'Tên khác'), ('OnTime', False), ('Graduated', True)
+])
+def test_row_hash_detects_each_column(column, value):
+    frame, _ = prepare_progress_frame(_excel_rows(1))
+    changed = frame.copy()
+    changed.loc[0, column] = value
+    hashes, changed_hashes = row_hashes(frame), row_hashes(changed)
+    assert hashes[0] != changed_hashes[0]
+    assert (hashes[1:] == changed_hashes[1:]).all()
@@ -0,0 +1,67 @@
+"""
+So sánh find_similar_ontime_students (bitset + popcount) với vòng lặp Jaccard cũ.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender.ontime_graduate_recommender import find_similar_ontime_students
+from recommender.similarity_index import CourseBitsetIndex, _popcount
+
+
+def _old_find_similar_ontime_students(df, current_student_courses, n_similar=10):
+    """Cài đặt cũ (lọc DataFrame theo từng sinh viên), giữ lại làm chuẩn so sánh."""
+    if not current_student_courses:
+        return []
+    student_ids = df['StudentID'].unique()
+    similarities = {}
+    for student_id in student_ids:
+        student_courses = set(df[df['StudentID'] == student_id]['CourseCode'].astype(str).unique())
+        intersection = len(current_student_courses & student_courses)
+        union = len(current_student_courses | student_courses)
+        if union > 0:
+            similarities[student_id] = intersection / union
+    similar_students = sorted(similarities.items(), key=lambda x: x[1], reverse=True)[:n_similar]
+    return [sid for sid, score in similar_students if score > 0]
+
+
+def _random_graduates(seed, n_students=60, n_courses=150):
+    """Sinh viên ngẫu nhiên, hơn 128 môn để bitset có nhiều word; có dòng trùng môn."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in rng.permutation(n_students):
+        for course in rng.choice(n_courses, size=rng.integers(1, 12)):
+            rows.append({'StudentID': f'B21{i:05d}', 'CourseCode': f'CT{course:03d}'})
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_find_similar_matches_old_loop(seed):
+    df = _random_graduates(seed)
+    index = CourseBitsetIndex.from_frame(df)
+    rng = np.random.default_rng(seed + 100)
+    for _ in range(30):
+        # Có cả môn ngoài dữ liệu (chỉ tính vào phần hợp)
+        query = {f'CT{c:03d}' for c in rng.choice(170, size=rng.integers(1, 10))}
+        for n_similar in (1, 10, 100):
+            expected = _old_find_similar_ontime_students(df, query, n_similar)
+            assert find_similar_ontime_students(df, query, n_similar, index=index) == expected
+            assert find_similar_ontime_students(df, query, n_similar) == expected
+
+
+def test_jaccard_values_and_empty_query():
+    df = pd.DataFrame({'StudentID': ['A', 'A', 'B', 'C'], 'CourseCode': ['X', 'Y', 'Y', 'Z']})
+    index = CourseBitsetIndex.from_frame(df)
+    np.testing.assert_allclose(index.jaccard({'Y', 'W'}), [1 / 3, 1 / 2, 0.0])
+    assert find_similar_ontime_students(df, set(), index=index) == []
+    assert find_similar_ontime_students(df, {'W'}, index=index) == []
+
+
+@pytest.mark.parametrize('lookup_table', [False, True])
+def test_popcount_matches_bin(monkeypatch, lookup_table):
+    if lookup_table:
+        # Nhánh dành cho numpy cũ chưa có np.bitwise_count
+        monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    words = np.array([[0, 1], [2 ** 63, 2 ** 64 - 1], [0x0F0F0F0F0F0F0F0F, 12345]], dtype=np.uint64)
+    expected = [[bin(int(w)).count('1') for w in row] for row in words]
+    assert _popcount(words).tolist() == expected
@@ -0,0 +1,71 @@
+"""
+So sánh PrerequisiteGraph với cách kiểm tra cũ: mỗi môn một truy vấn
+`SELECT PrerequisiteCode FROM TienQuyet WHERE CourseCode=%s` rồi all(p in passed for p in prereqs).
+"""
+import numpy as np
+import pytest
+
+from recommender.prerequisite_utils import PrerequisiteGraph
+
+
+def _random_edges(seed, n_courses=30, n_edges=45):
+    """Các dòng TienQuyet (CourseCode, PrerequisiteCode) theo thứ tự ID; có thể có chu trình."""
+    rng = np.random.default_rng(seed)
+    return [(f'CT{a:03d}', f'CT{b:03d}')
+            for a, b in rng.integers(0, n_courses, size=(n_edges, 2)) if a != b]
+
+
+def _old_prereqs(edges, course_code):
+    return [prereq for course, prereq in edges if course == course_code]
+
+
+def _old_eligible(edges, course_code, passed):
+    return all(p in passed for p in _old_prereqs(edges, course_code))
+
+
+def _reachable(edges, course_code):
+    """Bao đóng bắc cầu bằng duyệt đồ thị đơn giản."""
+    seen, stack = set(), [course_code]
+    while stack:
+        for prereq in _old_prereqs(edges, stack.pop()):
+            if prereq not in seen:
+                seen.add(prereq)
+                stack.append(prereq)
+    return seen
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_eligibility_matches_per_course_query(seed):
+    edges = _random_edges(seed)
+    graph = PrerequisiteGraph(edges)
+    rng = np.random.default_rng(seed + 100)
+    courses = [f'CT{c:03d}' for c in range(35)]  # có cả môn không nằm trong TienQuyet
+    for _ in range(20):
+        passed = {code for code in courses if rng.random() < 0.5}
+        expected = [code for code in courses if _old_eligible(edges, code, passed)]
+        assert graph.eligible(courses, passed) == expected
+        for code in courses:
+            assert graph.prereqs(code) == _old_prereqs(edges, code)
+            assert (not graph.missing(code, passed)) == _old_eligible(edges, code, passed)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_closure_is_transitive_prerequisites(seed):
+    edges = _random_edges(seed, n_edges=25)
+    graph = PrerequisiteGraph(edges)
+    for code in {c for edge in edges for c in edge}:
+        assert graph.closure(code) == _reachable(edges, code)
+
+
+def test_levels_follow_longest_prerequisite_chain():
+    graph = PrerequisiteGraph([('B', 'A'), ('C', 'B'), ('C', 'A'), ('D', 'X')])
+    assert [graph.level(code) for code in 'ABCDX'] == [0, 1, 2, 1, 0]
+    assert graph.levels() == {0: ['A', 'X'], 1: ['B', 'D'], 2: ['C']}
+    assert graph.missing('C', ['A']) == ['B']
+
+
+def test_rows_without_prerequisite_code_are_ignored():
+    # Dòng TienQuyet có PrerequisiteCode NULL không phải là một môn tiên quyết
+    graph = PrerequisiteGraph([('A', None), ('B', ''), ('C', 'A')])
+    assert graph.prereqs('A') == [] and graph.prereqs('B') == []
+    assert graph.eligible(['A', 'B', 'C'], set()) == ['A', 'B']
@@ -0,0 +1,105 @@
+"""
+So sánh StudentCourseMatrix với vòng lặp cosine similarity cũ của get_similar_students.
+
+Thứ tự kết quả được so sánh trên dữ liệu có điểm là bội của 5 (phép tính dấu phẩy động
+chính xác, các similarity bằng nhau là bằng nhau thật); với điểm lẻ thì so sánh giá trị
+similarity, vì vòng lặp cũ tự nó làm tròn khác nhau giữa các cặp bằng nhau.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender.recommend import get_similar_students
+from recommender.similarity_index import StudentCourseMatrix
+
+
+def _old_similarities(student_data, student_id):
+    """Cài đặt cũ (trước khi dùng ma trận dựng sẵn), giữ lại làm chuẩn so sánh."""
+    student_data = student_data.copy()
+    if 'StudentID' not in student_data.columns or 'CourseCode' not in student_data.columns:
+        return {}
+    student_data['StudentID'] = student_data['StudentID'].astype(str).str.strip()
+    student_id = str(student_id).strip()
+
+    value_col = 'Score' if 'Score' in student_data.columns else None
+    if value_col:
+        student_course_matrix = pd.pivot_table(
+            student_data, values='Score', index='StudentID', columns='CourseCode', fill_value=0
+        )
+    else:
+        student_data['_taken'] = 1
+        student_course_matrix = pd.pivot_table(
+            student_data, values='_taken', index='StudentID', columns='CourseCode', fill_value=0
+        )
+
+    if student_id not in student_course_matrix.index:
+        return {}
+
+    current_student = student_course_matrix.loc[student_id].values
+    similarities = {}
+    for other_id in student_course_matrix.index:
+        if other_id == student_id:
+            continue
+        other_student = student_course_matrix.loc[other_id].values
+        dot_product = np.dot(current_student, other_student)
+        norm_product = np.linalg.norm(current_student) * np.linalg.norm(other_student)
+        if norm_product == 0:
+            continue
+        similarities[other_id] = dot_product / norm_product
+    return similarities
+
+
+def _old_get_similar_students(student_data, student_id, n_similar=5):
+    similarities = _old_similarities(student_data, student_id)
+    similar_students = sorted(similarities.items(), key=lambda x: x[1], reverse=True)[:n_similar]
+    return [sid for sid, _ in similar_students]
+
+
+def _random_history(seed, n_students=40, n_courses=12, with_score=True):
+    """Lịch sử học tập ngẫu nhiên; điểm nguyên và ít môn để có nhiều similarity bằng nhau."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_students):
+        taken = rng.choice(n_courses, size=rng.integers(1, 5), replace=False)
+        for course in taken:
+            rows.append({
+                'StudentID': f' B21{i:05d}' if i % 7 == 0 else f'B21{i:05d}',
+                'CourseCode': f'CT{course:03d}',
+                'Score': float(rng.integers(0, 3)) * 5.0
+            })
+    df = pd.DataFrame(rows)
+    return df if with_score else df.drop(columns=['Score'])
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('with_score', [True, False])
+def test_most_similar_matches_old_loop(seed, with_score):
+    df = _random_history(seed, with_score=with_score)
+    matrix = StudentCourseMatrix.from_frame(df)
+    for student_id in df['StudentID'].unique():
+        for n_similar in (1, 5, 100):
+            expected = _old_get_similar_students(df, student_id, n_similar)
+            assert get_similar_students(df, student_id, n_similar, matrix=matrix) == expected
+            assert get_similar_students(df, student_id, n_similar) == expected
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_similarities_match_old_loop_with_decimal_scores(seed):
+    df = _random_history(seed)
+    df['Score'] = np.round(np.random.default_rng(seed).uniform(0, 10, len(df)), 1)
+    matrix = StudentCourseMatrix.from_frame(df)
+    for student_id in df['StudentID'].unique():
+        expected = _old_similarities(df, student_id)
+        sims = matrix.similarities(student_id)
+        if not expected:
+            assert sims.size == 0 or not np.isfinite(sims).any()
+            continue
+        actual = {sid: sims[i] for i, sid in enumerate(matrix.student_ids) if np.isfinite(sims[i])}
+        assert actual.keys() == expected.keys()
+        np.testing.assert_allclose([actual[k] for k in expected], list(expected.values()), rtol=1e-12)
+
+
+def test_unknown_student_and_missing_columns():
+    df = _random_history(0)
+    assert get_similar_students(df, 'KHONG_CO') == []
+    assert StudentCourseMatrix.from_frame(df[['StudentID']]).most_similar('B2100001') == []
@@ -0,0 +1,83 @@
+"""
+So sánh build_feature_matrix / compute_student_gpas / compute_top_students với cách dựng
+cũ lặp theo từng sinh viên (iterrows) trong train_kmeans và get_top_student_per_cluster.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender.train_model import build_feature_matrix, compute_student_gpas, compute_top_students
+
+
+def _old_feature_matrix(df, all_courses):
+    """Cài đặt cũ (lặp theo từng sinh viên), giữ lại làm chuẩn so sánh."""
+    feature_matrix = []
+    student_ids = []
+    for student_id in df['StudentID'].unique():
+        student_data = df[df['StudentID'] == student_id]
+        passed_courses = {}
+        for _, row in student_data.iterrows():
+            course_code = str(row.get('CourseCode', ''))
+            if course_code in all_courses:
+                score = float(row.get('Score', 0)) if pd.notna(row.get('Score')) else 0
+                credits = float(row.get('Credits', 0)) if pd.notna(row.get('Credits')) else 0
+                if score >= 4.0:
+                    passed_courses[course_code] = credits
+        feature_matrix.append(np.array([passed_courses.get(course, 0) for course in all_courses]))
+        student_ids.append(student_id)
+    return np.array(feature_matrix), student_ids
+
+
+def _old_top_students(df, student_ids, labels, n_clusters=5):
+    student_clusters = dict(zip(student_ids, labels))
+    student_gpas = {}
+    for student_id in student_ids:
+        scores = df[(df['StudentID'] == student_id) & (df['Score'] >= 4.0)]['Score'].values
+        student_gpas[student_id] = float(np.mean(scores)) if len(scores) > 0 else 0.0
+    top_students = {}
+    for cluster_id in range(n_clusters):
+        members = [(sid, gpa) for sid, gpa in student_gpas.items() if student_clusters.get(sid) == cluster_id]
+        top_students[cluster_id] = max(members, key=lambda x: x[1])[0] if members else None
+    return top_students
+
+
+def _random_progress(seed, n_students=40, n_courses=15):
+    """Tiến trình ngẫu nhiên: học lại nhiều lần, điểm/tín chỉ trống, môn ngoài danh mục."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_students * 8):
+        rows.append({
+            'StudentID': f'B21{rng.integers(n_students):05d}',
+            'CourseCode': f'CT{rng.integers(n_courses + 3):03d}',
+            'Score': np.nan if rng.random() < 0.1 else float(rng.integers(0, 21)) / 2,
+            'Credits': np.nan if rng.random() < 0.05 else int(rng.integers(1, 5))
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_feature_matrix_matches_iterrows(seed):
+    df = _random_progress(seed)
+    all_courses = [f'CT{c:03d}' for c in range(15)]
+    expected, expected_ids = _old_feature_matrix(df, all_courses)
+    X, student_ids = build_feature_matrix(df, all_courses)
+    assert student_ids == expected_ids
+    np.testing.assert_array_equal(X, expected)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_gpas_and_top_students_match_old_loop(seed):
+    df = _random_progress(seed)
+    _, student_ids = build_feature_matrix(df, [f'CT{c:03d}' for c in range(15)])
+    labels = np.random.default_rng(seed).integers(0, 4, size=len(student_ids))  # cluster 4 rỗng
+    gpas = compute_student_gpas(df, student_ids)
+    assert compute_top_students(student_ids, labels, gpas) == _old_top_students(df, student_ids, labels)
+
+
+def test_explicit_row_order_and_unknown_students():
+    df = pd.DataFrame({'StudentID': ['A', 'B', 'A'], 'CourseCode': ['X', 'X', 'X'],
+                       'Score': [9.0, 3.0, 5.0], 'Credits': [3, 3, 2]})
+    X, student_ids = build_feature_matrix(df, ['X', 'Y'], student_ids=['C', 'A', 'B'])
+    assert student_ids == ['C', 'A', 'B']
+    # Học lại: lấy lần đạt xuất hiện sau cùng
+    np.testing.assert_array_equal(X, [[0, 0], [2, 0], [0, 0]])